@@ -7,4 +7,6 @@ class FlightConfig(AppConfig):
 
     def ready(self):
         # Ensure signals are loaded
-        import Flight.signals
\ No newline at end of file
+        import Flight.signals
+        # Count connections from the first one on
+        import Flight.connections
\ No newline at end of file
@@ -0,0 +1,53 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from Flight.models import ArchivedFlight, Flight, SeatHold
+from Flight.signals import rows_changed
+
+COLUMNS = [field.attname for field in Flight._meta.concrete_fields]
+
+
+def delete_chunk(pks):
+    """
+    Delete the flights and their seat holds with two plain DELETEs. The
+    deletion collector would send post_delete for every row; skipping it is
+    safe because seat holds are the only rows that cascade from a flight
+    (deleted first, here), listings reference flights without a constraint,
+    and every observer of the model signals also hears ``rows_changed``.
+    """
+    quote = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cursor:
+        for model, column in ((SeatHold, "flight_id"), (Flight, "id")):
+            cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})",
+                           pks)
+
+
+def archive_flights(before, chunk_size=1000, on_chunk=None):
+    """
+    Move the flights that departed before ``before`` to ``ArchivedFlight``,
+    oldest first, ``chunk_size`` per transaction: read the chunk on the
+    ``(departure_datetime, id)`` index, insert it into the archive, delete it
+    with its seat holds. Observers (listings, fare calendar, caches, search
+    indexes) hear of each chunk once through ``rows_changed``. Return the
+    number of flights moved; ``on_chunk(moved)`` is called after every chunk.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            flights = list(Flight.objects.filter(departure_datetime__lt=before)
+                           .order_by("departure_datetime", "id").select_for_update(skip_locked=True)[:chunk_size])
+            if not flights:
+                return moved
+            archived_at = timezone.now()
+            ArchivedFlight.objects.bulk_create([
+                ArchivedFlight(archived_at=archived_at, **{column: getattr(flight, column) for column in COLUMNS})
+                for flight in flights
+            ])
+            delete_chunk([flight.pk for flight in flights])
+            rows_changed.send(sender=Flight, deleted=flights)
+        moved += len(flights)
+        if on_chunk is not None:
+            on_chunk(moved)
+        if len(flights) < chunk_size:
+            return moved
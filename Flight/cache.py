@@ -0,0 +1,174 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LRUCacheBackend:
+    """
+    In-process LRU cache with a time-to-live, private to each worker. Writes
+    on other workers do not reach it: their rows are stale here for up to
+    ``ttl`` seconds.
+    """
+    def __init__(self, max_entries=4096, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, pickled value)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Hand out a private copy, like the Django cache backends do
+        return pickle.loads(entry[1])
+
+    def set(self, key, value):
+        entry = (time.monotonic() + self.ttl, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_version(self, name):
+        return self._versions.get(name, 0)
+
+    # Everything is in memory, so the async API is the sync one
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value):
+        self.set(key, value)
+
+    async def aget_version(self, name):
+        return self.get_version(name)
+
+    def incr_version(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """Backend on a Django cache alias, shared by every worker using the same cache server."""
+    def __init__(self, alias="default", ttl=300):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.ttl)
+
+    def get_version(self, name):
+        key = f"lookup-version:{name}"
+        version = self.cache.get(key)
+        if version is None:
+            # Seed with the clock so an evicted counter never restarts at a value old entries used
+            self.cache.add(key, time.time_ns(), timeout=None)
+            version = self.cache.get(key)
+        return version
+
+    def incr_version(self, name):
+        key = f"lookup-version:{name}"
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, time.time_ns(), timeout=None)
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+    async def aset(self, key, value):
+        await self.cache.aset(key, value, self.ttl)
+
+    async def aget_version(self, name):
+        key = f"lookup-version:{name}"
+        version = await self.cache.aget(key)
+        if version is None:
+            await self.cache.aadd(key, time.time_ns(), timeout=None)
+            version = await self.cache.aget(key)
+        return version
+
+    def clear(self):
+        self.cache.clear()
+
+
+class LookupCache:
+    """
+    Read-through cache for lookups by natural key (airport code, flight number...).
+
+    Keys carry a per-model version counter; every write bumps the counter of its
+    model (see ``Flight.signals``), so entries written before it are never read
+    again and simply age out.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+
+    def key(self, model, natural_key):
+        label = model._meta.label_lower
+        return f"lookup:{label}:{self.backend.get_version(label)}:{natural_key}"
+
+    def get_or_load(self, model, natural_key, loader):
+        if self.backend is None:
+            return loader()
+        key = self.key(model, natural_key)
+        instance = self.backend.get(key)
+        if instance is None:
+            instance = loader()
+            # Only hits are cached; unknown keys always reach the database
+            if instance is not None:
+                self.backend.set(key, instance)
+        return instance
+
+    async def aget_or_load(self, model, natural_key, loader):
+        """``get_or_load()`` for the async view; ``loader`` is a coroutine function."""
+        if self.backend is None:
+            return await loader()
+        label = model._meta.label_lower
+        key = f"lookup:{label}:{await self.backend.aget_version(label)}:{natural_key}"
+        instance = await self.backend.aget(key)
+        if instance is None:
+            instance = await loader()
+            if instance is not None:
+                await self.backend.aset(key, instance)
+        return instance
+
+    def invalidate(self, model):
+        if self.backend is not None:
+            self.backend.incr_version(model._meta.label_lower)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def build_lookup_cache():
+    config = getattr(settings, "LOOKUP_CACHE", {})
+    backend = config.get("BACKEND")
+    ttl = config.get("TTL", 300)
+    if backend == "lru":
+        return LookupCache(LRUCacheBackend(max_entries=config.get("MAX_ENTRIES", 4096), ttl=ttl))
+    if backend == "django":
+        return LookupCache(DjangoCacheBackend(alias=config.get("ALIAS", "default"), ttl=ttl))
+    if backend is None:
+        return LookupCache(None)
+    raise Exception(f"Unknown LOOKUP_CACHE backend: {backend}.")
+
+
+# Shared cache instance
+lookup_cache = build_lookup_cache()
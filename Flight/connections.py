@@ -0,0 +1,70 @@
+import threading
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from Flight.metrics import _escape
+
+_connects = {}  # alias -> connections this worker opened (or took from its pool)
+_lock = threading.Lock()
+
+
+@receiver(connection_created)
+def count_connect(sender, connection, **kwargs):
+    with _lock:
+        _connects[connection.alias] = _connects.get(connection.alias, 0) + 1
+
+
+def stats():
+    """
+    ``{alias: statistics}`` of this worker's database connections: ``connects``,
+    the connections its threads opened (or took from the pool), and for a pooled
+    alias ``size``, ``in_use``, ``idle``, ``waiting``, ``created``, ``min_size``
+    and ``max_size`` from the psycopg pool.
+    """
+    found = {}
+    for alias in connections:
+        entry = found[alias] = {"connects": _connects.get(alias, 0)}
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        pool_stats = pool.get_stats()
+        entry.update(
+            size=pool_stats["pool_size"],
+            in_use=pool_stats["pool_size"] - pool_stats["pool_available"],
+            idle=pool_stats["pool_available"],
+            waiting=pool_stats["requests_waiting"],
+            # psycopg leaves counters that are still zero out
+            created=pool_stats.get("connections_num", 0),
+            min_size=pool_stats["pool_min"],
+            max_size=pool_stats["pool_max"],
+        )
+    return found
+
+
+def render():
+    """``stats()`` in Prometheus text format."""
+    families = {
+        "db_connections_opened_total": ("counter", "Database connections opened, or taken from the pool.", []),
+        "db_pool_connections": ("gauge", "Connections in the pool, by state.", []),
+        "db_pool_requests_waiting": ("gauge", "Requests waiting for a pool connection.", []),
+        "db_pool_connections_created_total": ("counter", "Connections the pool opened.", []),
+        "db_pool_max_size": ("gauge", "Most connections the pool may open.", []),
+    }
+    for alias, entry in sorted(stats().items()):
+        label = f'alias="{_escape(alias)}"'
+        families["db_connections_opened_total"][2].append(f"{{{label}}} {entry['connects']}")
+        if "size" not in entry:
+            continue
+        for state in ("in_use", "idle"):
+            families["db_pool_connections"][2].append(f'{{{label},state="{state}"}} {entry[state]}')
+        families["db_pool_requests_waiting"][2].append(f"{{{label}}} {entry['waiting']}")
+        families["db_pool_connections_created_total"][2].append(f"{{{label}}} {entry['created']}")
+        families["db_pool_max_size"][2].append(f"{{{label}}} {entry['max_size']}")
+    lines = []
+    for name, (kind, documentation, samples) in families.items():
+        if samples:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{sample}" for sample in samples]
+    return "\n".join(lines) + "\n"
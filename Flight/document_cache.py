@@ -0,0 +1,153 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from graphql import parse, validate
+from graphql.error import GraphQLError
+from graphene_django.settings import graphene_settings
+
+
+def query_hash(query):
+    """sha256 of the query text, as used by persisted queries."""
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    """
+    LRU of parsed and validated GraphQL documents keyed by the sha256 of the
+    query text. Clients send a small, fixed set of operations, so nearly every
+    request skips both parsing and validation.
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_parse(self, schema, query, key=None, validation_rules=None):
+        """Return ``(document, errors)`` for ``query``, parsing and validating only on a miss."""
+        key = key or query_hash(query)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                return document, None
+
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            return None, [error]
+        errors = validate(schema, document, validation_rules, graphene_settings.MAX_VALIDATION_ERRORS)
+        if errors:
+            # Invalid documents are not cached; they are rare and should stay cheap to reject
+            return None, errors
+
+        with self._lock:
+            self._documents[key] = document
+            while len(self._documents) > self.max_entries:
+                self._documents.popitem(last=False)
+        return document, None
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+
+class PersistedQueryNotFound(GraphQLError):
+    def __init__(self):
+        super().__init__("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+
+
+class PersistedQueryRegistry:
+    """
+    Registry of persisted queries: clients send only the sha256 of a query
+    (``extensions.persistedQuery.sha256Hash``) and the server looks the text up.
+
+    Queries come from an optional JSON file of ``{hash: query}`` and, when
+    registration is allowed, from the first request that sends hash and a
+    valid query together. Registered queries are kept in an LRU of
+    ``max_entries`` per worker or, with ``CACHE_ALIAS`` set, in that Django
+    cache so every worker sees them.
+    """
+    def __init__(self, file=None, cache_alias=None, allow_registration=True, max_entries=1000):
+        self.allow_registration = allow_registration
+        self.cache = caches[cache_alias] if cache_alias else None
+        self.max_entries = max_entries
+        self._files = {}
+        self._registered = OrderedDict()
+        self._lock = threading.Lock()
+        if file:
+            with open(file, encoding="utf-8") as handle:
+                self._files.update(json.load(handle))
+
+    def get(self, sha256_hash):
+        query = self._files.get(sha256_hash)
+        if query is not None:
+            return query
+        if self.cache is not None:
+            return self.cache.get(f"persisted-query:{sha256_hash}")
+        with self._lock:
+            query = self._registered.get(sha256_hash)
+            if query is not None:
+                self._registered.move_to_end(sha256_hash)
+        return query
+
+    def register(self, sha256_hash, query):
+        """Keep a query that parsed and validated under its (checked) hash."""
+        if not self.allow_registration or self.get(sha256_hash) is not None:
+            return
+        if self.cache is not None:
+            self.cache.set(f"persisted-query:{sha256_hash}", query, None)
+            return
+        with self._lock:
+            self._registered[sha256_hash] = query
+            while len(self._registered) > self.max_entries:
+                self._registered.popitem(last=False)
+
+    def resolve(self, query, extensions):
+        """
+        Return ``(query, hash)`` for a request. ``hash`` is None when the
+        request did not use a persisted query. A request that sends the query
+        too is checked against its hash; the caller registers it once it is
+        known to be valid.
+        """
+        if extensions is None:
+            return query, None
+        if not isinstance(extensions, dict):
+            raise GraphQLError("extensions must be an object")
+        persisted = extensions.get("persistedQuery")
+        if not persisted:
+            return query, None
+        if not isinstance(persisted, dict):
+            raise GraphQLError("persistedQuery extension must be an object")
+        sha256_hash = persisted.get("sha256Hash")
+        if not sha256_hash or not isinstance(sha256_hash, str):
+            raise GraphQLError("persistedQuery extension requires a sha256Hash")
+        if query:
+            if query_hash(query) != sha256_hash:
+                raise GraphQLError("provided sha does not match query",
+                                   extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"})
+            return query, sha256_hash
+        query = self.get(sha256_hash)
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query, sha256_hash
+
+
+def build_persisted_query_registry():
+    config = getattr(settings, "GRAPHQL_PERSISTED_QUERIES", {})
+    if not config.get("ENABLED", True):
+        return None
+    return PersistedQueryRegistry(
+        file=config.get("FILE"),
+        cache_alias=config.get("CACHE_ALIAS"),
+        allow_registration=config.get("ALLOW_REGISTRATION", True),
+        max_entries=config.get("MAX_ENTRIES", 1000),
+    )
+
+
+# Shared instances
+document_cache = DocumentCache(max_entries=getattr(settings, "GRAPHQL_DOCUMENT_CACHE_SIZE", 256))
+persisted_queries = build_persisted_query_registry()
@@ -0,0 +1,116 @@
+import csv
+import json
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from Flight.filters import filter_flights
+
+# (column name, queryset lookup) of every exported field, in output order
+COLUMNS = (
+    ("flight_number", "flight_number"),
+    ("flight_type", "flight_type"),
+    ("trip_type", "trip_type"),
+    ("cabin_type", "cabin_type"),
+    ("departure_airport", "departure_airport__airport_code"),
+    ("arrival_airport", "arrival_airport__airport_code"),
+    ("departure_datetime", "departure_datetime"),
+    ("arrival_datetime", "arrival_datetime"),
+    ("airline", "airline__airline_code"),
+    ("aircraft", "aircraft__aircraft_model"),
+    ("base_price", "base_price"),
+    ("tax", "tax"),
+    ("discount", "discount"),
+    ("baggage_limit_kg", "baggage_limit_kg"),
+    ("final_price", "final_price"),
+    ("flight_rules", "flight_rules"),
+)
+
+CHUNK_SIZE = 2000  # Rows fetched per round trip of the server-side cursor
+ROWS_PER_WRITE = 500  # Rows joined into one chunk of the response body
+
+
+def parse_moment(value):
+    """A datetime, or a date meaning midnight at its start, as an aware datetime."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date or datetime: {value}.")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_filters(params):
+    """Read the export filters from query string parameters."""
+    filters = {
+        "airline": params.get("airline"),
+        "from_": params.get("from"),
+        "to": params.get("to"),
+        "cabin_type": params.get("cabin_type"),
+    }
+    for name in ("depart_after", "depart_before"):
+        if params.get(name):
+            filters[name] = parse_moment(params[name])
+    return filters
+
+
+def export_rows(filters=None):
+    """
+    Yield the matching Flights as tuples in ``COLUMNS`` order.
+
+    Rows are read as plain tuples through ``iterator()``, which uses a
+    server-side cursor where the database supports one, so no model
+    instances are built and only ``CHUNK_SIZE`` rows are held at a time.
+    """
+    flights = filter_flights(filters).order_by("departure_datetime", "id")
+    return flights.values_list(*(lookup for _, lookup in COLUMNS)).iterator(chunk_size=CHUNK_SIZE)
+
+
+def serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return str(value)  # Decimal, kept exact
+
+
+def ndjson_chunks(rows):
+    names = [name for name, _ in COLUMNS]
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, map(serialize, row))), ensure_ascii=False))
+        if len(lines) == ROWS_PER_WRITE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+class _Buffer:
+    """File-like object whose write() returns the line instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows):
+    writer = csv.writer(_Buffer())
+    yield writer.writerow([name for name, _ in COLUMNS])
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow([serialize(value) for value in row]))
+        if len(lines) == ROWS_PER_WRITE:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+# format -> (content type, file extension, chunk writer)
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson", ndjson_chunks),
+    "csv": ("text/csv", "csv", csv_chunks),
+}
@@ -0,0 +1,75 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from Flight.models import FareCalendarDay, FlightListing
+
+# (departure_airport_code, arrival_airport_code, cabin_type, day): one row of the calendar
+KEY = ("departure_airport_code", "arrival_airport_code", "cabin_type")
+ROUTES_PER_QUERY = 100
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def key(listing):
+    """The calendar row a FlightListing counts towards."""
+    return (listing.departure_airport_code, listing.arrival_airport_code, listing.cabin_type,
+            timezone.localtime(listing.departure_datetime).date())
+
+
+def keys(listings):
+    """The calendar rows of a FlightListing queryset, read with one query."""
+    return {(*row[:3], timezone.localtime(row[3]).date())
+            for row in listings.values_list(*KEY, "departure_datetime")}
+
+
+def days(listings):
+    """Minimum price and number of flights per calendar row, aggregated by the database."""
+    return (listings.annotate(day=TruncDate("departure_datetime"))
+            .values(*KEY, "day").annotate(min_price=Min("final_price"), flights=Count("pk")).order_by())
+
+
+def refresh(changed):
+    """
+    Recompute the calendar rows in ``changed`` from the listings: upsert those
+    that still have flights and delete the rest. Each route and cabin is read
+    as one range over the days it changed on, ``ROUTES_PER_QUERY`` routes per query.
+    """
+    spans = {}  # (from, to, cabin) -> (first day, last day)
+    for *route, day in changed:
+        first, last = spans.get(tuple(route), (day, day))
+        spans[tuple(route)] = (min(first, day), max(last, day))
+    routes = sorted(spans)
+    found = {}
+    for start in range(0, len(routes), ROUTES_PER_QUERY):
+        condition = Q()
+        for route in routes[start:start + ROUTES_PER_QUERY]:
+            first, last = spans[route]
+            condition |= Q(**dict(zip(KEY, route)), departure_datetime__gte=day_start(first),
+                           departure_datetime__lt=day_start(last + timedelta(days=1)))
+        for row in days(FlightListing.objects.filter(condition)):
+            row_key = (*(row[field] for field in KEY), row["day"])
+            if row_key in changed:
+                found[row_key] = FareCalendarDay(min_price=row["min_price"], flights=row["flights"],
+                                                 **dict(zip((*KEY, "day"), row_key)))
+    if found:
+        FareCalendarDay.objects.bulk_create(found.values(), update_conflicts=True, unique_fields=[*KEY, "day"],
+                                            update_fields=["min_price", "flights"])
+    emptied = sorted(changed - set(found))
+    for start in range(0, len(emptied), ROUTES_PER_QUERY):
+        condition = Q()
+        for row_key in emptied[start:start + ROUTES_PER_QUERY]:
+            condition |= Q(**dict(zip((*KEY, "day"), row_key)))
+        FareCalendarDay.objects.filter(condition).only("pk").delete()
+
+
+def rebuild():
+    """Recreate the whole calendar from the listings; return the number of rows."""
+    FareCalendarDay.objects.only("pk").delete()
+    rows = [FareCalendarDay(**row) for row in days(FlightListing.objects.all()).iterator()]
+    FareCalendarDay.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,27 @@
+from Flight.models import Flight
+
+
+def filter_flights(filters=None, flights=None):
+    """
+    Narrow ``flights`` (all Flights by default) with the catalog filters shared by
+    repriceFlights and the export: ``airline`` / ``from_`` / ``to`` codes, a
+    ``depart_after`` / ``depart_before`` window, ``cabin_type`` and ``flight_numbers``.
+    """
+    if flights is None:
+        flights = Flight.objects.all()
+    filters = filters or {}
+    if filters.get("airline") is not None:
+        flights = flights.filter(airline__airline_code=filters["airline"])
+    if filters.get("from_") is not None:
+        flights = flights.filter(departure_airport__airport_code=filters["from_"])
+    if filters.get("to") is not None:
+        flights = flights.filter(arrival_airport__airport_code=filters["to"])
+    if filters.get("depart_after") is not None:
+        flights = flights.filter(departure_datetime__gte=filters["depart_after"])
+    if filters.get("depart_before") is not None:
+        flights = flights.filter(departure_datetime__lt=filters["depart_before"])
+    if filters.get("cabin_type") is not None:
+        flights = flights.filter(cabin_type=filters["cabin_type"])
+    if filters.get("flight_numbers") is not None:
+        flights = flights.filter(flight_number__in=filters["flight_numbers"])
+    return flights
@@ -0,0 +1,169 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Model, Q, Subquery
+from django.utils import timezone
+
+from Flight.models import CommandHistory
+
+DEFAULT_SCOPE = "default"  # Commands run outside a request: shell, management commands, tests
+_scope = ContextVar("command_history_scope", default=DEFAULT_SCOPE)
+
+
+def request_scope(request):
+    """The history scope of a request: its user, else its session (started if needed)."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    session = getattr(request, "session", None)
+    if session is None:
+        return f"ip:{request.META.get('REMOTE_ADDR')}"
+    if session.session_key is None:
+        session.save()
+        session.modified = True  # So the middleware sends the cookie the client undoes with
+    return f"session:{session.session_key}"
+
+
+@contextmanager
+def history_scope(scope):
+    """Keep the commands run inside the block in the history of ``scope``."""
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def current_scope():
+    return _scope.get()
+
+
+def dump_fields(model, values):
+    """``values`` as kept in a history entry: foreign keys by id, under their column name."""
+    data = {}
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        if field.many_to_one:
+            data[field.attname] = value.pk if isinstance(value, Model) else value
+        else:
+            data[name] = field.get_prep_value(value)  # Files by name
+    return data
+
+
+def load_fields(model, data):
+    """The inverse of ``dump_fields``: values converted back from JSON to their field's type."""
+    return {name: model._meta.get_field(name).to_python(value) for name, value in data.items()}
+
+
+def dump_instance(instance):
+    """Every column of ``instance`` (its id included), as kept in a history entry."""
+    return dump_fields(type(instance), {field.attname: getattr(instance, field.attname)
+                                        for field in instance._meta.concrete_fields})
+
+
+def load_instance(model, data):
+    return model(**load_fields(model, data))
+
+
+class HistoryCommand(ABC):
+    """Base of the commands kept in the history; every subclass is loadable by its class name."""
+    commands = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        HistoryCommand.commands[cls.__name__] = cls
+
+    @abstractmethod
+    def execute(self, **kwargs):
+        pass
+
+    @abstractmethod
+    def undo(self):
+        pass
+
+    @abstractmethod
+    def redo(self):
+        pass
+
+    @abstractmethod
+    def state(self):
+        """What undo and redo need, as JSON-serializable field values."""
+
+    @classmethod
+    @abstractmethod
+    def from_state(cls, state):
+        """The command ``state()`` was taken from, ready to undo or redo."""
+
+
+class CommandHistoryHandler:
+    """
+    Runs commands and keeps them in a persistent undo/redo history.
+
+    Every executed command is stored in the ``CommandHistory`` table under the
+    current scope (the user or session of the request, see ``history_scope``)
+    as its ``state()``. Undo and redo lock the top entry of the scope, rebuild
+    the command with ``from_state()`` and run it, so they work from any worker
+    and across restarts. A scope keeps its latest ``COMMAND_HISTORY["MAX_LENGTH"]``
+    commands; entries older than ``COMMAND_HISTORY["MAX_AGE"]`` seconds are
+    evicted.
+    """
+    @staticmethod
+    def limits():
+        config = getattr(settings, "COMMAND_HISTORY", {})
+        return config.get("MAX_LENGTH", 50), config.get("MAX_AGE", 7 * 24 * 3600)
+
+    def entries(self, undone):
+        _, max_age = self.limits()
+        return CommandHistory.objects.filter(scope=current_scope(), undone=undone,
+                                             created_at__gte=timezone.now() - timedelta(seconds=max_age))
+
+    def execute(self, command, **kwargs):
+        # Execute the Command and store it on the undo stack
+        with transaction.atomic():
+            result = command.execute(**kwargs)
+            self.push(command)
+        return result
+
+    def push(self, command):
+        scope = current_scope()
+        max_length, max_age = self.limits()
+        CommandHistory.objects.create(scope=scope, command=type(command).__name__, state=command.state())
+        # A new command clears the redo stack and evicts entries beyond the length and age caps
+        oldest_kept = (CommandHistory.objects.filter(scope=scope, undone=False)
+                       .order_by("-id").values("id")[max_length - 1:max_length])
+        CommandHistory.objects.filter(
+            Q(scope=scope, undone=True)
+            | Q(scope=scope, id__lt=Subquery(oldest_kept))
+            | Q(created_at__lt=timezone.now() - timedelta(seconds=max_age))
+        ).only("id").delete()
+
+    def undo(self):
+        # Undo the last operation of the scope
+        with transaction.atomic():
+            entry = self.entries(undone=False).select_for_update().order_by("-id").first()
+            if entry is None:
+                raise Exception("Nothing to undo.")
+            self.load(entry).undo()
+            entry.undone = True
+            entry.save(update_fields=["undone"])
+
+    def redo(self):
+        # Redo the last undone operation of the scope: the oldest undone entry
+        with transaction.atomic():
+            entry = self.entries(undone=True).select_for_update().order_by("id").first()
+            if entry is None:
+                raise Exception("Nothing to redo.")
+            command = self.load(entry)
+            result = command.redo()
+            entry.undone = False
+            entry.state = command.state()  # A redone create has new ids
+            entry.save(update_fields=["undone", "state"])
+        return result
+
+    @staticmethod
+    def load(entry):
+        return HistoryCommand.commands[entry.command].from_state(entry.state)
@@ -0,0 +1,278 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from Flight.models import Aircraft, Airline, Airport, Flight
+
+logger = logging.getLogger(__name__)
+
+
+# model -> (index name, document fields); the fields of the Elasticsearch documents in Flight/documents.py
+DOCUMENTS = {
+    Airport: ("airports", ("airport_name", "airport_code", "airport_city", "airport_country")),
+    Airline: ("airlines", ("airline_name", "airline_code", "airline_rules")),
+    Aircraft: ("aircrafts", ("aircraft_model", "aircraft_capacity", "aircraft_manufacturer")),
+    Flight: ("flights", ("flight_number", "flight_type", "trip_type", "departure_datetime", "arrival_datetime",
+                         "cabin_type", "base_price", "final_price", "baggage_limit_kg", "flight_rules", "tax",
+                         "discount")),
+}
+# Flight field -> (related model, the related fields embedded in the flight document)
+FLIGHT_RELATIONS = {
+    "departure_airport": (Airport, ("airport_name", "airport_code", "airport_city")),
+    "arrival_airport": (Airport, ("airport_name", "airport_code", "airport_city")),
+    "airline": (Airline, ("airline_name", "airline_code")),
+    "aircraft": (Aircraft, ("aircraft_model", "aircraft_capacity", "aircraft_manufacturer")),
+}
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def document(instance):
+    """The search document of a saved Airport, Airline, Aircraft or Flight."""
+    body = {name: _value(getattr(instance, name)) for name in DOCUMENTS[type(instance)][1]}
+    if isinstance(instance, Flight):
+        for name, (_, fields) in FLIGHT_RELATIONS.items():
+            related = getattr(instance, name)
+            body[name] = {field: _value(getattr(related, field)) for field in fields}
+    return body
+
+
+class MemoryIndexBackend:
+    """Keeps the indexes in a dict; for tests and development."""
+    def __init__(self):
+        self.indexes = defaultdict(dict)  # index -> {id: document}
+        self.requests = []  # Number of actions of every bulk request
+
+    def bulk(self, actions):
+        for index, pk, body in actions:
+            if body is None:
+                self.indexes[index].pop(pk, None)
+            else:
+                self.indexes[index][pk] = body
+        self.requests.append(len(actions))
+
+
+class FileIndexBackend:
+    """
+    Appends every bulk request to a file in the Elasticsearch ``_bulk`` NDJSON
+    format, so it can be inspected or replayed with
+    ``curl -H 'Content-Type: application/x-ndjson' --data-binary @file .../_bulk``.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def bulk(self, actions):
+        lines = []
+        for index, pk, body in actions:
+            if body is None:
+                lines.append(json.dumps({"delete": {"_index": index, "_id": pk}}))
+            else:
+                lines.append(json.dumps({"index": {"_index": index, "_id": pk}}))
+                lines.append(json.dumps(body, ensure_ascii=False))
+        with open(self.path, "a", encoding="utf-8") as output:
+            output.write("\n".join(lines) + "\n")
+
+
+class ElasticsearchIndexBackend:
+    """Sends every batch with one call to the Elasticsearch bulk API."""
+    def __init__(self, hosts, index_prefix="", **options):
+        from elasticsearch import Elasticsearch, helpers  # Only needed with this backend
+        self.client = Elasticsearch(hosts, **options)
+        self.helpers = helpers
+        self.index_prefix = index_prefix
+
+    def bulk(self, actions):
+        operations = []
+        for index, pk, body in actions:
+            operation = {"_index": self.index_prefix + index, "_id": pk}
+            if body is None:
+                operation["_op_type"] = "delete"
+            else:
+                operation["_source"] = body
+            operations.append(operation)
+        # Deleting a document that was never indexed is not an error
+        _, errors = self.helpers.bulk(self.client, operations, raise_on_error=False, raise_on_exception=True)
+        errors = [error for error in errors if error.get("delete", {}).get("status") != 404]
+        if errors:
+            raise Exception(f"{len(errors)} of {len(actions)} bulk actions failed: {errors[0]}")
+
+
+class IndexSyncQueue:
+    """
+    Outbound queue that keeps an external search index in step with the database.
+
+    Writes only record which rows changed: a row written many times before a
+    flush is sent once, and rows join the queue only when their transaction
+    commits (``transaction.on_commit``), so a flush never reads a write before
+    it is visible. (Rows of a rolled back transaction are sent, as they are
+    in the database, with the next commit of the same thread.) A flush
+    reads the current state of every queued row and sends it as ``index`` (or
+    ``delete``, if the row is gone) actions in bulk batches of ``batch_size``,
+    retrying a failed batch ``retries`` times with exponential backoff before
+    putting it back on the queue for the next flush. Changing an airport,
+    airline or aircraft also re-sends the flights that embed it.
+
+    With a ``flush_interval`` the flush runs on a background thread that
+    gathers the writes of that many seconds, so writes never wait on the
+    index; with ``flush_interval=0`` it runs inline, on commit.
+    """
+    def __init__(self, backend, batch_size=500, retries=3, retry_backoff=0.5, flush_interval=1.0):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.flush_interval = flush_interval
+        self.stats = {"queued": 0, "coalesced": 0, "batches": 0, "actions": 0, "retries": 0, "failures": 0}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(set)  # model -> primary keys
+        self._related = defaultdict(set)  # Flight foreign key -> changed related primary keys
+        self._local = threading.local()  # buffer: model -> primary keys written by this thread's transaction
+        self._wake = threading.Event()
+        self._worker = None
+
+    def enqueue(self, model, pks):
+        """Queue rows of ``model`` for syncing once the current transaction commits."""
+        if model not in DOCUMENTS:
+            return
+        # Held per thread until the commit: a flush before it would read the rows as they were
+        pks, buffer = set(pks), self._buffer()
+        with self._lock:
+            self.stats["queued"] += len(pks)
+            self.stats["coalesced"] += len(pks & buffer[model])
+        buffer[model] |= pks
+        transaction.on_commit(self._commit)
+
+    def _buffer(self):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = defaultdict(set)
+        return buffer
+
+    def _commit(self):
+        # The first callback of a transaction moves all of its rows; the others find the buffer empty
+        buffer, self._local.buffer = self._buffer(), None
+        if not buffer:
+            return
+        with self._lock:
+            for model, pks in buffer.items():
+                pending = self._pending[model]
+                self.stats["coalesced"] += len(pks & pending)
+                pending |= pks
+                if model is not Flight:
+                    for field, (related_model, _) in FLIGHT_RELATIONS.items():
+                        if related_model is model:
+                            self._related[field] |= pks
+        self.schedule()
+
+    def schedule(self):
+        if not self.flush_interval:
+            self.flush()
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="index-sync", daemon=True)
+            self._worker.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.flush_interval)  # Let the writes of the interval coalesce
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Search index sync failed.")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Send every queued change; return the number of actions sent."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(set)
+                related, self._related = self._related, defaultdict(set)
+            if related:
+                condition = Q()
+                for field, pks in related.items():
+                    condition |= Q(**{f"{field}__in": pks})
+                pending[Flight] |= set(Flight.objects.filter(condition).values_list("pk", flat=True))
+
+            sent = 0
+            for model, pks in pending.items():
+                pks = sorted(pks)
+                for start in range(0, len(pks), self.batch_size):
+                    batch = pks[start:start + self.batch_size]
+                    try:
+                        sent += self.send(model, batch)
+                    except Exception:
+                        self.stats["failures"] += 1
+                        logger.exception("Could not sync %d %s rows to the search index; requeued.",
+                                         len(batch), model.__name__)
+                        with self._lock:
+                            self._pending[model].update(batch)
+            return sent
+
+    def actions(self, model, pks):
+        index = DOCUMENTS[model][0]
+        rows = model.objects.all()
+        if model is Flight:
+            rows = rows.select_related(*FLIGHT_RELATIONS)
+        found = rows.in_bulk(pks)
+        return [(index, pk, document(found[pk]) if pk in found else None) for pk in pks]
+
+    def send(self, model, pks):
+        actions = self.actions(model, pks)
+        for attempt in range(self.retries + 1):
+            try:
+                self.backend.bulk(actions)
+                break
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self.stats["retries"] += 1
+                time.sleep(self.retry_backoff * 2 ** attempt)
+        self.stats["batches"] += 1
+        self.stats["actions"] += len(actions)
+        return len(actions)
+
+
+def build_index_sync():
+    config = getattr(settings, "SEARCH_INDEX_SYNC", {})
+    backend_name = config.get("BACKEND")
+    if backend_name == "memory":
+        backend = MemoryIndexBackend()
+    elif backend_name == "file":
+        backend = FileIndexBackend(config["PATH"])
+    elif backend_name == "elasticsearch":
+        backend = ElasticsearchIndexBackend(config["HOSTS"], index_prefix=config.get("INDEX_PREFIX", ""),
+                                            **config.get("OPTIONS", {}))
+    elif backend_name is None:
+        return None
+    else:
+        raise Exception(f"Unknown SEARCH_INDEX_SYNC backend: {backend_name}.")
+    return IndexSyncQueue(
+        backend,
+        batch_size=config.get("BATCH_SIZE", 500),
+        retries=config.get("RETRIES", 3),
+        retry_backoff=config.get("RETRY_BACKOFF", 0.5),
+        flush_interval=config.get("FLUSH_INTERVAL", 1.0),
+    )
+
+
+# Shared instance (None when no backend is configured)
+index_sync = build_index_sync()
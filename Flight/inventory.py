@@ -0,0 +1,110 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from Flight.models import Flight, HoldStatus, SeatHold
+
+HELD, CONFIRMED, RELEASED, EXPIRED = (status.name for status in HoldStatus)
+
+
+def limits():
+    config = getattr(settings, "SEAT_HOLDS", {})
+    return config.get("TTL", 900), config.get("MAX_SEATS", 9), config.get("SWEEP_BATCH_SIZE", 1000)
+
+
+def take_seats(flight_id, seats):
+    """
+    Take ``seats`` from the flight if that many are left, in one conditional
+    ``UPDATE``; the row lock it takes serializes concurrent holders, and each
+    re-checks the condition against the committed count. Return whether it did.
+    """
+    return bool(Flight.objects.filter(pk=flight_id, seats_available__gte=seats)
+                .update(seats_available=F("seats_available") - seats))
+
+
+def give_back(seats_by_flight):
+    """Return seats to their flights with one ``UPDATE``: {flight id: seats}."""
+    if not seats_by_flight:
+        return
+    Flight.objects.filter(pk__in=seats_by_flight).update(seats_available=F("seats_available") + Case(
+        *[When(pk=pk, then=Value(seats)) for pk, seats in seats_by_flight.items()],
+        default=Value(0), output_field=IntegerField(),
+    ))
+
+
+def hold(flight_number, seats, ttl=None):
+    """Hold ``seats`` on the flight for ``ttl`` seconds (default ``SEAT_HOLDS["TTL"]``)."""
+    default_ttl, max_seats, _ = limits()
+    if not 1 <= seats <= max_seats:
+        raise Exception(f"seats must be between 1 and {max_seats}.")
+    flight = Flight.objects.filter(flight_number=flight_number).only("pk", "flight_number").first()
+    if flight is None:
+        raise Exception("Flight with this number does not exist.")
+    with transaction.atomic():
+        # Holds that lapsed but were not swept yet still count against the flight; reclaim them first
+        if not take_seats(flight.pk, seats) and not (sweep(flight_id=flight.pk) and take_seats(flight.pk, seats)):
+            raise Exception("Not enough seats available.")
+        expires_at = timezone.now() + timedelta(seconds=default_ttl if ttl is None else ttl)
+        return SeatHold.objects.create(flight=flight, seats=seats, expires_at=expires_at)
+
+
+def refused(token, action):
+    # Why a conditional update on the hold matched nothing
+    current = SeatHold.objects.filter(token=token).first()
+    if current is None:
+        return Exception("Seat hold with this token does not exist.")
+    if current.status == HELD:  # Lapsed, not yet swept
+        return Exception(f"Cannot {action} an expired seat hold.")
+    return Exception(f"Cannot {action} a seat hold that is {HoldStatus[current.status].value.lower()}.")
+
+
+def confirm(token):
+    """Make a held, unexpired hold permanent; its seats stay taken."""
+    holds = SeatHold.objects.filter(token=token, status=HELD, expires_at__gt=timezone.now())
+    if not holds.update(status=CONFIRMED):
+        raise refused(token, "confirm")
+    return SeatHold.objects.select_related("flight").get(token=token)
+
+
+def release(token):
+    """Give the seats of a held or confirmed hold back to its flight."""
+    with transaction.atomic():
+        # Claiming the hold first means only one of several concurrent releases gives the seats back
+        if not SeatHold.objects.filter(token=token, status__in=[HELD, CONFIRMED]).update(status=RELEASED):
+            raise refused(token, "release")
+        released = SeatHold.objects.select_related("flight").get(token=token)
+        give_back({released.flight_id: released.seats})
+    return released
+
+
+def sweep(now=None, flight_id=None):
+    """
+    Expire the held holds past their ``expires_at`` and give their seats back,
+    ``SEAT_HOLDS["SWEEP_BATCH_SIZE"]`` holds per transaction of three
+    statements; return the number of holds expired. Locked holds (being
+    confirmed or released right now) are skipped.
+    """
+    now = timezone.now() if now is None else now
+    _, _, batch_size = limits()
+    holds = SeatHold.objects.filter(status=HELD, expires_at__lte=now)
+    if flight_id is not None:
+        holds = holds.filter(flight_id=flight_id)
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(holds.select_for_update(skip_locked=True).order_by("id")
+                         .values_list("id", "flight_id", "seats")[:batch_size])
+            if not batch:
+                return expired
+            SeatHold.objects.filter(pk__in=[pk for pk, _, _ in batch]).update(status=EXPIRED)
+            seats_by_flight = Counter()
+            for _, flight, seats in batch:
+                seats_by_flight[flight] += seats
+            give_back(seats_by_flight)
+        expired += len(batch)
+        if len(batch) < batch_size:
+            return expired
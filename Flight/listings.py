@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import Q
+
+from Flight import fares
+from Flight.models import Aircraft, Airline, Airport, Flight, FlightListing
+
+# FlightListing column -> the Flight lookup it is copied from
+COLUMNS = {
+    "flight_id": "id",
+    "flight_number": "flight_number",
+    "departure_airport_code": "departure_airport__airport_code",
+    "departure_city": "departure_airport__airport_city",
+    "arrival_airport_code": "arrival_airport__airport_code",
+    "arrival_city": "arrival_airport__airport_city",
+    "airline_code": "airline__airline_code",
+    "aircraft_capacity": "aircraft__aircraft_capacity",
+    "cabin_type": "cabin_type",
+    "departure_datetime": "departure_datetime",
+    "arrival_datetime": "arrival_datetime",
+    "final_price": "final_price",
+}
+UPDATE_FIELDS = [column for column in COLUMNS if column != "flight_id"] + ["duration_minutes"]
+# Referenced model -> the Flight foreign keys pointing at it
+REFERENCES = {
+    Airport: ("departure_airport", "arrival_airport"),
+    Airline: ("airline",),
+    Aircraft: ("aircraft",),
+}
+BATCH_SIZE = 1000
+
+
+def listings(flights):
+    """Unsaved FlightListing rows for a Flight queryset, read with one joined query."""
+    for row in flights.values_list(*COLUMNS.values()).iterator(chunk_size=BATCH_SIZE):
+        values = dict(zip(COLUMNS, row))
+        duration = values["arrival_datetime"] - values["departure_datetime"]
+        yield FlightListing(duration_minutes=int(duration.total_seconds() // 60), **values)
+
+
+def sync_flights(pks):
+    """
+    Rewrite the listings of the given flights; drop those of flights that no
+    longer exist. The fare calendar days they left and joined are recomputed.
+    """
+    pks = sorted(set(pks))
+    for start in range(0, len(pks), BATCH_SIZE):
+        batch = pks[start:start + BATCH_SIZE]
+        changed = fares.keys(FlightListing.objects.filter(pk__in=batch))
+        rows = list(listings(Flight.objects.filter(pk__in=batch)))
+        if rows:
+            FlightListing.objects.bulk_create(rows, update_conflicts=True, unique_fields=["flight"],
+                                              update_fields=UPDATE_FIELDS)
+        gone = set(batch) - {row.flight_id for row in rows}
+        if gone:
+            FlightListing.objects.filter(pk__in=gone).only("pk").delete()
+        fares.refresh(changed | {fares.key(row) for row in rows})
+
+
+def remove_flights(pks):
+    changed = fares.keys(FlightListing.objects.filter(pk__in=pks))
+    if changed:
+        FlightListing.objects.filter(pk__in=pks).only("pk").delete()
+        fares.refresh(changed)
+
+
+def sync_references(model, pks):
+    """Rewrite the listings of the flights that reference the given airports, airlines or aircraft."""
+    condition = Q()
+    for field in REFERENCES[model]:
+        condition |= Q(**{f"{field}__in": pks})
+    sync_flights(Flight.objects.filter(condition).values_list("pk", flat=True))
+
+
+def rebuild():
+    """Recreate every listing, and the fare calendar, from the flights; return the number of listings."""
+    count = 0
+    with transaction.atomic():
+        FlightListing.objects.only("pk").delete()
+        batch = []
+        for listing in listings(Flight.objects.all()):
+            batch.append(listing)
+            if len(batch) == BATCH_SIZE:
+                FlightListing.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        FlightListing.objects.bulk_create(batch)
+        fares.rebuild()
+    return count + len(batch)
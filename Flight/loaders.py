@@ -0,0 +1,139 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from Flight.models import Airport, Airline, Aircraft
+
+
+def in_async_context():
+    """
+    True when running on an event loop, i.e. under the async GraphQL view, where
+    the sync ORM is off limits and resolvers return awaitables instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def sync_when_async(resolver):
+    """
+    Run a resolver built on the sync ORM (or CPU work such as the route graph)
+    on the request's sync thread when it is executed by the async view.
+    """
+    @wraps(resolver)
+    def wrapper(*args, **kwargs):
+        if in_async_context():
+            return sync_to_async(resolver)(*args, **kwargs)
+        return resolver(*args, **kwargs)
+    return wrapper
+
+
+class ModelLoader:
+    """
+    Per-request batch loader for a model, keyed by primary key.
+
+    List resolvers ``prime()`` the loader with every foreign key id of the rows
+    they return; the first ``load()`` then fetches all queued ids with a single
+    ``IN (...)`` query and every later ``load()`` is served from the cache.
+    """
+    def __init__(self, model):
+        self.model = model
+        self._cache = {}  # pk -> instance (None when the row does not exist)
+        self._queue = set()  # pks waiting for the next batch
+
+    def prime(self, keys):
+        # Queue keys so they are fetched together with the next load
+        self._queue.update(key for key in keys if key is not None and key not in self._cache)
+
+    def load(self, key):
+        if key is None:
+            return None
+        if key not in self._cache:
+            self._queue.add(key)
+            self._dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        self.prime(keys)
+        return [self.load(key) for key in keys]
+
+    def _dispatch(self):
+        # Fetch every queued key in one query
+        keys, self._queue = self._queue, set()
+        found = self.model.objects.in_bulk(keys)
+        for key in keys:
+            self._cache[key] = found.get(key)
+
+
+class AsyncModelLoader(ModelLoader):
+    """
+    ``ModelLoader`` for the async view: ``load()`` returns an awaitable, and every
+    load issued while the current batch is queued shares one query.
+    """
+    def __init__(self, model):
+        super().__init__(model)
+        self._pending = None  # Task fetching the current batch
+
+    async def load(self, key):
+        if key is None:
+            return None
+        while key not in self._cache:
+            self._queue.add(key)
+            if self._pending is None:
+                self._pending = asyncio.ensure_future(self._dispatch())
+            await self._pending
+        return self._cache[key]
+
+    async def load_many(self, keys):
+        self.prime(keys)
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    async def _dispatch(self):
+        try:
+            await asyncio.sleep(0)  # Let sibling resolvers queue their keys first
+            keys, self._queue = self._queue, set()
+            found = {instance.pk: instance async for instance in self.model.objects.filter(pk__in=keys)}
+            for key in keys:
+                self._cache[key] = found.get(key)
+        finally:
+            self._pending = None
+
+
+class Loaders:
+    """The set of loaders shared by all resolvers of one GraphQL request."""
+    def __init__(self, asynchronous=False):
+        loader_class = AsyncModelLoader if asynchronous else ModelLoader
+        self.airports = loader_class(Airport)
+        self.airlines = loader_class(Airline)
+        self.aircrafts = loader_class(Aircraft)
+
+    def prime_flights(self, flights):
+        # Queue the foreign keys of a list of flights for batched loading,
+        # skipping the ones a projected queryset did not read
+        flights = list(flights)
+        if not flights:
+            return
+        deferred = flights[0].get_deferred_fields()
+        for attname, loader in (("departure_airport_id", self.airports), ("arrival_airport_id", self.airports),
+                                ("airline_id", self.airlines), ("aircraft_id", self.aircrafts)):
+            if attname not in deferred:
+                loader.prime({getattr(flight, attname) for flight in flights})
+
+
+def get_loaders(context):
+    """
+    Return the loaders attached to the GraphQL context, creating them on first use.
+
+    The context is the ``HttpRequest`` under ``/graphql/``, so the loaders (and
+    their cache) live exactly as long as one request.
+    """
+    if context is None:
+        return Loaders(asynchronous=in_async_context())
+    loaders = getattr(context, "loaders", None)
+    if loaders is None:
+        loaders = Loaders(asynchronous=in_async_context())
+        setattr(context, "loaders", loaders)
+    return loaders
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from Flight.archive import archive_flights
+
+
+class Command(BaseCommand):
+    help = "Move flights that departed long ago from the live table to the archive, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, required=True,
+                            help="Archive flights that departed more than this many days ago.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Flights moved per transaction.")
+
+    def handle(self, older_than, chunk_size=1000, **options):
+        if older_than < 0:
+            raise CommandError("--older-than must not be negative.")
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive.")
+        before = timezone.now() - timedelta(days=older_than)
+        moved = archive_flights(before, chunk_size=chunk_size,
+                                on_chunk=lambda moved: self.stdout.write(f"{moved} flights archived..."))
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} flights that departed before {before:%Y-%m-%d %H:%M}."))
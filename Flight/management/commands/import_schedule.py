@@ -0,0 +1,200 @@
+import csv
+import json
+import os
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Flight.models import Aircraft, Airline, Airport, Flight
+from Flight.signals import rows_changed
+
+
+class ScheduleImporter:
+    """
+    Upsert a stream of schedule rows into Flight, keyed on ``flight_number``.
+
+    Rows use the columns of the catalog export: airports and airlines by code
+    and aircraft by model. Each chunk of rows is validated as a whole and written
+    with one ``INSERT ... ON CONFLICT (flight_number) DO UPDATE`` in its own
+    transaction; rows that fail validation are handed to ``reject``.
+    """
+    # column -> (Flight field, {code: id} lookup name)
+    FOREIGN_KEYS = {
+        "departure_airport": ("departure_airport_id", "airports"),
+        "arrival_airport": ("arrival_airport_id", "airports"),
+        "airline": ("airline_id", "airlines"),
+        "aircraft": ("aircraft_id", "aircraft"),
+    }
+    FIELDS = ("flight_number", "flight_type", "trip_type", "cabin_type", "departure_datetime", "arrival_datetime",
+              "base_price", "tax", "discount", "baggage_limit_kg", "flight_rules")
+    UPDATE_FIELDS = [*FIELDS[1:], "departure_airport", "arrival_airport", "airline", "aircraft", "final_price"]
+
+    def __init__(self, reject, chunk_size=2000):
+        self.reject = reject
+        self.chunk_size = chunk_size
+        self.created = self.updated = self.rejected = 0
+        # Every code is resolved from memory; these are the only lookups the import makes
+        aircraft = list(Aircraft.objects.values_list("aircraft_model", "id", "aircraft_capacity"))
+        self.lookups = {
+            "airports": dict(Airport.objects.values_list("airport_code", "id")),
+            "airlines": dict(Airline.objects.values_list("airline_code", "id")),
+            "aircraft": {model: pk for model, pk, _ in aircraft},
+        }
+        self.capacities = {pk: capacity for _, pk, capacity in aircraft}
+
+    def run(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+
+    def build(self, row):
+        """The unsaved Flight for ``row``, or raise ValidationError."""
+        # Empty cells count as missing, so model defaults apply
+        data = {field: row[field] for field in self.FIELDS if row.get(field) not in (None, "")}
+        errors = {}
+        for column, (attname, lookup) in self.FOREIGN_KEYS.items():
+            code = row.get(column)
+            if code in (None, ""):
+                errors[column] = ["This field is required."]
+            elif code not in self.lookups[lookup]:
+                errors[column] = [f"Unknown code {code}."]
+            else:
+                data[attname] = self.lookups[lookup][code]
+        flight = Flight(**data)
+        # New flights start with the aircraft's seats; the upsert leaves the inventory of existing ones alone
+        flight.fill_seats(capacity=self.capacities.get(data.get("aircraft_id"), 0))
+        try:
+            flight.full_clean(exclude=[*self.FOREIGN_KEYS, "final_price"], validate_unique=False,
+                              validate_constraints=False)
+        except ValidationError as error:
+            errors.update(error.message_dict)
+        if errors:
+            raise ValidationError(errors)
+        flight.final_price = flight.final_price_calculated  # bulk_create() bypasses save()
+        return flight
+
+    def import_chunk(self, rows):
+        flights = {}
+        for row in rows:
+            if "error" in row:  # Could not even be parsed
+                self.rejected += 1
+                self.reject(row["row"], row["error"])
+                continue
+            try:
+                flight = self.build(row)
+            except ValidationError as error:
+                self.rejected += 1
+                self.reject(row, error.message_dict)
+                continue
+            # A later row for the same flight number replaces an earlier one
+            flights[flight.flight_number] = flight
+        if not flights:
+            return
+
+        flights = list(flights.values())
+        with transaction.atomic():
+            existing = set(Flight.objects.filter(flight_number__in=[flight.flight_number for flight in flights])
+                           .values_list("flight_number", flat=True))
+            Flight.objects.bulk_create(flights, update_conflicts=True, unique_fields=["flight_number"],
+                                       update_fields=self.UPDATE_FIELDS)
+            if any(flight.pk is None for flight in flights):
+                # Backends that do not return ids from an upsert
+                ids = dict(Flight.objects.filter(flight_number__in=[flight.flight_number for flight in flights])
+                           .values_list("flight_number", "id"))
+                for flight in flights:
+                    flight.pk = ids[flight.flight_number]
+            # In the chunk's transaction, so the listings and fare calendar commit (or fail) with the flights
+            rows_changed.send(sender=Flight, saved=flights)
+        self.updated += len(existing)
+        self.created += len(flights) - len(existing)
+
+
+def read_csv(handle):
+    yield from csv.DictReader(handle)
+
+
+def read_ndjson(handle):
+    for number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield {"error": {"line": [f"Line {number} is not valid JSON: {error}"]}, "row": {"line": line.rstrip("\n")}}
+            continue
+        if not isinstance(row, dict):
+            yield {"error": {"line": [f"Line {number} is not a JSON object."]}, "row": {"line": line.rstrip("\n")}}
+            continue
+        # NDJSON carries numbers as numbers; validation expects them like CSV cells
+        yield {key: value if value is None or isinstance(value, str) else str(value) for key, value in row.items()}
+
+
+class Command(BaseCommand):
+    help = "Import (create or update) flights from a CSV or NDJSON schedule file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Schedule file, or - for standard input.")
+        parser.add_argument("--format", choices=["csv", "ndjson"],
+                            help="File format (default: from the file extension).")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows per transaction.")
+        parser.add_argument("--rejects", help="File for rejected rows (default: <path>.rejected.<format>).")
+
+    def handle(self, path, format=None, chunk_size=2000, rejects=None, **options):
+        if format is None:
+            extension = os.path.splitext(path)[1].lstrip(".").lower()
+            format = "ndjson" if extension in ("ndjson", "jsonl") else "csv" if extension == "csv" else None
+            if format is None:
+                raise CommandError("Cannot tell the format from the file name; pass --format.")
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive.")
+        if rejects is None:
+            rejects = f"{'schedule' if path == '-' else path}.rejected.{format}"
+
+        handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            with open(rejects, "w", newline="", encoding="utf-8") as rejects_file:
+                reject = self.reject_writer(rejects_file, format)
+                importer = ScheduleImporter(reject, chunk_size=chunk_size)
+                started = time.perf_counter()
+                importer.run(read_csv(handle) if format == "csv" else read_ndjson(handle))
+                elapsed = time.perf_counter() - started
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        total = importer.created + importer.updated + importer.rejected
+        if not importer.rejected:
+            os.remove(rejects)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.created + importer.updated} of {total} rows "
+            f"({importer.created} created, {importer.updated} updated, {importer.rejected} rejected) "
+            f"in {elapsed:.2f}s, {total / elapsed if elapsed else 0:.0f} rows/s."
+        ))
+        if importer.rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected rows written to {rejects}."))
+
+    @staticmethod
+    def reject_writer(rejects_file, format):
+        if format == "ndjson":
+            def reject(row, errors):
+                rejects_file.write(json.dumps(dict(row, error=errors), ensure_ascii=False) + "\n")
+            return reject
+
+        writer = None
+
+        def reject(row, errors):
+            nonlocal writer
+            if writer is None:
+                # Same columns as the input, plus the reason
+                writer = csv.DictWriter(rejects_file, fieldnames=[*row, "error"], extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow(dict(row, error=json.dumps(errors, ensure_ascii=False)))
+        return reject
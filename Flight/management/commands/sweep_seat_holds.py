@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Flight import inventory
+
+
+class Command(BaseCommand):
+    help = "Expire the seat holds past their expiry and give their seats back to the flights."
+
+    def handle(self, **options):
+        expired = inventory.sweep()
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} seat holds."))
@@ -0,0 +1,252 @@
+import bisect
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import isawaitable
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from graphene.types.resolver import dict_or_attr_resolver
+from graphene_django.types import DjangoObjectType
+
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Histogram:
+    """
+    A labelled Prometheus histogram kept in process: one list of bucket counts
+    plus a sum and a count per label set, updated under a lock.
+    """
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, labels):
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), values[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {values[-1]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Timing:
+    """Queries and database time of one operation or one resolver call."""
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# The operation being recorded (None when the request is not sampled) and the resolver running
+_operation = ContextVar("graphql_metrics_operation", default=None)
+_resolver = ContextVar("graphql_metrics_resolver", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """``connection.execute_wrappers`` hook charging each query to the active operation and resolver."""
+    operation = _operation.get()
+    if operation is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for timing in (operation, _resolver.get()):
+            if timing is not None:
+                timing.queries += 1
+                timing.db_time += elapsed
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_on_new_connection(sender, connection, **kwargs):
+    install(connection)
+
+
+class GraphQLMetrics:
+    """
+    Per-operation and per-resolver wall time, query count and database time.
+
+    Histograms live in the worker process and are exposed by ``/metrics``; with
+    several workers, Prometheus scrapes (or the deployment aggregates) each one.
+    A ``sample_rate`` below 1 records that fraction of requests only.
+    """
+    def __init__(self, enabled=True, sample_rate=1.0, max_operations=200):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_operations = max_operations
+        self._operation_names = set()
+        self.operation_duration = Histogram(
+            "graphql_operation_duration_seconds", "Wall time of GraphQL operations.",
+            ("operation", "kind"), TIME_BUCKETS)
+        self.operation_queries = Histogram(
+            "graphql_operation_db_queries", "Database queries per GraphQL operation.",
+            ("operation", "kind"), QUERY_BUCKETS)
+        self.operation_db_duration = Histogram(
+            "graphql_operation_db_duration_seconds", "Database time of GraphQL operations.",
+            ("operation", "kind"), TIME_BUCKETS)
+        self.resolver_duration = Histogram(
+            "graphql_resolver_duration_seconds", "Wall time of GraphQL resolvers.",
+            ("type", "field"), TIME_BUCKETS)
+        self.resolver_queries = Histogram(
+            "graphql_resolver_db_queries", "Database queries run inside GraphQL resolvers.",
+            ("type", "field"), QUERY_BUCKETS)
+        self.resolver_db_duration = Histogram(
+            "graphql_resolver_db_duration_seconds", "Database time of GraphQL resolvers.",
+            ("type", "field"), TIME_BUCKETS)
+        self.histograms = (self.operation_duration, self.operation_queries, self.operation_db_duration,
+                           self.resolver_duration, self.resolver_queries, self.resolver_db_duration)
+
+    def operation_label(self, name):
+        # Operation names come from clients; cap how many distinct ones become series
+        name = name or "anonymous"
+        if name not in self._operation_names:
+            if len(self._operation_names) >= self.max_operations:
+                return "other"
+            self._operation_names.add(name)
+        return name
+
+    @contextmanager
+    def record_operation(self, name, kind):
+        """Record the operation run inside the block, if this request is sampled."""
+        if not self.enabled or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            yield
+            return
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        timing = Timing()
+        token = _operation.set(timing)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _operation.reset(token)
+            labels = (self.operation_label(name), kind)
+            self.operation_duration.observe(labels, elapsed)
+            self.operation_queries.observe(labels, timing.queries)
+            self.operation_db_duration.observe(labels, timing.db_time)
+
+    def observe_resolver(self, labels, elapsed, timing):
+        self.resolver_duration.observe(labels, elapsed)
+        self.resolver_queries.observe(labels, timing.queries)
+        self.resolver_db_duration.observe(labels, timing.db_time)
+
+    def render(self):
+        gauge = ("# HELP graphql_metrics_sample_rate Fraction of requests recorded.\n"
+                 "# TYPE graphql_metrics_sample_rate gauge\n"
+                 f"graphql_metrics_sample_rate {self.sample_rate}")
+        return "\n".join([*(histogram.render() for histogram in self.histograms), gauge]) + "\n"
+
+    def clear(self):
+        self._operation_names.clear()
+        for histogram in self.histograms:
+            histogram.clear()
+
+
+def _is_trivial(field):
+    # Plain attribute reads are not worth timing; they would only add overhead
+    resolve = field.resolve
+    return (resolve is None or getattr(resolve, "func", None) is dict_or_attr_resolver
+            or resolve is DjangoObjectType.resolve_id)
+
+
+class MetricsMiddleware:
+    """
+    Graphene middleware timing every resolver that does real work (root fields
+    and custom ``resolve_*`` methods) of the operations ``GraphQLMetrics`` records.
+    Queries a resolver's result runs after it returned (a lazy queryset) count
+    toward the operation only.
+    """
+    def __init__(self):
+        self._trivial = {}  # (type, field) -> bool
+
+    def resolve(self, next, root, info, **args):
+        if _operation.get() is None:
+            return next(root, info, **args)
+        labels = (info.parent_type.name, info.field_name)
+        trivial = self._trivial.get(labels)
+        if trivial is None:
+            trivial = self._trivial[labels] = _is_trivial(info.parent_type.fields[info.field_name])
+        if trivial:
+            return next(root, info, **args)
+
+        timing = Timing()
+        token = _resolver.set(timing)
+        start = time.perf_counter()
+        try:
+            result = next(root, info, **args)
+        except Exception:
+            metrics.observe_resolver(labels, time.perf_counter() - start, timing)
+            raise
+        finally:
+            _resolver.reset(token)
+        if isawaitable(result):
+            return self._await(result, labels, timing, start)
+        metrics.observe_resolver(labels, time.perf_counter() - start, timing)
+        return result
+
+    @staticmethod
+    async def _await(result, labels, timing, start):
+        token = _resolver.set(timing)
+        try:
+            return await result
+        finally:
+            _resolver.reset(token)
+            metrics.observe_resolver(labels, time.perf_counter() - start, timing)
+
+
+def build_metrics():
+    config = getattr(settings, "GRAPHQL_METRICS", {})
+    return GraphQLMetrics(
+        enabled=config.get("ENABLED", True),
+        sample_rate=config.get("SAMPLE_RATE", 1.0),
+        max_operations=config.get("MAX_OPERATIONS", 200),
+    )
+
+
+# Shared instance
+metrics = build_metrics()
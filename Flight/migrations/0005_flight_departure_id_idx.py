@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-17 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Flight', '0004_alter_flight_cabin_type_alter_flight_flight_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_datetime', 'id'], name='flight_departure_id_idx'),
+        ),
+    ]
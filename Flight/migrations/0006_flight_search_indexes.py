@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-17 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Flight', '0005_flight_departure_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_airport', 'arrival_airport', 'departure_datetime'], name='flight_route_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_airport', 'departure_datetime', 'final_price'], name='flight_origin_dep_price_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:02
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Flight', '0006_flight_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommandHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=100)),
+                ('command', models.CharField(max_length=50)),
+                ('state', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('undone', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'undone', 'id'], name='history_scope_stack_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_listings(apps, schema_editor):
+    # Same rows as Flight.listings.rebuild(), with the historical models
+    Flight = apps.get_model('Flight', 'Flight')
+    FlightListing = apps.get_model('Flight', 'FlightListing')
+    columns = ('id', 'flight_number', 'departure_airport__airport_code', 'departure_airport__airport_city',
+               'arrival_airport__airport_code', 'arrival_airport__airport_city', 'airline__airline_code',
+               'aircraft__aircraft_capacity', 'cabin_type', 'departure_datetime', 'arrival_datetime', 'final_price')
+    batch = []
+    for (pk, number, origin, origin_city, destination, destination_city, airline, capacity, cabin, departure,
+         arrival, price) in Flight.objects.values_list(*columns).iterator(chunk_size=1000):
+        batch.append(FlightListing(
+            flight_id=pk, flight_number=number, departure_airport_code=origin, departure_city=origin_city,
+            arrival_airport_code=destination, arrival_city=destination_city, airline_code=airline,
+            aircraft_capacity=capacity, cabin_type=cabin, departure_datetime=departure, arrival_datetime=arrival,
+            duration_minutes=int((arrival - departure).total_seconds() // 60), final_price=price,
+        ))
+        if len(batch) == 1000:
+            FlightListing.objects.bulk_create(batch)
+            batch = []
+    FlightListing.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Flight', '0007_command_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightListing',
+            fields=[
+                ('flight', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='listing', serialize=False, to='Flight.flight')),
+                ('flight_number', models.CharField(max_length=50)),
+                ('departure_airport_code', models.CharField(max_length=10)),
+                ('departure_city', models.CharField(max_length=255)),
+                ('arrival_airport_code', models.CharField(max_length=10)),
+                ('arrival_city', models.CharField(max_length=255)),
+                ('airline_code', models.CharField(max_length=10)),
+                ('aircraft_capacity', models.IntegerField()),
+                ('cabin_type', models.CharField(max_length=20)),
+                ('departure_datetime', models.DateTimeField()),
+                ('arrival_datetime', models.DateTimeField()),
+                ('duration_minutes', models.IntegerField()),
+                ('final_price', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['departure_airport_code', 'arrival_airport_code', 'departure_datetime', 'flight'], name='listing_route_departure_idx'), models.Index(fields=['departure_airport_code', 'departure_datetime', 'flight'], name='listing_origin_departure_idx'), models.Index(fields=['departure_airport_code', 'final_price'], name='listing_origin_price_idx')],
+            },
+        ),
+        migrations.RunPython(fill_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:11
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+def fill_seats(apps, schema_editor):
+    # Existing flights start with every seat of their aircraft available
+    Flight = apps.get_model('Flight', 'Flight')
+    Aircraft = apps.get_model('Flight', 'Aircraft')
+    capacity = models.Subquery(Aircraft.objects.filter(pk=models.OuterRef('aircraft_id')).values('aircraft_capacity'))
+    Flight.objects.update(seats_total=capacity)
+    Flight.objects.update(seats_available=models.F('seats_total'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Flight', '0008_flight_listing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('seats', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('HELD', 'Held'), ('CONFIRMED', 'Confirmed'), ('RELEASED', 'Released'), ('EXPIRED', 'Expired')], default='HELD', max_length=10)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='seats_available',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='seats_total',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_seats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='flight',
+            constraint=models.CheckConstraint(condition=models.Q(('seats_available__gte', 0), ('seats_available__lte', models.F('seats_total'))), name='flight_seats_available_range'),
+        ),
+        migrations.AddField(
+            model_name='seathold',
+            name='flight',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to='Flight.flight'),
+        ),
+        migrations.AddIndex(
+            model_name='seathold',
+            index=models.Index(fields=['status', 'expires_at'], name='seat_hold_status_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:15
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def fill_calendar(apps, schema_editor):
+    # Same rows as Flight.fares.rebuild(), with the historical models
+    FlightListing = apps.get_model('Flight', 'FlightListing')
+    FareCalendarDay = apps.get_model('Flight', 'FareCalendarDay')
+    rows = (FlightListing.objects.annotate(day=TruncDate('departure_datetime'))
+            .values('departure_airport_code', 'arrival_airport_code', 'cabin_type', 'day')
+            .annotate(min_price=models.Min('final_price'), flights=models.Count('pk')).order_by())
+    FareCalendarDay.objects.bulk_create([FareCalendarDay(**row) for row in rows.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Flight', '0009_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FareCalendarDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departure_airport_code', models.CharField(max_length=10)),
+                ('arrival_airport_code', models.CharField(max_length=10)),
+                ('cabin_type', models.CharField(max_length=20)),
+                ('day', models.DateField()),
+                ('min_price', models.BigIntegerField()),
+                ('flights', models.IntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('departure_airport_code', 'arrival_airport_code', 'cabin_type', 'day'), name='fare_calendar_key')],
+            },
+        ),
+        migrations.RunPython(fill_calendar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Flight', '0010_fare_calendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedFlight',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('cabin_type', models.CharField(choices=[('ECONOMY', 'Economy'), ('BUSINESS', 'Business Class'), ('FIRST', 'First Class')], max_length=20)),
+                ('trip_type', models.CharField(choices=[('DIRECT', 'Direct'), ('INDIRECT', 'Indirect')], max_length=15)),
+                ('flight_type', models.CharField(choices=[('DOMESTIC', 'Domestic'), ('INTERNATIONAL', 'International')], max_length=15)),
+                ('flight_number', models.CharField(db_index=True, max_length=50)),
+                ('departure_datetime', models.DateTimeField()),
+                ('arrival_datetime', models.DateTimeField()),
+                ('base_price', models.BigIntegerField()),
+                ('tax', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('baggage_limit_kg', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('flight_rules', models.TextField()),
+                ('final_price', models.BigIntegerField()),
+                ('seats_total', models.IntegerField()),
+                ('seats_available', models.IntegerField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('aircraft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Flight.aircraft')),
+                ('airline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Flight.airline')),
+                ('arrival_airport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Flight.airport')),
+                ('departure_airport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Flight.airport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['departure_datetime', 'id'], name='archived_departure_id_idx'), models.Index(fields=['departure_airport', 'arrival_airport', 'departure_datetime'], name='archived_route_departure_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Flight', '0011_archived_flight'),
+    ]
+
+    operations = [
+        # The new indexes first, so the ones they replace are never missing
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['airline', 'departure_datetime', 'id'], name='flight_airline_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seathold',
+            index=models.Index(condition=models.Q(('status', 'HELD')), fields=['expires_at'], name='seat_hold_held_expiry_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='seathold',
+            name='seat_hold_status_expiry_idx',
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='airline',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='Flight.airline'),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='departure_airport',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='departures', to='Flight.airport'),
+        ),
+    ]
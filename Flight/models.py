@@ -1,5 +1,8 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from enum import Enum
+import uuid
 
 
 class FlightType(Enum):
@@ -18,6 +21,13 @@ class CabinType(Enum):
     FIRST = "First Class"
 
 
+class HoldStatus(Enum):
+    HELD = "Held"
+    CONFIRMED = "Confirmed"
+    RELEASED = "Released"
+    EXPIRED = "Expired"
+
+
 class Airline(models.Model):
     airline_name = models.CharField(max_length=255)
     airline_code = models.CharField(max_length=10, unique=True)
@@ -61,11 +71,14 @@ class Flight(models.Model):
         choices=[(tag.name, tag.value) for tag in FlightType]
     )
     flight_number = models.CharField(max_length=50, unique=True)  # شماره پرواز
-    departure_airport = models.ForeignKey('Airport', on_delete=models.CASCADE, related_name='departures')  # فرودگاه مبدا
+    # Indexed as the leading column of flight_route_departure_idx and flight_origin_dep_price_idx
+    departure_airport = models.ForeignKey('Airport', on_delete=models.CASCADE, related_name='departures',
+                                          db_index=False)  # فرودگاه مبدا
     arrival_airport = models.ForeignKey('Airport', on_delete=models.CASCADE, related_name='arrivals')  # فرودگاه مقصد
     departure_datetime = models.DateTimeField()  # تاریخ و ساعت تیکاف
     arrival_datetime = models.DateTimeField()  # تاریخ و ساعت لندینگ
-    airline = models.ForeignKey('Airline', on_delete=models.CASCADE)  # ایرلاین
+    # Indexed as the leading column of flight_airline_departure_idx
+    airline = models.ForeignKey('Airline', on_delete=models.CASCADE, db_index=False)  # ایرلاین
     aircraft = models.ForeignKey('Aircraft', on_delete=models.CASCADE)  # هواپیما
     base_price = models.BigIntegerField()  # قیمت پایه
     tax = models.DecimalField(max_digits=5, decimal_places=2, default=0)  # مالیات به صورت درصد
@@ -73,14 +86,49 @@ class Flight(models.Model):
     baggage_limit_kg = models.DecimalField(max_digits=10, decimal_places=2)  # میزان بار مجاز (کیلوگرم)
     flight_rules = models.TextField()  # قوانین و مقررات پرواز
     final_price = models.BigIntegerField()
+    seats_total = models.IntegerField()  # Seats sold on this flight (from the aircraft when created)
+    seats_available = models.IntegerField()  # Seats neither held nor confirmed (Flight/inventory.py)
+
+    class Meta:
+        constraints = [
+            # The conditional UPDATEs of Flight/inventory.py already keep to this; the database enforces it too
+            models.CheckConstraint(
+                condition=models.Q(seats_available__gte=0, seats_available__lte=models.F('seats_total')),
+                name='flight_seats_available_range'
+            ),
+        ]
+        indexes = [
+            # Sort key of the allFlights keyset pagination
+            models.Index(fields=['departure_datetime', 'id'], name='flight_departure_id_idx'),
+            # searchFlights: a route and a departure window
+            models.Index(fields=['departure_airport', 'arrival_airport', 'departure_datetime'],
+                         name='flight_route_departure_idx'),
+            # searchFlights: everything leaving an airport in a window, under a price
+            models.Index(fields=['departure_airport', 'departure_datetime', 'final_price'],
+                         name='flight_origin_dep_price_idx'),
+            # repriceFlights and the export filtered by airline: its flights in departure order
+            models.Index(fields=['airline', 'departure_datetime', 'id'], name='flight_airline_departure_idx'),
+        ]
 
     def __str__(self):
         return self.flight_number
 
     @property
     def capacity(self):
-        """Return Capacity From Aircraft"""
-        return self.aircraft.aircraft_capacity
+        """Return Capacity (copied from the Aircraft when the flight is created)"""
+        if self.seats_total is None:
+            return self.aircraft.aircraft_capacity
+        return self.seats_total
+
+    def fill_seats(self, capacity=None):
+        """
+        Start the seat inventory of a new flight at the aircraft's capacity,
+        for writes that bypass save().
+        """
+        if self.seats_total is None:
+            self.seats_total = self.aircraft.aircraft_capacity if capacity is None else capacity
+        if self.seats_available is None:
+            self.seats_available = self.seats_total
 
     @property
     def final_price_calculated(self):
@@ -96,4 +144,170 @@ class Flight(models.Model):
         Automatically calculate final price before saving the instance.
         """
         self.final_price = self.final_price_calculated  # محاسبه و ذخیره `final_price` در دیتابیس
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.fill_seats()
+        super().save(*args, **kwargs)
+
+
+class ArchivedFlight(models.Model):
+    """
+    A departed Flight moved out of the live table by ``manage.py archive_flights``
+    (Flight/archive.py): the same columns under the same id, plus when it was
+    archived. Only the history queries read it.
+    """
+    id = models.BigIntegerField(primary_key=True)  # The id the flight had while live
+    cabin_type = models.CharField(
+        max_length=20,
+        choices=[(tag.name, tag.value) for tag in CabinType]
+    )
+    trip_type = models.CharField(
+        max_length=15,
+        choices=[(tag.name, tag.value) for tag in TripType]
+    )
+    flight_type = models.CharField(
+        max_length=15,
+        choices=[(tag.name, tag.value) for tag in FlightType]
+    )
+    flight_number = models.CharField(max_length=50, db_index=True)  # Live flights may reuse the number
+    departure_airport = models.ForeignKey('Airport', on_delete=models.CASCADE, related_name='+')
+    arrival_airport = models.ForeignKey('Airport', on_delete=models.CASCADE, related_name='+')
+    departure_datetime = models.DateTimeField()
+    arrival_datetime = models.DateTimeField()
+    airline = models.ForeignKey('Airline', on_delete=models.CASCADE, related_name='+')
+    aircraft = models.ForeignKey('Aircraft', on_delete=models.CASCADE, related_name='+')
+    base_price = models.BigIntegerField()
+    tax = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    baggage_limit_kg = models.DecimalField(max_digits=10, decimal_places=2)
+    flight_rules = models.TextField()
+    final_price = models.BigIntegerField()
+    seats_total = models.IntegerField()
+    seats_available = models.IntegerField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Sort key of the flightHistory keyset pagination
+            models.Index(fields=['departure_datetime', 'id'], name='archived_departure_id_idx'),
+            # flightHistory: a route over a period
+            models.Index(fields=['departure_airport', 'arrival_airport', 'departure_datetime'],
+                         name='archived_route_departure_idx'),
+        ]
+
+    def __str__(self):
+        return self.flight_number
+
+
+class FlightListing(models.Model):
+    """
+    Denormalized copy of a Flight for search (Flight/listings.py): the codes
+    and cities of its airports, its airline code and aircraft capacity sit
+    next to the columns searches filter and sort on, so a search reads this
+    one table without joins. Kept in step with every write to the flight and
+    the rows it references.
+    """
+    flight = models.OneToOneField(Flight, on_delete=models.DO_NOTHING, primary_key=True, db_constraint=False,
+                                  related_name='listing')
+    flight_number = models.CharField(max_length=50)
+    departure_airport_code = models.CharField(max_length=10)
+    departure_city = models.CharField(max_length=255)
+    arrival_airport_code = models.CharField(max_length=10)
+    arrival_city = models.CharField(max_length=255)
+    airline_code = models.CharField(max_length=10)
+    aircraft_capacity = models.IntegerField()
+    cabin_type = models.CharField(max_length=20)
+    departure_datetime = models.DateTimeField()
+    arrival_datetime = models.DateTimeField()
+    duration_minutes = models.IntegerField()
+    final_price = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            # searchFlights: a route and a departure window, in keyset order
+            models.Index(fields=['departure_airport_code', 'arrival_airport_code', 'departure_datetime', 'flight'],
+                         name='listing_route_departure_idx'),
+            # searchFlights: everything leaving an airport in a window, in keyset order
+            models.Index(fields=['departure_airport_code', 'departure_datetime', 'flight'],
+                         name='listing_origin_departure_idx'),
+            # searchFlights: the cheapest flights leaving an airport
+            models.Index(fields=['departure_airport_code', 'final_price'], name='listing_origin_price_idx'),
+        ]
+
+    def __str__(self):
+        return self.flight_number
+
+
+class FareCalendarDay(models.Model):
+    """
+    Lowest ``final_price`` of a route and cabin on one departure day
+    (Flight/fares.py), recomputed from the listings whenever one of its
+    flights changes, so a month of fares is a single range read.
+    """
+    departure_airport_code = models.CharField(max_length=10)
+    arrival_airport_code = models.CharField(max_length=10)
+    cabin_type = models.CharField(max_length=20)
+    day = models.DateField()
+    min_price = models.BigIntegerField()
+    flights = models.IntegerField()  # Flights of the route and cabin that day
+
+    class Meta:
+        constraints = [
+            # Also the index of fareCalendar: a route and cabin over a month of days
+            models.UniqueConstraint(fields=['departure_airport_code', 'arrival_airport_code', 'cabin_type', 'day'],
+                                    name='fare_calendar_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.departure_airport_code}-{self.arrival_airport_code} {self.cabin_type} {self.day}"
+
+
+class SeatHold(models.Model):
+    """
+    Seats of a flight taken out of ``Flight.seats_available`` (Flight/inventory.py).
+
+    A ``HELD`` hold lapses at ``expires_at`` unless it is confirmed; the sweep
+    marks it ``EXPIRED`` and gives its seats back. Releasing a held or
+    confirmed hold gives them back too.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    flight = models.ForeignKey('Flight', on_delete=models.CASCADE, related_name='seat_holds')
+    seats = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=10,
+        choices=[(tag.name, tag.value) for tag in HoldStatus],
+        default=HoldStatus.HELD.name
+    )
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The sweep: only held holds, by expiry; confirmed and released ones never enter it
+            models.Index(fields=['expires_at'], condition=models.Q(status='HELD'), name='seat_hold_held_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_id}: {self.seats} {self.status}"
+
+
+class CommandHistory(models.Model):
+    """
+    One executed command of the undo/redo history (Flight/history.py).
+
+    ``state`` holds what the command needs to undo or redo itself, as field
+    values rather than model instances. Entries of a scope are ordered by id;
+    ``undone`` ones form the redo stack.
+    """
+    scope = models.CharField(max_length=100)  # "user:<id>" or "session:<key>"
+    command = models.CharField(max_length=50)  # Command class name
+    state = models.JSONField(encoder=DjangoJSONEncoder)
+    undone = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            # The top of a scope's undo or redo stack
+            models.Index(fields=['scope', 'undone', 'id'], name='history_scope_stack_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}: {self.command}"
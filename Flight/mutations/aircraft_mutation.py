@@ -1,11 +1,14 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
+from copy import copy
+from Flight.history import CommandHistoryHandler, HistoryCommand, dump_fields, dump_instance, load_fields, load_instance
 from Flight.models import Aircraft
+from Flight.signals import rows_changed
 import graphene
 from graphene_django.types import DjangoObjectType
 
 
 # Base Command class with abstract methods for execute and undo
-class AircraftCommand(ABC):
+class AircraftCommand(HistoryCommand):
     @abstractmethod
     def execute(self, **kwargs):
         pass
@@ -30,18 +33,38 @@ class CreateAircraftCommand(AircraftCommand):
             aircraft_capacity=aircraft_capacity,
             aircraft_manufacturer=aircraft_manufacturer
         )
+        rows_changed.send(sender=Aircraft, saved=[self.aircraft])
         return self.aircraft
 
     def undo(self):
         # Delete the created Aircraft
         if self.aircraft:
+            deleted = copy(self.aircraft)  # delete() clears the primary key observers need
             self.aircraft.delete()
+            rows_changed.send(sender=Aircraft, deleted=[deleted])
+
+    def redo(self):
+        return self.execute(
+            aircraft_model=self.aircraft.aircraft_model,
+            aircraft_capacity=self.aircraft.aircraft_capacity,
+            aircraft_manufacturer=self.aircraft.aircraft_manufacturer
+        )
+
+    def state(self):
+        return {"aircraft": dump_instance(self.aircraft)}
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.aircraft = load_instance(Aircraft, state["aircraft"])
+        return command
 
 
 # Command for updating an Aircraft
 class UpdateAircraftCommand(AircraftCommand):
     def __init__(self):
         self.previous_data = None  # To store the previous state for undo
+        self.changes = None  # To store the new state for redo
         self.aircraft = None
 
     def execute(self, aircraft_model, aircraft_capacity, aircraft_manufacturer):
@@ -55,7 +78,9 @@ class UpdateAircraftCommand(AircraftCommand):
             # Update the Aircraft
             self.aircraft.aircraft_capacity = aircraft_capacity
             self.aircraft.aircraft_manufacturer = aircraft_manufacturer
+            self.changes = {field: getattr(self.aircraft, field) for field in self.previous_data}
             self.aircraft.save()
+            rows_changed.send(sender=Aircraft, saved=[self.aircraft])
             return self.aircraft
         except Aircraft.DoesNotExist:
             raise Exception("Aircraft with this aircraft_model does not exist.")
@@ -66,6 +91,27 @@ class UpdateAircraftCommand(AircraftCommand):
             self.aircraft.aircraft_capacity = self.previous_data["aircraft_capacity"]
             self.aircraft.aircraft_manufacturer = self.previous_data["aircraft_manufacturer"]
             self.aircraft.save()
+            rows_changed.send(sender=Aircraft, saved=[self.aircraft])
+
+    def redo(self):
+        if self.aircraft is None:
+            raise Exception("Aircraft with this aircraft_model does not exist.")
+        return self.execute(aircraft_model=self.aircraft.aircraft_model, **self.changes)
+
+    def state(self):
+        return {
+            "aircraft_model": self.aircraft.aircraft_model,
+            "before": dump_fields(Aircraft, self.previous_data),
+            "after": dump_fields(Aircraft, self.changes),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.aircraft = Aircraft.objects.filter(aircraft_model=state["aircraft_model"]).first()
+        command.previous_data = load_fields(Aircraft, state["before"])
+        command.changes = load_fields(Aircraft, state["after"])
+        return command
 
 
 # Command for deleting an Aircraft
@@ -82,7 +128,9 @@ class DeleteAircraftCommand(AircraftCommand):
                 "aircraft_capacity": aircraft.aircraft_capacity,
                 "aircraft_manufacturer": aircraft.aircraft_manufacturer
             }
+            deleted = copy(aircraft)  # delete() clears the primary key observers need
             aircraft.delete()
+            rows_changed.send(sender=Aircraft, deleted=[deleted])
             return f"Aircraft {aircraft_model} deleted successfully."
         except Aircraft.DoesNotExist:
             raise Exception("Aircraft with this aircraft_model does not exist.")
@@ -90,48 +138,25 @@ class DeleteAircraftCommand(AircraftCommand):
     def undo(self):
         # Recreate the deleted Aircraft
         if self.deleted_data:
-            Aircraft.objects.create(**self.deleted_data)
+            aircraft = Aircraft.objects.create(**self.deleted_data)
+            rows_changed.send(sender=Aircraft, saved=[aircraft])
 
+    def redo(self):
+        return self.execute(aircraft_model=self.deleted_data["aircraft_model"])
 
-# Handler to manage Commands and Undo/Redo
-class AircraftCommandHandler:
-    def __init__(self):
-        self.undo_stack = []  # Stack to store executed Commands
-        self.redo_stack = []  # Stack to store undone Commands
+    def state(self):
+        return {"deleted": dump_fields(Aircraft, self.deleted_data)}
 
-    def execute(self, command, **kwargs):
-        # Execute the Command and store it in the undo stack
-        result = command.execute(**kwargs)
-        self.undo_stack.append(command)
-        self.redo_stack.clear()  # Clear redo stack since a new operation is performed
-        return result
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.deleted_data = load_fields(Aircraft, state["deleted"])
+        return command
 
-    def undo(self):
-        # Undo the last operation
-        if not self.undo_stack:
-            raise Exception("Nothing to undo.")
-        command = self.undo_stack.pop()
-        command.undo()
-        self.redo_stack.append(command)
 
-    def redo(self):
-        if not self.redo_stack:
-            raise Exception("Nothing to redo.")
-
-        command = self.redo_stack.pop()
-
-        # اضافه کردن آرگومان‌های مورد نیاز در صورت اجرای مجدد create
-        if isinstance(command, CreateAircraftCommand):
-            self.undo_stack.append(command)
-            return command.execute(
-                aircraft_model=command.aircraft.aircraft_model,
-                aircraft_capacity=command.aircraft.aircraft_capacity,
-                aircraft_manufacturer=command.aircraft.aircraft_manufacturer
-            )
-
-        result = command.execute()
-        self.undo_stack.append(command)
-        return result
+# Handler to manage Commands and Undo/Redo
+class AircraftCommandHandler(CommandHistoryHandler):
+    """Runs the Aircraft commands; undo and redo use the shared per-user history."""
 
 
 # GraphQL Type for Aircraft
@@ -1,10 +1,13 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
+from copy import copy
+from Flight.history import CommandHistoryHandler, HistoryCommand, dump_fields, dump_instance, load_fields, load_instance
 from Flight.models import Airline
+from Flight.signals import rows_changed
 import graphene
 from graphene_django.types import DjangoObjectType
 
 
-class AirlineCommand(ABC):
+class AirlineCommand(HistoryCommand):
     """Base Command class for Airline operations."""
     @abstractmethod
     def execute(self, **kwargs):
@@ -30,17 +33,38 @@ class CreateAirlineCommand(AirlineCommand):
             airline_rules=airline_rules,
             airline_logo=airline_logo
         )
+        rows_changed.send(sender=Airline, saved=[self.airline])
         return self.airline
 
     def undo(self):
         # Delete the created Airline
         if self.airline:
+            deleted = copy(self.airline)  # delete() clears the primary key observers need
             self.airline.delete()
+            rows_changed.send(sender=Airline, deleted=[deleted])
+
+    def redo(self):
+        return self.execute(
+            airline_name=self.airline.airline_name,
+            airline_code=self.airline.airline_code,
+            airline_rules=self.airline.airline_rules,
+            airline_logo=self.airline.airline_logo
+        )
+
+    def state(self):
+        return {"airline": dump_instance(self.airline)}
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.airline = load_instance(Airline, state["airline"])
+        return command
 
 
 class UpdateAirlineCommand(AirlineCommand):
     def __init__(self):
         self.previous_data = None  # To store the previous state for undo
+        self.changes = None  # To store the new state for redo
         self.airline = None
 
     def execute(self, airline_code, airline_name, airline_rules, airline_logo=None):
@@ -57,7 +81,9 @@ class UpdateAirlineCommand(AirlineCommand):
             self.airline.airline_rules = airline_rules
             if airline_logo:
                 self.airline.airline_logo = airline_logo
+            self.changes = {field: getattr(self.airline, field) for field in self.previous_data}
             self.airline.save()
+            rows_changed.send(sender=Airline, saved=[self.airline])
             return self.airline
         except Airline.DoesNotExist:
             raise Exception("Airline with this airline_code does not exist.")
@@ -69,6 +95,27 @@ class UpdateAirlineCommand(AirlineCommand):
             self.airline.airline_rules = self.previous_data["airline_rules"]
             self.airline.airline_logo = self.previous_data["airline_logo"]
             self.airline.save()
+            rows_changed.send(sender=Airline, saved=[self.airline])
+
+    def redo(self):
+        if self.airline is None:
+            raise Exception("Airline with this airline_code does not exist.")
+        return self.execute(airline_code=self.airline.airline_code, **self.changes)
+
+    def state(self):
+        return {
+            "airline_code": self.airline.airline_code,
+            "before": dump_fields(Airline, self.previous_data),
+            "after": dump_fields(Airline, self.changes),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.airline = Airline.objects.filter(airline_code=state["airline_code"]).first()
+        command.previous_data = load_fields(Airline, state["before"])
+        command.changes = load_fields(Airline, state["after"])
+        return command
 
 
 class DeleteAirlineCommand(AirlineCommand):
@@ -85,7 +132,9 @@ class DeleteAirlineCommand(AirlineCommand):
                 "airline_rules": airline.airline_rules,
                 "airline_logo": airline.airline_logo
             }
+            deleted = copy(airline)  # delete() clears the primary key observers need
             airline.delete()
+            rows_changed.send(sender=Airline, deleted=[deleted])
             return f"Airline {airline_code} deleted successfully."
         except Airline.DoesNotExist:
             raise Exception("Airline with this airline_code does not exist.")
@@ -93,49 +142,26 @@ class DeleteAirlineCommand(AirlineCommand):
     def undo(self):
         # Recreate the deleted Airline
         if self.deleted_data:
-            Airline.objects.create(**self.deleted_data)
+            airline = Airline.objects.create(**self.deleted_data)
+            rows_changed.send(sender=Airline, saved=[airline])
 
+    def redo(self):
+        return self.execute(airline_code=self.deleted_data["airline_code"])
 
-class AirlineCommandHandler:
-    def __init__(self):
-        self.undo_stack = []  # Stack to store executed Commands
-        self.redo_stack = []  # Stack to store undone Commands
+    def state(self):
+        return {"deleted": dump_fields(Airline, self.deleted_data)}
 
-    def execute(self, command, **kwargs):
-        # Execute the Command and store it in the undo stack
-        result = command.execute(**kwargs)
-        self.undo_stack.append(command)
-        self.redo_stack.clear()  # Clear redo stack since a new operation is performed
-        return result
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.deleted_data = load_fields(Airline, state["deleted"])
+        return command
+
+
+class AirlineCommandHandler(CommandHistoryHandler):
+    """Runs the Airline commands; undo and redo use the shared per-user history."""
 
-    def undo(self):
-        # Undo the last operation
-        if not self.undo_stack:
-            raise Exception("Nothing to undo.")
-        command = self.undo_stack.pop()
-        command.undo()
-        self.redo_stack.append(command)
 
-    def redo(self):
-        if not self.redo_stack:
-            raise Exception("Nothing to redo.")
-
-        command = self.redo_stack.pop()
-
-        if isinstance(command, CreateAirlineCommand):
-            self.undo_stack.append(command)
-            return command.execute(
-                airline_name=command.airline.airline_name,
-                airline_code=command.airline.airline_code,
-                airline_rules=command.airline.airline_rules,
-                airline_logo=command.airline.airline_logo
-            )
-
-        result = command.execute()
-        self.undo_stack.append(command)
-        return result
-        
-        
 # Define GraphQL Type for Airline
 class AirlineType(DjangoObjectType):
     class Meta:
@@ -1,10 +1,13 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
+from copy import copy
+from Flight.history import CommandHistoryHandler, HistoryCommand, dump_fields, dump_instance, load_fields, load_instance
 from Flight.models import Airport
+from Flight.signals import rows_changed
 import graphene
 from graphene_django.types import DjangoObjectType
 
 
-class AirportCommand(ABC):
+class AirportCommand(HistoryCommand):
     """Base Command class for Airport operations."""
     @abstractmethod
     def execute(self, **kwargs):
@@ -30,17 +33,38 @@ class CreateAirportCommand(AirportCommand):
             airport_city=airport_city,
             airport_country=airport_country
         )
+        rows_changed.send(sender=Airport, saved=[self.airport])
         return self.airport
 
     def undo(self):
         # Delete the created Airport
         if self.airport:
+            deleted = copy(self.airport)  # delete() clears the primary key observers need
             self.airport.delete()
+            rows_changed.send(sender=Airport, deleted=[deleted])
+
+    def redo(self):
+        return self.execute(
+            airport_code=self.airport.airport_code,
+            airport_name=self.airport.airport_name,
+            airport_city=self.airport.airport_city,
+            airport_country=self.airport.airport_country
+        )
+
+    def state(self):
+        return {"airport": dump_instance(self.airport)}
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.airport = load_instance(Airport, state["airport"])
+        return command
 
 
 class UpdateAirportCommand(AirportCommand):
     def __init__(self):
         self.previous_data = None  # To store the previous state for undo
+        self.changes = None  # To store the new state for redo
         self.airport = None
 
     def execute(self, airport_code, airport_name, airport_city, airport_country):
@@ -56,7 +80,9 @@ class UpdateAirportCommand(AirportCommand):
             self.airport.airport_name = airport_name
             self.airport.airport_city = airport_city
             self.airport.airport_country = airport_country
+            self.changes = {field: getattr(self.airport, field) for field in self.previous_data}
             self.airport.save()
+            rows_changed.send(sender=Airport, saved=[self.airport])
             return self.airport
         except Airport.DoesNotExist:
             raise Exception("Airport with this airport_code does not exist.")
@@ -68,6 +94,27 @@ class UpdateAirportCommand(AirportCommand):
             self.airport.airport_city = self.previous_data["airport_city"]
             self.airport.airport_country = self.previous_data["airport_country"]
             self.airport.save()
+            rows_changed.send(sender=Airport, saved=[self.airport])
+
+    def redo(self):
+        if self.airport is None:
+            raise Exception("Airport with this airport_code does not exist.")
+        return self.execute(airport_code=self.airport.airport_code, **self.changes)
+
+    def state(self):
+        return {
+            "airport_code": self.airport.airport_code,
+            "before": dump_fields(Airport, self.previous_data),
+            "after": dump_fields(Airport, self.changes),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.airport = Airport.objects.filter(airport_code=state["airport_code"]).first()
+        command.previous_data = load_fields(Airport, state["before"])
+        command.changes = load_fields(Airport, state["after"])
+        return command
 
 
 class DeleteAirportCommand(AirportCommand):
@@ -84,7 +131,9 @@ class DeleteAirportCommand(AirportCommand):
                 "airport_city": airport.airport_city,
                 "airport_country": airport.airport_country
             }
+            deleted = copy(airport)  # delete() clears the primary key observers need
             airport.delete()
+            rows_changed.send(sender=Airport, deleted=[deleted])
             return f"Airport {airport_code} deleted successfully."
         except Airport.DoesNotExist:
             raise Exception("Airport with this airport_code does not exist.")
@@ -92,49 +141,24 @@ class DeleteAirportCommand(AirportCommand):
     def undo(self):
         # Recreate the deleted Airport
         if self.deleted_data:
-            Airport.objects.create(**self.deleted_data)
+            airport = Airport.objects.create(**self.deleted_data)
+            rows_changed.send(sender=Airport, saved=[airport])
 
+    def redo(self):
+        return self.execute(airport_code=self.deleted_data["airport_code"])
 
-class AirportCommandHandler:
-    def __init__(self):
-        self.undo_stack = []  # Stack to store executed Commands
-        self.redo_stack = []  # Stack to store undone Commands
+    def state(self):
+        return {"deleted": dump_fields(Airport, self.deleted_data)}
 
-    def execute(self, command, **kwargs):
-        # Execute the Command and store it in the undo stack
-        result = command.execute(**kwargs)
-        self.undo_stack.append(command)
-        self.redo_stack.clear()  # Clear redo stack since a new operation is performed
-        return result
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.deleted_data = load_fields(Airport, state["deleted"])
+        return command
 
-    def undo(self):
-        # Undo the last operation
-        if not self.undo_stack:
-            raise Exception("Nothing to undo.")
-        command = self.undo_stack.pop()
-        command.undo()
-        self.redo_stack.append(command)
 
-    def redo(self):
-        # Redo the last undone operation
-        if not self.redo_stack:
-            raise Exception("Nothing to redo.")
-
-        command = self.redo_stack.pop()
-
-        # اگر دستور از نوع ایجاد باشد، باید مقادیر قبلی را پاس دهیم
-        if isinstance(command, CreateAirportCommand):
-            self.undo_stack.append(command)
-            return command.execute(
-                airport_code=command.airport.airport_code,
-                airport_name=command.airport.airport_name,
-                airport_city=command.airport.airport_city,
-                airport_country=command.airport.airport_country
-            )
-
-        result = command.execute()
-        self.undo_stack.append(command)
-        return result
+class AirportCommandHandler(CommandHistoryHandler):
+    """Runs the Airport commands; undo and redo use the shared per-user history."""
 
 
 # Define GraphQL Type for Airport
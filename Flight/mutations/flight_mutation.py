@@ -1,10 +1,21 @@
-from abc import ABC, abstractmethod
-from Flight.models import Flight
+from abc import abstractmethod
+from collections import Counter
+from copy import copy
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.db.models.functions import Cast, Mod, Round
+from django.db.models.lookups import Exact, GreaterThan
+from Flight.filters import filter_flights
+from Flight.history import CommandHistoryHandler, HistoryCommand, dump_fields, dump_instance, load_fields, load_instance
+from Flight.models import Flight, Airport, Airline, Aircraft
+from Flight.signals import reported_by_rows_changed, rows_changed
 import graphene
 from graphene_django.types import DjangoObjectType
 
 
-class FlightCommand(ABC):
+class FlightCommand(HistoryCommand):
     """Base Command class for Flight operations."""
     @abstractmethod
     def execute(self, **kwargs):
@@ -26,34 +37,68 @@ class CreateFlightCommand(FlightCommand):
         if Flight.objects.filter(flight_number=flight_number).exists():
             raise Exception("Flight with this number already exists.")
         # Create the Flight and store it for undo
-        self.flight = Flight.objects.create(
-            flight_number=flight_number,
-            flight_type=flight_type,
-            trip_type=trip_type,
-            departure_airport=departure_airport,
-            arrival_airport=arrival_airport,
-            departure_datetime=departure_datetime,
-            arrival_datetime=arrival_datetime,
-            airline=airline,
-            aircraft=aircraft,
-            cabin_type=cabin_type,
-            base_price=base_price,
-            tax=tax,
-            discount=discount,
-            baggage_limit_kg=baggage_limit_kg,
-            flight_rules=flight_rules
-        )
+        with reported_by_rows_changed():
+            self.flight = Flight.objects.create(
+                flight_number=flight_number,
+                flight_type=flight_type,
+                trip_type=trip_type,
+                departure_airport=departure_airport,
+                arrival_airport=arrival_airport,
+                departure_datetime=departure_datetime,
+                arrival_datetime=arrival_datetime,
+                airline=airline,
+                aircraft=aircraft,
+                cabin_type=cabin_type,
+                base_price=base_price,
+                tax=tax,
+                discount=discount,
+                baggage_limit_kg=baggage_limit_kg,
+                flight_rules=flight_rules
+            )
+        rows_changed.send(sender=Flight, saved=[self.flight])
         return self.flight
 
     def undo(self):
         # Delete the created Flight
         if self.flight:
-            self.flight.delete()
+            deleted = copy(self.flight)  # delete() clears the primary key observers need
+            with reported_by_rows_changed():
+                self.flight.delete()
+            rows_changed.send(sender=Flight, deleted=[deleted])
+
+    def redo(self):
+        return self.execute(
+            flight_number=self.flight.flight_number,
+            flight_type=self.flight.flight_type,
+            trip_type=self.flight.trip_type,
+            departure_airport=self.flight.departure_airport,
+            arrival_airport=self.flight.arrival_airport,
+            departure_datetime=self.flight.departure_datetime,
+            arrival_datetime=self.flight.arrival_datetime,
+            airline=self.flight.airline,
+            aircraft=self.flight.aircraft,
+            cabin_type=self.flight.cabin_type,
+            base_price=self.flight.base_price,
+            tax=self.flight.tax,
+            discount=self.flight.discount,
+            baggage_limit_kg=self.flight.baggage_limit_kg,
+            flight_rules=self.flight.flight_rules
+        )
+
+    def state(self):
+        return {"flight": dump_instance(self.flight)}
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.flight = load_instance(Flight, state["flight"])
+        return command
 
 
 class UpdateFlightCommand(FlightCommand):
     def __init__(self):
         self.previous_data = None  # To store the previous state for undo
+        self.changes = None  # To store the new state for redo
         self.flight = None
 
     def execute(self, flight_number, **kwargs):
@@ -66,7 +111,11 @@ class UpdateFlightCommand(FlightCommand):
             # Update the Flight
             for field, value in kwargs.items():
                 setattr(self.flight, field, value)
-            self.flight.save()
+            self.changes = kwargs
+            # Only the changed columns: writing the loaded seat counts back would undo holds taken meanwhile
+            with reported_by_rows_changed():
+                self.flight.save(update_fields=[*kwargs, "final_price"])
+            rows_changed.send(sender=Flight, saved=[self.flight])
             return self.flight
         except Flight.DoesNotExist:
             raise Exception("Flight with this number does not exist.")
@@ -76,7 +125,29 @@ class UpdateFlightCommand(FlightCommand):
         if self.flight and self.previous_data:
             for field, value in self.previous_data.items():
                 setattr(self.flight, field, value)
-            self.flight.save()
+            with reported_by_rows_changed():
+                self.flight.save(update_fields=[*self.previous_data, "final_price"])
+            rows_changed.send(sender=Flight, saved=[self.flight])
+
+    def redo(self):
+        if self.flight is None:
+            raise Exception("Flight with this number does not exist.")
+        return self.execute(flight_number=self.flight.flight_number, **self.changes)
+
+    def state(self):
+        return {
+            "flight_number": self.flight.flight_number,
+            "before": dump_fields(Flight, self.previous_data),
+            "after": dump_fields(Flight, self.changes),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.flight = Flight.objects.filter(flight_number=state["flight_number"]).first()
+        command.previous_data = load_fields(Flight, state["before"])
+        command.changes = load_fields(Flight, state["after"])
+        return command
 
 
 class DeleteFlightCommand(FlightCommand):
@@ -102,9 +173,13 @@ class DeleteFlightCommand(FlightCommand):
                 "tax": flight.tax,
                 "discount": flight.discount,
                 "baggage_limit_kg": flight.baggage_limit_kg,
-                "flight_rules": flight.flight_rules
+                "flight_rules": flight.flight_rules,
+                "seats_total": flight.seats_total
             }
-            flight.delete()
+            deleted = copy(flight)  # delete() clears the primary key observers need
+            with reported_by_rows_changed():
+                flight.delete()
+            rows_changed.send(sender=Flight, deleted=[deleted])
             return f"Flight {flight_number} deleted successfully."
         except Flight.DoesNotExist:
             raise Exception("Flight with this number does not exist.")
@@ -112,66 +187,383 @@ class DeleteFlightCommand(FlightCommand):
     def undo(self):
         # Recreate the deleted Flight
         if self.deleted_data:
-            Flight.objects.create(**self.deleted_data)
+            # Its seat holds were deleted with it, so every seat is free again (fill_seats)
+            data = {field: value for field, value in self.deleted_data.items() if field != "seats_available"}
+            with reported_by_rows_changed():
+                flight = Flight.objects.create(**data)
+            rows_changed.send(sender=Flight, saved=[flight])
+
+    def redo(self):
+        return self.execute(flight_number=self.deleted_data["flight_number"])
 
+    def state(self):
+        return {"deleted": dump_fields(Flight, self.deleted_data)}
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.deleted_data = load_fields(Flight, state["deleted"])
+        return command
+
+
+class BulkFlightCommand(FlightCommand):
+    """Base class for commands that write a whole batch of Flights as one undoable unit."""
+    MAX_BATCH_SIZE = 5000  # Largest batch accepted in one call
+    BATCH_SIZE = 500  # Rows per INSERT/UPDATE statement
 
-class FlightCommandHandler:
     def __init__(self):
-        self.undo_stack = []  # Stack to store executed Commands
-        self.redo_stack = []  # Stack to store undone Commands
+        self.arguments = None  # To replay the batch on redo
+
+    def check_batch_size(self, items):
+        if not items:
+            raise Exception("The batch is empty.")
+        if len(items) > self.MAX_BATCH_SIZE:
+            raise Exception(f"A batch may hold at most {self.MAX_BATCH_SIZE} flights.")
+
+    def redo(self):
+        return self.execute(**self.arguments)
+
 
-    def execute(self, command, **kwargs):
-        # Execute the Command and store it in the undo stack
-        result = command.execute(**kwargs)
-        self.undo_stack.append(command)
-        self.redo_stack.clear()  # Clear redo stack since a new operation is performed
-        return result
+class BulkCreateFlightCommand(BulkFlightCommand):
+    FOREIGN_KEYS = {
+        "departure_airport": Airport,
+        "arrival_airport": Airport,
+        "airline": Airline,
+        "aircraft": Aircraft,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.flights = []  # To store the created Flights for undo
+
+    def execute(self, flights):
+        self.arguments = {"flights": flights}
+        self.check_batch_size(flights)
+
+        # Validate the whole batch before writing anything
+        numbers = [item["flight_number"] for item in flights]
+        duplicates = sorted(number for number, count in Counter(numbers).items() if count > 1)
+        if duplicates:
+            raise Exception(f"Duplicate flight numbers in batch: {', '.join(duplicates)}.")
+        existing = sorted(Flight.objects.filter(flight_number__in=numbers).values_list("flight_number", flat=True))
+        if existing:
+            raise Exception(f"Flights with these numbers already exist: {', '.join(existing)}.")
+
+        # Resolve every foreign key id with one query per model; aircraft come with their capacity
+        found = {}
+        for model in set(self.FOREIGN_KEYS.values()):
+            ids = {item[field] for item in flights for field, fk_model in self.FOREIGN_KEYS.items() if fk_model is model}
+            rows = model.objects.filter(pk__in=ids)
+            if model is Aircraft:
+                found[model] = dict(rows.values_list("pk", "aircraft_capacity"))
+            else:
+                found[model] = set(rows.values_list("pk", flat=True))
+
+        instances, errors = [], []
+        for index, item in enumerate(flights):
+            data = dict(item)
+            for field, model in self.FOREIGN_KEYS.items():
+                if data[field] not in found[model]:
+                    errors.append(f"#{index} ({data['flight_number']}): {model.__name__} {data[field]} does not exist.")
+                data[f"{field}_id"] = data.pop(field)
+            flight = Flight(**data)
+            flight.fill_seats(capacity=found[Aircraft].get(flight.aircraft_id, 0))
+            try:
+                flight.full_clean(exclude=[*self.FOREIGN_KEYS, "final_price"], validate_unique=False,
+                                  validate_constraints=False)
+            except ValidationError as error:
+                errors.append(f"#{index} ({data['flight_number']}): {error.message_dict}")
+                continue
+            flight.final_price = flight.final_price_calculated  # bulk_create() bypasses save()
+            instances.append(flight)
+        if errors:
+            raise Exception("Invalid flights in batch: " + "; ".join(errors))
+
+        with transaction.atomic():
+            self.flights = Flight.objects.bulk_create(instances, batch_size=self.BATCH_SIZE)
+        rows_changed.send(sender=Flight, saved=self.flights)
+        return self.flights
 
     def undo(self):
-        # Undo the last operation
-        if not self.undo_stack:
-            raise Exception("Nothing to undo.")
-        command = self.undo_stack.pop()
-        command.undo()
-        self.redo_stack.append(command)
+        # Delete the created Flights with one statement
+        if self.flights:
+            with reported_by_rows_changed():
+                Flight.objects.filter(pk__in=[flight.pk for flight in self.flights]).delete()
+            rows_changed.send(sender=Flight, deleted=self.flights)
 
-    def redo(self):
-        # بررسی اینکه آیا عملیاتی برای بازگردانی وجود دارد
-        if not self.redo_stack:
-            raise Exception("Nothing to redo.")
-
-        command = self.redo_stack.pop()
-
-        # اگر دستور از نوع CreateFlightCommand باشد، باید آرگومان‌های ذخیره شده را ارسال کنیم
-        if isinstance(command, CreateFlightCommand):
-            self.undo_stack.append(command)
-            return command.execute(
-                flight_number=command.flight.flight_number,
-                flight_type=command.flight.flight_type,
-                trip_type=command.flight.trip_type,
-                departure_airport=command.flight.departure_airport,
-                arrival_airport=command.flight.arrival_airport,
-                departure_datetime=command.flight.departure_datetime,
-                arrival_datetime=command.flight.arrival_datetime,
-                airline=command.flight.airline,
-                aircraft=command.flight.aircraft,
-                cabin_type=command.flight.cabin_type,
-                base_price=command.flight.base_price,
-                tax=command.flight.tax,
-                discount=command.flight.discount,
-                baggage_limit_kg=command.flight.baggage_limit_kg,
-                flight_rules=command.flight.flight_rules
+    def state(self):
+        return {"arguments": self.arguments, "ids": [flight.pk for flight in self.flights]}
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.arguments = state["arguments"]
+        command.flights = [Flight(pk=pk) for pk in state["ids"]]
+        return command
+
+
+class BulkUpdateFlightCommand(BulkFlightCommand):
+    def __init__(self):
+        super().__init__()
+        self.previous_data = None  # flight pk -> previous values, for undo
+        self.flights = []
+
+    def execute(self, flights):
+        self.arguments = {"flights": flights}
+        self.check_batch_size(flights)
+
+        changes = {item["flight_number"]: {k: v for k, v in item.items() if k != "flight_number"} for item in flights}
+        found = Flight.objects.in_bulk(list(changes), field_name="flight_number")
+        missing = sorted(set(changes) - set(found))
+        if missing:
+            raise Exception(f"Flights with these numbers do not exist: {', '.join(missing)}.")
+
+        self.previous_data = {}
+        fields = {"final_price"}
+        for flight_number, values in changes.items():
+            flight = found[flight_number]
+            self.previous_data[flight.pk] = {field: getattr(flight, field) for field in values}
+            for field, value in values.items():
+                # Coerce to the stored type, so final_price is computed as a later save() would
+                setattr(flight, field, Flight._meta.get_field(field).to_python(value))
+            flight.final_price = flight.final_price_calculated  # bulk_update() bypasses save()
+            fields.update(values)
+        self.flights = list(found.values())
+
+        with transaction.atomic():
+            Flight.objects.bulk_update(self.flights, sorted(fields), batch_size=self.BATCH_SIZE)
+        rows_changed.send(sender=Flight, saved=self.flights)
+        return self.flights
+
+    def undo(self):
+        # Revert every Flight of the batch to its previous state
+        if self.flights and self.previous_data:
+            fields = {"final_price"}
+            for flight in self.flights:
+                for field, value in self.previous_data[flight.pk].items():
+                    setattr(flight, field, value)
+                    fields.add(field)
+                flight.final_price = flight.final_price_calculated
+            with transaction.atomic():
+                Flight.objects.bulk_update(self.flights, sorted(fields), batch_size=self.BATCH_SIZE)
+            rows_changed.send(sender=Flight, saved=self.flights)
+
+    def state(self):
+        return {
+            "arguments": self.arguments,
+            "before": {pk: dump_fields(Flight, values) for pk, values in self.previous_data.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.arguments = state["arguments"]
+        command.previous_data = {int(pk): load_fields(Flight, values) for pk, values in state["before"].items()}
+        command.flights = list(Flight.objects.filter(pk__in=command.previous_data))
+        return command
+
+
+class BulkDeleteFlightCommand(BulkFlightCommand):
+    def __init__(self):
+        super().__init__()
+        self.deleted = []  # To store the deleted Flights (with their ids) for undo
+
+    def execute(self, flight_numbers):
+        self.arguments = {"flight_numbers": flight_numbers}
+        self.check_batch_size(flight_numbers)
+
+        flights = list(Flight.objects.filter(flight_number__in=flight_numbers))
+        missing = sorted(set(flight_numbers) - {flight.flight_number for flight in flights})
+        if missing:
+            raise Exception(f"Flights with these numbers do not exist: {', '.join(missing)}.")
+
+        with transaction.atomic(), reported_by_rows_changed():
+            Flight.objects.filter(pk__in=[flight.pk for flight in flights]).delete()
+        self.deleted = flights
+        rows_changed.send(sender=Flight, deleted=flights)
+        return f"{len(flights)} flights deleted successfully."
+
+    def undo(self):
+        # Re-insert the deleted Flights under their original ids
+        if self.deleted:
+            # Their seat holds were deleted with them, so every seat is free again
+            for flight in self.deleted:
+                flight.seats_available = flight.seats_total
+            with transaction.atomic():
+                Flight.objects.bulk_create(self.deleted, batch_size=self.BATCH_SIZE)
+            rows_changed.send(sender=Flight, saved=self.deleted)
+
+    def state(self):
+        return {"arguments": self.arguments, "deleted": [dump_instance(flight) for flight in self.deleted]}
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.arguments = state["arguments"]
+        command.deleted = [load_instance(Flight, row) for row in state["deleted"]]
+        return command
+
+
+class RepriceFlightsCommand(BulkFlightCommand):
+    """
+    Set new tax and/or discount percentages on every Flight matching a filter
+    and recompute ``final_price`` with a single ``UPDATE`` statement.
+    """
+    SCALE = 10 ** 8  # (100 * 100) for each of the two percentages, kept to 2 decimal places
+    CHUNK_SIZE = 2000  # Rows per UPDATE statement and per rows_changed notification
+
+    def __init__(self):
+        super().__init__()
+        self.filters = None
+        self.previous_data = None  # [(pk, tax, discount, final_price)] for undo
+
+    @classmethod
+    def final_price_expression(cls, tax=None, discount=None):
+        """
+        SQL for ``Flight.final_price_calculated``:
+        ``round(base_price * (1 - discount / 100) * (1 + tax / 100))``.
+
+        Percentages are scaled to integer hundredths so the product is computed
+        exactly in integer arithmetic, then rounded half to even like Python's
+        ``round()`` on a Decimal. ``tax``/``discount`` of None use each row's column.
+        """
+        def hundredths(value, column):
+            if value is None:
+                return Cast(Round(F(column) * 100), BigIntegerField())
+            return Value(int(Decimal(str(value)) * 100), output_field=BigIntegerField())
+
+        scaled = (
+            F("base_price")
+            * (Value(10000) - hundredths(discount, "discount"))
+            * (Value(10000) + hundredths(tax, "tax"))
+        )
+        quotient = scaled / Value(cls.SCALE)  # Integer division: both operands are integers
+        twice_remainder = Mod(scaled, Value(cls.SCALE)) * Value(2)
+        return Case(
+            When(GreaterThan(twice_remainder, Value(cls.SCALE)), then=quotient + Value(1)),
+            When(Exact(twice_remainder, Value(cls.SCALE)), then=Case(
+                When(Exact(Mod(quotient, Value(2)), Value(1)), then=quotient + Value(1)),
+                default=quotient,
+            )),
+            default=quotient,
+            output_field=BigIntegerField(),
+        )
+
+    def execute(self, filters=None, tax=None, discount=None):
+        if tax is None and discount is None:
+            raise Exception("Provide a new tax and/or discount percentage.")
+        if tax is not None and not 0 <= tax <= 999.99:
+            raise Exception("tax must be between 0 and 999.99 percent.")
+        if discount is not None and not 0 <= discount <= 100:
+            raise Exception("discount must be between 0 and 100 percent.")
+        self.arguments = {"filters": filters, "tax": tax, "discount": discount}
+        self.filters = filters
+
+        changes = {"final_price": self.final_price_expression(tax=tax, discount=discount)}
+        if tax is not None:
+            changes["tax"] = Decimal(str(tax))
+        if discount is not None:
+            changes["discount"] = Decimal(str(discount))
+
+        flights = filter_flights(filters)
+        with transaction.atomic():
+            # Lock and remember the rows so undo restores exactly what was there
+            self.previous_data = list(
+                flights.select_for_update().values_list("pk", "tax", "discount", "final_price")
             )
+            count = 0
+            for pks in self.chunks():
+                count += Flight.objects.filter(pk__in=pks).update(**changes)
+        self.notify()
+        return count
 
-        result = command.execute()
-        self.undo_stack.append(command)
-        return result
+    def undo(self):
+        # Restore the previous tax, discount and final_price of every repriced Flight
+        if self.previous_data:
+            restored = [
+                Flight(pk=pk, tax=tax, discount=discount, final_price=final_price)
+                for pk, tax, discount, final_price in self.previous_data
+            ]
+            with transaction.atomic():
+                Flight.objects.bulk_update(restored, ["tax", "discount", "final_price"],
+                                           batch_size=BulkFlightCommand.BATCH_SIZE)
+            self.notify()
+
+    def state(self):
+        return {"arguments": self.arguments, "previous": self.previous_data}
+
+    @classmethod
+    def from_state(cls, state):
+        command = cls()
+        command.arguments = state["arguments"]
+        command.filters = command.arguments["filters"]
+        command.previous_data = [(pk, Decimal(tax), Decimal(discount), final_price)
+                                 for pk, tax, discount, final_price in state["previous"]]
+        return command
+
+    def chunks(self):
+        # The repriced primary keys, CHUNK_SIZE at a time, so no statement binds more parameters than that
+        pks = [row[0] for row in self.previous_data]
+        for start in range(0, len(pks), self.CHUNK_SIZE):
+            yield pks[start:start + self.CHUNK_SIZE]
+
+    def notify(self):
+        # Tell observers about the new prices, a chunk of rows at a time
+        for pks in self.chunks():
+            rows_changed.send(sender=Flight, saved=list(Flight.objects.filter(pk__in=pks).defer("flight_rules")))
+
+
+class FlightCommandHandler(CommandHistoryHandler):
+    """Runs the Flight commands; undo and redo use the shared per-user history."""
 
 
 # Define GraphQL Type for Flight
 class FlightType(DjangoObjectType):
     class Meta:
         model = Flight
+        exclude = ("seats_available",)
+
+
+# Input Types for the bulk mutations
+class FlightInput(graphene.InputObjectType):
+    flight_number = graphene.String(required=True)
+    flight_type = graphene.String(required=True)
+    trip_type = graphene.String(required=True)
+    departure_airport = graphene.Int(required=True)
+    arrival_airport = graphene.Int(required=True)
+    departure_datetime = graphene.String(required=True)
+    arrival_datetime = graphene.String(required=True)
+    airline = graphene.Int(required=True)
+    aircraft = graphene.Int(required=True)
+    cabin_type = graphene.String(required=True)
+    base_price = graphene.Int(required=True)
+    tax = graphene.Int(required=True)
+    discount = graphene.Float(required=True)
+    baggage_limit_kg = graphene.Float(required=True)
+    flight_rules = graphene.String(required=True)
+
+
+class FlightUpdateInput(graphene.InputObjectType):
+    flight_number = graphene.String(required=True)
+    flight_type = graphene.String()
+    trip_type = graphene.String()
+    departure_datetime = graphene.String()
+    arrival_datetime = graphene.String()
+    base_price = graphene.Int()
+    tax = graphene.Int()
+    discount = graphene.Float()
+    baggage_limit_kg = graphene.Float()
+    flight_rules = graphene.String()
+
+
+class FlightFilterInput(graphene.InputObjectType):
+    airline = graphene.String()
+    from_ = graphene.String(name="from")
+    to = graphene.String()
+    depart_after = graphene.DateTime()
+    depart_before = graphene.DateTime()
+    cabin_type = graphene.String()
+    flight_numbers = graphene.List(graphene.NonNull(graphene.String))
 
 
 # Shared handler instance
@@ -217,10 +609,35 @@ class FlightMutations(graphene.ObjectType):
         flight_number=graphene.String(required=True)
     )
 
+    create_flights = graphene.List(
+        FlightType,
+        flights=graphene.List(graphene.NonNull(FlightInput), required=True)
+    )
+
+    update_flights = graphene.List(
+        FlightType,
+        flights=graphene.List(graphene.NonNull(FlightUpdateInput), required=True)
+    )
+
+    delete_flights = graphene.String(
+        flight_numbers=graphene.List(graphene.NonNull(graphene.String), required=True)
+    )
+
+    reprice_flights = graphene.Int(
+        filter=FlightFilterInput(),
+        tax_pct=graphene.Float(),
+        discount_pct=graphene.Float()
+    )
+
     undo_operation = graphene.String()
     redo_operation = graphene.String()
 
     def resolve_create_flight(self, info, **kwargs):
+        # The command takes model instances; the API takes their ids
+        for name, model in BulkCreateFlightCommand.FOREIGN_KEYS.items():
+            kwargs[name] = model.objects.filter(pk=kwargs[name]).first()
+            if kwargs[name] is None:
+                raise Exception(f"{model.__name__} with this id does not exist.")
         # Use Command Handler to create a Flight
         command = CreateFlightCommand()
         return handler.execute(command, **kwargs)
@@ -235,6 +652,27 @@ class FlightMutations(graphene.ObjectType):
         command = DeleteFlightCommand()
         return handler.execute(command, flight_number=flight_number)
 
+    def resolve_create_flights(self, info, flights):
+        # Use Command Handler to create a batch of Flights
+        command = BulkCreateFlightCommand()
+        return handler.execute(command, flights=[dict(item) for item in flights])
+
+    def resolve_update_flights(self, info, flights):
+        # Use Command Handler to update a batch of Flights
+        command = BulkUpdateFlightCommand()
+        return handler.execute(command, flights=[dict(item) for item in flights])
+
+    def resolve_delete_flights(self, info, flight_numbers):
+        # Use Command Handler to delete a batch of Flights
+        command = BulkDeleteFlightCommand()
+        return handler.execute(command, flight_numbers=flight_numbers)
+
+    def resolve_reprice_flights(self, info, filter=None, tax_pct=None, discount_pct=None):
+        # Use Command Handler to reprice every matching Flight in one UPDATE
+        command = RepriceFlightsCommand()
+        return handler.execute(command, filters=dict(filter) if filter else None,
+                               tax=tax_pct, discount=discount_pct)
+
     def resolve_undo_operation(self, info):
         # Undo the last operation
         handler.undo()
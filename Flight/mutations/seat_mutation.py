@@ -0,0 +1,44 @@
+from Flight import inventory
+import graphene
+
+
+# Define GraphQL Type for a seat hold
+class SeatHoldType(graphene.ObjectType):
+    token = graphene.UUID()
+    flight_number = graphene.String()
+    seats = graphene.Int()
+    status = graphene.String()
+    expires_at = graphene.DateTime()
+
+    def resolve_flight_number(self, info):
+        return self.flight.flight_number
+
+
+# Define Mutation for seat inventory. Holds are not commands: they are never undone
+# from the history, they are released (or expire).
+class SeatMutations(graphene.ObjectType):
+    hold_seats = graphene.Field(
+        SeatHoldType,
+        flight_number=graphene.String(required=True),
+        seats=graphene.Int(required=True)
+    )
+
+    confirm_seat_hold = graphene.Field(
+        SeatHoldType,
+        token=graphene.UUID(required=True)
+    )
+
+    release_seat_hold = graphene.Field(
+        SeatHoldType,
+        token=graphene.UUID(required=True)
+    )
+
+    def resolve_hold_seats(self, info, flight_number, seats):
+        # Take the seats with one conditional UPDATE, or fail if too few are left
+        return inventory.hold(flight_number, seats)
+
+    def resolve_confirm_seat_hold(self, info, token):
+        return inventory.confirm(token)
+
+    def resolve_release_seat_hold(self, info, token):
+        return inventory.release(token)
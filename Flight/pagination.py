@@ -0,0 +1,193 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import partial
+
+import graphene
+from django.db.models import Q
+from graphene.relay import PageInfo
+from graphene_django.settings import graphene_settings
+
+from .loaders import in_async_context
+from .projection import project
+
+
+def encode_cursor(values):
+    """Encode the sort key values of a row into an opaque cursor."""
+    def serialize(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+    payload = json.dumps([serialize(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    """Decode a cursor back into its sort key values."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeError):
+        raise Exception("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise Exception("Invalid cursor.")
+    return values
+
+
+def keyset_filter(ordering, values, descending=False):
+    """
+    Build the ``WHERE`` clause selecting rows strictly after ``values`` in ``ordering``.
+
+    For ``("departure_datetime", "id")`` this is
+    ``departure_datetime > v0 OR (departure_datetime = v0 AND id > v1)``,
+    which the database answers with a range scan on the matching index.
+    """
+    lookup = "lt" if descending else "gt"
+    condition = Q()
+    for i, field in enumerate(ordering):
+        step = Q(**{f"{field}__{lookup}": values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+def page_queryset(queryset, ordering, first=None, after=None, last=None, before=None):
+    """
+    Validate the Relay arguments and return ``(queryset, limit, backwards)``:
+    the rows of the requested page plus one, in fetch order.
+    """
+    max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+    for name, value in (("first", first), ("last", last)):
+        if value is not None and value < 0:
+            raise Exception(f"Argument '{name}' must be a non-negative integer.")
+        if value is not None and value > max_limit:
+            raise Exception(f"Argument '{name}' must not exceed {max_limit}.")
+    if first is not None and last is not None:
+        raise Exception("Pass either 'first' or 'last', not both.")
+
+    backwards = last is not None
+    limit = last if backwards else (first if first is not None else max_limit)
+
+    if after is not None:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(after, len(ordering))))
+    if before is not None:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(before, len(ordering)), descending=True))
+
+    # Fetch one extra row to know whether another page follows
+    order_by = [f"-{field}" for field in ordering] if backwards else list(ordering)
+    return queryset.order_by(*order_by)[:limit + 1], limit, backwards
+
+
+def build_connection(rows, ordering, connection_type, limit, backwards, after=None, before=None):
+    """Turn the rows fetched for ``page_queryset`` into a Relay connection."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    edges = [
+        connection_type.Edge(node=row, cursor=encode_cursor([getattr(row, field) for field in ordering]))
+        for row in rows
+    ]
+    page_info = PageInfo(
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        has_previous_page=has_more if backwards else after is not None,
+        has_next_page=before is not None if backwards else has_more,
+    )
+    return connection_type(edges=edges, page_info=page_info)
+
+
+def paginate(queryset, ordering, connection_type, first=None, after=None, last=None, before=None):
+    """
+    Slice ``queryset`` into a Relay connection page using keyset pagination.
+
+    Rows are ordered by ``ordering`` (which must be unique, e.g. ending in ``id``)
+    and cursors carry the sort key of their row, so every page is a single
+    indexed range query no matter how deep the client pages.
+    """
+    page, limit, backwards = page_queryset(queryset, ordering, first, after, last, before)
+    return build_connection(list(page), ordering, connection_type, limit, backwards, after, before)
+
+
+async def apaginate(queryset, ordering, connection_type, first=None, after=None, last=None, before=None):
+    """``paginate()`` reading the page with the async ORM."""
+    page, limit, backwards = page_queryset(queryset, ordering, first, after, last, before)
+    rows = [row async for row in page]
+    return build_connection(rows, ordering, connection_type, limit, backwards, after, before)
+
+
+class KeysetConnectionField(graphene.Field):
+    """
+    Relay connection field paginated with opaque keyset cursors.
+
+    The ``resolve_<field>`` method keeps returning a plain queryset; this field
+    narrows it to the selected columns, orders it by ``ordering`` and cuts out
+    the requested page.
+    """
+    def __init__(self, connection, ordering, **kwargs):
+        kwargs.setdefault("first", graphene.Int())
+        kwargs.setdefault("after", graphene.String())
+        kwargs.setdefault("last", graphene.Int())
+        kwargs.setdefault("before", graphene.String())
+        super().__init__(connection, **kwargs)
+        self.ordering = tuple(ordering)
+
+    def wrap_resolve(self, parent_resolver):
+        resolver = super().wrap_resolve(parent_resolver)
+        return partial(self.resolve_connection, resolver)
+
+    def resolve_connection(self, resolver, root, info, first=None, after=None, last=None, before=None, **kwargs):
+        node_type = self.type._meta.node
+        queryset = project(resolver(root, info, **kwargs), info, node_type, path=("edges", "node"),
+                           extra=self.ordering)
+        if in_async_context():
+            return self.aresolve_page(queryset, info, first, after, last, before)
+        return self.prime(info, paginate(queryset, self.ordering, self.type, first=first, after=after,
+                                         last=last, before=before))
+
+    async def aresolve_page(self, queryset, info, first, after, last, before):
+        return self.prime(info, await apaginate(queryset, self.ordering, self.type, first=first, after=after,
+                                                last=last, before=before))
+
+    def prime(self, info, connection):
+        # Let the node type batch-load what its rows reference
+        prime = getattr(self.type._meta.node, "prime_loaders", None)
+        if prime is not None:
+            prime(info, [edge.node for edge in connection.edges])
+        return connection
+
+
+class ReadModelConnectionField(KeysetConnectionField):
+    """
+    ``KeysetConnectionField`` whose resolver returns a queryset of a read
+    model (a denormalized table sharing the node model's primary keys, such
+    as ``FlightListing``) instead of the node model. The page is filtered and
+    cut from the read model alone; its nodes are then loaded by primary key.
+    """
+    def resolve_connection(self, resolver, root, info, first=None, after=None, last=None, before=None, **kwargs):
+        queryset = resolver(root, info, **kwargs).only(*self.ordering)
+        nodes = project(self.type._meta.node._meta.model.objects.all(), info, self.type._meta.node,
+                        path=("edges", "node"))
+        if in_async_context():
+            return self.aresolve_nodes(queryset, nodes, info, first, after, last, before)
+        connection = paginate(queryset, self.ordering, self.type, first=first, after=after, last=last, before=before)
+        return self.prime(info, self.replace_nodes(connection, nodes.in_bulk([edge.node.pk
+                                                                             for edge in connection.edges])))
+
+    async def aresolve_nodes(self, queryset, nodes, info, first, after, last, before):
+        connection = await apaginate(queryset, self.ordering, self.type, first=first, after=after, last=last,
+                                     before=before)
+        found = {node.pk: node async for node in nodes.filter(pk__in=[edge.node.pk for edge in connection.edges])}
+        return self.prime(info, self.replace_nodes(connection, found))
+
+    @staticmethod
+    def replace_nodes(connection, nodes):
+        # A row deleted since the page was read drops out of it
+        connection.edges = [edge for edge in connection.edges if edge.node.pk in nodes]
+        for edge in connection.edges:
+            edge.node = nodes[edge.node.pk]
+        return connection
@@ -0,0 +1,116 @@
+from django.db.models import Prefetch, QuerySet
+from graphene import Dynamic
+from graphene.utils.str_converters import to_camel_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def _merge(tree, other):
+    for name, subtree in other.items():
+        _merge(tree.setdefault(name, {}), subtree)
+
+
+def _collect(selection_set, fragments):
+    # Flatten fields, fragment spreads and inline fragments into {name: subtree}
+    tree = {}
+    if selection_set is None:
+        return tree
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            _merge(tree.setdefault(selection.name.value, {}), _collect(selection.selection_set, fragments))
+        elif isinstance(selection, FragmentSpreadNode):
+            _merge(tree, _collect(fragments[selection.name.value].selection_set, fragments))
+        elif isinstance(selection, InlineFragmentNode):
+            _merge(tree, _collect(selection.selection_set, fragments))
+    return tree
+
+
+def selection_tree(info, path=()):
+    """
+    Return the fields the client selected under the field being resolved, as a
+    nested ``{graphql_name: subtree}`` dict, descending through ``path`` first
+    (e.g. ``("edges", "node")`` for a connection).
+    """
+    tree = {}
+    for node in info.field_nodes:
+        _merge(tree, _collect(node.selection_set, info.fragments))
+    for name in path:
+        tree = tree.get(name, {})
+    return tree
+
+
+def _object_type(field):
+    # Unwrap List/NonNull down to the ObjectType of a graphene field
+    if isinstance(field, Dynamic):
+        field = field.get_type()
+    graphene_type = field.type
+    while hasattr(graphene_type, "of_type"):
+        graphene_type = graphene_type.of_type
+    return graphene_type
+
+
+def _plan(graphene_type, model, tree, prefix=""):
+    """Work out the only()/select_related()/prefetch_related() arguments for ``tree``."""
+    attributes = {
+        getattr(field, "name", None) or to_camel_case(name): name
+        for name, field in graphene_type._meta.fields.items()
+    }
+    # Model fields by the attribute graphene exposes them under: reverse relations
+    # by their accessor (``flight_set``, ``departures``), not their query name
+    model_fields = {
+        field.get_accessor_name() if field.auto_created and not field.concrete else field.name: field
+        for field in model._meta.get_fields()
+    }
+    only, related, prefetches = [f"{prefix}{model._meta.pk.name}"], [], []
+    for graphql_name, subtree in tree.items():
+        name = attributes.get(graphql_name)
+        model_field = model_fields.get(name)
+        if model_field is None:
+            continue
+        if model_field.many_to_one or (model_field.one_to_one and model_field.concrete):
+            # Forward relation: join it and keep only the selected columns of the related row
+            only.append(f"{prefix}{name}")
+            related.append(f"{prefix}{name}")
+            sub_only, sub_related, sub_prefetches = _plan(
+                _object_type(graphene_type._meta.fields[name]), model_field.related_model, subtree,
+                prefix=f"{prefix}{name}__"
+            )
+            only += sub_only
+            related += sub_related
+            prefetches += sub_prefetches
+        elif model_field.one_to_many:
+            # Reverse relation: prefetch it with its own projection, keeping the key back to us
+            queryset = project_queryset(
+                model_field.related_model.objects.all(), _object_type(graphene_type._meta.fields[name]),
+                subtree, extra=(model_field.field.name,)
+            )
+            prefetches.append(Prefetch(f"{prefix}{name}", queryset=queryset))
+        elif model_field.concrete:
+            only.append(f"{prefix}{name}")
+    return only, related, prefetches
+
+
+def project_queryset(queryset, graphene_type, tree, extra=()):
+    """Restrict ``queryset`` to the columns and relations selected in ``tree``."""
+    if not tree:
+        return queryset
+    only, related, prefetches = _plan(graphene_type, queryset.model, tree)
+    queryset = queryset.only(*only, *extra)
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset
+
+
+def project(queryset, info, graphene_type, path=(), extra=()):
+    """
+    Apply only()/select_related()/prefetch_related() to ``queryset`` for exactly
+    the fields the client asked for, so unselected columns (``flight_rules``,
+    ``airline_rules``...) are never read from the database.
+
+    ``extra`` lists columns needed regardless of the selection, such as the
+    sort key of a paginated listing.
+    """
+    if info is None or not isinstance(queryset, QuerySet):
+        return queryset
+    return project_queryset(queryset, graphene_type, selection_tree(info, path), extra=extra)
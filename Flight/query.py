@@ -1,81 +1,437 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
 import graphene
+from django.db.models import Min, Sum
+from django.utils import timezone
 from graphene_django.types import DjangoObjectType
-from .models import Flight, Airport, Airline, Aircraft
+from .models import Flight, ArchivedFlight, FlightListing, FareCalendarDay, Airport, Airline, Aircraft
+from .cache import lookup_cache
+from .loaders import get_loaders, in_async_context, sync_when_async
+from .pagination import KeysetConnectionField, ReadModelConnectionField
+from .projection import project, selection_tree
+from .routing import route_graph
+from .search import search_index
+from .suggest import airport_suggester
 
 
 # GraphQL Types for Models
 class FlightType(DjangoObjectType):
     class Meta:
         model = Flight
+        # Changes with every hold, outside the commands; read it fresh through seatAvailability
+        exclude = ("seats_available",)
+
+    # Foreign keys go through the per-request loaders, so a list of flights
+    # costs one query per related model instead of one query per row.
+    @staticmethod
+    def _load_related(root, info, field_name, loader_name):
+        if getattr(type(root), field_name).is_cached(root):
+            return getattr(root, field_name)
+        return getattr(get_loaders(info.context), loader_name).load(getattr(root, f"{field_name}_id"))
+
+    def resolve_departure_airport(self, info):
+        return FlightType._load_related(self, info, "departure_airport", "airports")
+
+    def resolve_arrival_airport(self, info):
+        return FlightType._load_related(self, info, "arrival_airport", "airports")
+
+    def resolve_airline(self, info):
+        return FlightType._load_related(self, info, "airline", "airlines")
+
+    def resolve_aircraft(self, info):
+        return FlightType._load_related(self, info, "aircraft", "aircrafts")
+
+    @staticmethod
+    def prime_loaders(info, flights):
+        if info is not None:
+            get_loaders(info.context).prime_flights(flights)
+
+
+class ArchivedFlightType(DjangoObjectType):
+    class Meta:
+        model = ArchivedFlight
+
+    # Same batched loading of the related rows as FlightType
+    def resolve_departure_airport(self, info):
+        return FlightType._load_related(self, info, "departure_airport", "airports")
+
+    def resolve_arrival_airport(self, info):
+        return FlightType._load_related(self, info, "arrival_airport", "airports")
+
+    def resolve_airline(self, info):
+        return FlightType._load_related(self, info, "airline", "airlines")
+
+    def resolve_aircraft(self, info):
+        return FlightType._load_related(self, info, "aircraft", "aircrafts")
+
+    prime_loaders = FlightType.prime_loaders
+
+
+def _resolve_flights(accessor):
+    """
+    Resolver for a reverse relation to Flight (an airport's ``departures``, an
+    airline's ``flight_set``...). A projected listing prefetched the rows already;
+    otherwise they are read with their own projected query, on the sync thread
+    under the async view, where the lazy related manager cannot be evaluated.
+    """
+    @sync_when_async
+    def load(root, info):
+        flights = list(project(getattr(root, accessor).all(), info, FlightType))
+        FlightType.prime_loaders(info, flights)
+        return flights
+
+    def resolver(root, info):
+        if accessor in getattr(root, "_prefetched_objects_cache", {}):
+            return getattr(root, accessor).all()
+        return load(root, info)
+    return resolver
 
 
 class AirportType(DjangoObjectType):
     class Meta:
         model = Airport
 
+    resolve_departures = _resolve_flights("departures")
+    resolve_arrivals = _resolve_flights("arrivals")
+
 
 class AirlineType(DjangoObjectType):
     class Meta:
         model = Airline
 
+    resolve_flight_set = _resolve_flights("flight_set")
+
 
 class AircraftType(DjangoObjectType):
     class Meta:
         model = Aircraft
 
+    resolve_flight_set = _resolve_flights("flight_set")
+
+
+# Relay Connections for the paginated listings
+class FlightConnection(graphene.relay.Connection):
+    class Meta:
+        node = FlightType
+
+
+class ArchivedFlightConnection(graphene.relay.Connection):
+    class Meta:
+        node = ArchivedFlightType
+
+
+class AirportConnection(graphene.relay.Connection):
+    class Meta:
+        node = AirportType
+
+
+class AirlineConnection(graphene.relay.Connection):
+    class Meta:
+        node = AirlineType
+
+
+class AircraftConnection(graphene.relay.Connection):
+    class Meta:
+        node = AircraftType
+
+
+# Connecting itineraries built from several flights
+class ItinerarySort(graphene.Enum):
+    PRICE = "price"
+    DURATION = "duration"
+
+
+class ItineraryType(graphene.ObjectType):
+    legs = graphene.List(FlightType)
+    stops = graphene.Int()
+    total_price = graphene.Int()
+    duration_minutes = graphene.Int()
+    departure_datetime = graphene.DateTime()
+    arrival_datetime = graphene.DateTime()
+
+
+class FareDayType(graphene.ObjectType):
+    date = graphene.Date()
+    min_price = graphene.Int()
+    flights = graphene.Int()
+
+
+class SeatAvailabilityType(graphene.ObjectType):
+    flight_number = graphene.String()
+    seats_total = graphene.Int()
+    seats_available = graphene.Int()
+
+
+class SearchKind(graphene.Enum):
+    AIRPORT = "airport"
+    AIRLINE = "airline"
+    FLIGHT = "flight"
+
+
+class SearchResultType(graphene.ObjectType):
+    kind = SearchKind()
+    score = graphene.Float()
+    airport = graphene.Field(AirportType)
+    airline = graphene.Field(AirlineType)
+    flight = graphene.Field(FlightType)
+
 
 # Query Classes
 class FlightQueries(graphene.ObjectType):
-    all_flights = graphene.List(FlightType)
+    all_flights = KeysetConnectionField(FlightConnection, ordering=("departure_datetime", "id"))
     flight_by_number = graphene.Field(FlightType, flight_number=graphene.String(required=True))
+    seat_availability = graphene.Field(SeatAvailabilityType, flight_number=graphene.String(required=True))
+    fare_calendar = graphene.List(
+        FareDayType,
+        from_=graphene.String(required=True, name="from"),
+        to=graphene.String(required=True),
+        month=graphene.String(required=True),
+        cabin_type=graphene.String()
+    )
+    search_flights = ReadModelConnectionField(
+        FlightConnection,
+        ordering=("departure_datetime", "pk"),
+        from_=graphene.String(required=True, name="from"),
+        to=graphene.String(),
+        depart_date=graphene.Date(),
+        depart_after=graphene.DateTime(),
+        depart_before=graphene.DateTime(),
+        cabin_type=graphene.String(),
+        max_price=graphene.Int(),
+        airline=graphene.String()
+    )
+    flight_history = KeysetConnectionField(
+        ArchivedFlightConnection,
+        ordering=("departure_datetime", "id"),
+        flight_number=graphene.String(),
+        from_=graphene.String(name="from"),
+        to=graphene.String(),
+        airline=graphene.String(),
+        depart_after=graphene.DateTime(),
+        depart_before=graphene.DateTime()
+    )
+    search_itineraries = graphene.List(
+        ItineraryType,
+        from_=graphene.String(required=True, name="from"),
+        to=graphene.String(required=True),
+        depart_date=graphene.Date(),
+        depart_after=graphene.DateTime(),
+        depart_before=graphene.DateTime(),
+        max_stops=graphene.Int(default_value=1),
+        min_layover_minutes=graphene.Int(default_value=60),
+        max_layover_minutes=graphene.Int(default_value=720),
+        sort_by=ItinerarySort(default_value=ItinerarySort.PRICE),
+        limit=graphene.Int(default_value=20)
+    )
 
     def resolve_all_flights(self, info, **kwargs):
         return Flight.objects.all()
 
+    def resolve_search_flights(self, info, from_, to=None, depart_date=None, depart_after=None,
+                               depart_before=None, cabin_type=None, max_price=None, airline=None):
+        # Reads the denormalized FlightListing table only: route and departure window
+        # lead, so its (departure_airport_code, arrival_airport_code, departure_datetime)
+        # and (departure_airport_code, departure_datetime) indexes make this one range scan.
+        flights = FlightListing.objects.filter(departure_airport_code=from_)
+        if to is not None:
+            flights = flights.filter(arrival_airport_code=to)
+        if depart_date is not None:
+            day_start = timezone.make_aware(datetime.combine(depart_date, time.min))
+            flights = flights.filter(departure_datetime__gte=day_start,
+                                     departure_datetime__lt=day_start + timedelta(days=1))
+        if depart_after is not None:
+            flights = flights.filter(departure_datetime__gte=depart_after)
+        if depart_before is not None:
+            flights = flights.filter(departure_datetime__lt=depart_before)
+        if cabin_type is not None:
+            flights = flights.filter(cabin_type=cabin_type)
+        if max_price is not None:
+            flights = flights.filter(final_price__lte=max_price)
+        if airline is not None:
+            flights = flights.filter(airline_code=airline)
+        return flights
+
+    def resolve_flight_history(self, info, flight_number=None, from_=None, to=None, airline=None,
+                               depart_after=None, depart_before=None):
+        # Archived flights only (Flight/archive.py); the live queries never read the archive
+        flights = ArchivedFlight.objects.all()
+        if flight_number is not None:
+            flights = flights.filter(flight_number=flight_number)
+        if from_ is not None:
+            flights = flights.filter(departure_airport__airport_code=from_)
+        if to is not None:
+            flights = flights.filter(arrival_airport__airport_code=to)
+        if airline is not None:
+            flights = flights.filter(airline__airline_code=airline)
+        if depart_after is not None:
+            flights = flights.filter(departure_datetime__gte=depart_after)
+        if depart_before is not None:
+            flights = flights.filter(departure_datetime__lt=depart_before)
+        return flights
+
+    @sync_when_async
+    def resolve_search_itineraries(self, info, from_, to, depart_date=None, depart_after=None,
+                                   depart_before=None, max_stops=1, min_layover_minutes=60,
+                                   max_layover_minutes=720, sort_by=ItinerarySort.PRICE, limit=20):
+        airport_ids = dict(Airport.objects.filter(airport_code__in=[from_, to]).values_list("airport_code", "id"))
+        if from_ not in airport_ids or to not in airport_ids:
+            return []
+
+        start = datetime.min.replace(tzinfo=dt_timezone.utc)
+        end = datetime.max.replace(tzinfo=dt_timezone.utc)
+        if depart_date is not None:
+            start = timezone.make_aware(datetime.combine(depart_date, time.min))
+            end = start + timedelta(days=1) - timedelta(microseconds=1)
+        if depart_after is not None:
+            start = max(start, depart_after)
+        if depart_before is not None:
+            end = min(end, depart_before)
+
+        itineraries = route_graph.itineraries(
+            airport_ids[from_], airport_ids[to], start, end,
+            max_stops=max_stops,
+            min_layover=timedelta(minutes=min_layover_minutes),
+            max_layover=timedelta(minutes=max_layover_minutes),
+            sort_by=getattr(sort_by, "value", sort_by),
+            limit=limit
+        )
+
+        # Fetch the flights of every leg in one query
+        flight_ids = {leg.flight_id for itinerary in itineraries for leg in itinerary.legs}
+        flights = project(Flight.objects.all(), info, FlightType, path=("legs",)).in_bulk(flight_ids)
+        FlightType.prime_loaders(info, flights.values())
+        return [
+            ItineraryType(
+                legs=[flights[leg.flight_id] for leg in itinerary.legs],
+                stops=itinerary.stops,
+                total_price=itinerary.total_price,
+                duration_minutes=int(itinerary.duration.total_seconds() // 60),
+                departure_datetime=itinerary.departure_datetime,
+                arrival_datetime=itinerary.arrival_datetime
+            )
+            for itinerary in itineraries
+            if all(leg.flight_id in flights for leg in itinerary.legs)
+        ]
+
     def resolve_flight_by_number(self, info, flight_number):
+        # Served from the lookup cache; the commands invalidate it on every write
+        rows = Flight.objects.filter(flight_number=flight_number)
+        if in_async_context():
+            return lookup_cache.aget_or_load(Flight, flight_number, rows.afirst)
+        return lookup_cache.get_or_load(Flight, flight_number, rows.first)
+
+    @sync_when_async
+    def resolve_seat_availability(self, info, flight_number):
+        # Read from the row every time: holds change it without invalidating the lookup cache
+        row = (Flight.objects.filter(flight_number=flight_number)
+               .values("flight_number", "seats_total", "seats_available").first())
+        return SeatAvailabilityType(**row) if row is not None else None
+
+    @sync_when_async
+    def resolve_fare_calendar(self, info, from_, to, month, cabin_type=None):
+        # One range read of the precomputed calendar (Flight/fares.py): a row per day and cabin
         try:
-            return Flight.objects.get(flight_number=flight_number)
-        except Flight.DoesNotExist:
-            return None
+            first_day = datetime.strptime(month, "%Y-%m").date()
+        except ValueError:
+            raise Exception("month must be YYYY-MM.")
+        next_month = (first_day + timedelta(days=32)).replace(day=1)
+        days = FareCalendarDay.objects.filter(departure_airport_code=from_, arrival_airport_code=to,
+                                              day__gte=first_day, day__lt=next_month)
+        if cabin_type is not None:
+            days = days.filter(cabin_type=cabin_type)
+        return [
+            FareDayType(date=row["day"], min_price=row["min_price"], flights=row["flights"])
+            for row in days.values("day").annotate(min_price=Min("min_price"), flights=Sum("flights")).order_by("day")
+        ]
 
 
 class AirportQueries(graphene.ObjectType):
-    all_airports = graphene.List(AirportType)
+    all_airports = KeysetConnectionField(AirportConnection, ordering=("airport_code",))
     airport_by_code = graphene.Field(AirportType, airport_code=graphene.String(required=True))
+    airport_suggest = graphene.List(AirportType, prefix=graphene.String(required=True),
+                                    limit=graphene.Int(default_value=10))
 
     def resolve_all_airports(self, info, **kwargs):
         return Airport.objects.all()
 
+    @sync_when_async
+    def resolve_airport_suggest(self, info, prefix, limit=10):
+        # Served from memory; only a (re)build reads the Airport table
+        if not 1 <= limit <= 50:
+            raise Exception("limit must be between 1 and 50.")
+        return airport_suggester.suggest(prefix, limit=limit)
+
     def resolve_airport_by_code(self, info, airport_code):
-        try:
-            return Airport.objects.get(airport_code=airport_code)
-        except Airport.DoesNotExist:
-            return None
+        # Served from the lookup cache; the commands invalidate it on every write
+        rows = Airport.objects.filter(airport_code=airport_code)
+        if in_async_context():
+            return lookup_cache.aget_or_load(Airport, airport_code, rows.afirst)
+        return lookup_cache.get_or_load(Airport, airport_code, rows.first)
 
 
 class AirlineQueries(graphene.ObjectType):
-    all_airlines = graphene.List(AirlineType)
+    all_airlines = KeysetConnectionField(AirlineConnection, ordering=("airline_code",))
     airline_by_code = graphene.Field(AirlineType, airline_code=graphene.String(required=True))
 
     def resolve_all_airlines(self, info, **kwargs):
         return Airline.objects.all()
 
     def resolve_airline_by_code(self, info, airline_code):
-        try:
-            return Airline.objects.get(airline_code=airline_code)
-        except Airline.DoesNotExist:
-            return None
+        # Served from the lookup cache; the commands invalidate it on every write
+        rows = Airline.objects.filter(airline_code=airline_code)
+        if in_async_context():
+            return lookup_cache.aget_or_load(Airline, airline_code, rows.afirst)
+        return lookup_cache.get_or_load(Airline, airline_code, rows.first)
 
 
 class AircraftQueries(graphene.ObjectType):
-    all_aircrafts = graphene.List(AircraftType)
+    all_aircrafts = KeysetConnectionField(AircraftConnection, ordering=("aircraft_model",))
     aircraft_by_model = graphene.Field(AircraftType, aircraft_model=graphene.String(required=True))
 
     def resolve_all_aircrafts(self, info, **kwargs):
         return Aircraft.objects.all()
 
     def resolve_aircraft_by_model(self, info, aircraft_model):
-        try:
-            return Aircraft.objects.get(aircraft_model=aircraft_model)
-        except Aircraft.DoesNotExist:
-            return None
\ No newline at end of file
+        # Served from the lookup cache; the commands invalidate it on every write
+        rows = Aircraft.objects.filter(aircraft_model=aircraft_model)
+        if in_async_context():
+            return lookup_cache.aget_or_load(Aircraft, aircraft_model, rows.afirst)
+        return lookup_cache.get_or_load(Aircraft, aircraft_model, rows.first)
+
+
+class SearchQueries(graphene.ObjectType):
+    search = graphene.List(
+        SearchResultType,
+        text=graphene.String(required=True),
+        kinds=graphene.List(SearchKind),
+        limit=graphene.Int(default_value=20)
+    )
+
+    @sync_when_async
+    def resolve_search(self, info, text, kinds=None, limit=20):
+        # Ranked from the in-process index; only the hits themselves are read from the database
+        if not 1 <= limit <= 100:
+            raise Exception("limit must be between 1 and 100.")
+        if kinds is not None:
+            kinds = {getattr(kind, "value", kind) for kind in kinds}
+        hits = search_index.search(text, kinds=kinds, limit=limit)
+
+        # One query per kind of hit the client selected
+        selected = selection_tree(info)
+        rows = {}
+        for kind, model, graphene_type in (("airport", Airport, AirportType), ("airline", Airline, AirlineType),
+                                           ("flight", Flight, FlightType)):
+            pks = [hit.pk for hit in hits if hit.kind == kind]
+            if pks and kind in selected:
+                rows[kind] = project(model.objects.all(), info, graphene_type, path=(kind,)).in_bulk(pks)
+        FlightType.prime_loaders(info, rows.get("flight", {}).values())
+
+        results = []
+        for hit in hits:
+            instance = None
+            if hit.kind in rows:
+                instance = rows[hit.kind].get(hit.pk)
+                if instance is None:  # Deleted since it was indexed
+                    continue
+            results.append(SearchResultType(kind=hit.kind, score=hit.score, **{hit.kind: instance}))
+        return results
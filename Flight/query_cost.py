@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import get_named_type, get_nullable_type, get_operation_ast, is_list_type
+from graphql.error import GraphQLError
+from graphql.execution.values import get_argument_values
+from graphql.language import FieldNode, FragmentDefinitionNode, FragmentSpreadNode
+
+
+class QueryCostError(GraphQLError):
+    def __init__(self, message, code, cost):
+        super().__init__(message, extensions={"code": code, "cost": cost})
+        self.cost = cost
+
+
+class CostThrottle:
+    """
+    Token bucket per client: each client may spend ``rate`` cost units per
+    second with bursts up to ``burst``. Kept in process, so every worker
+    throttles on its own.
+    """
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def consume(self, client, cost):
+        """Spend ``cost`` tokens; return ``(allowed, remaining, retry_after_seconds)``."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = cost <= tokens
+            if allowed:
+                tokens -= cost
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        retry_after = 0 if allowed else round((cost - tokens) / self.rate, 1)
+        return allowed, int(tokens), retry_after
+
+
+class QueryCostAnalyzer:
+    """
+    Static cost of an operation, computed from the document before it runs.
+
+    Every field costs 1, times the number of rows it is expected to return:
+    ``first``/``last``/``limit`` when given, the Relay page limit for other
+    connections, ``list_sizes["Type.field"]`` or ``default_list_size`` for
+    other lists (such as the reverse relations of the Django types). Children
+    are charged once per row of their parent, so the cost estimates how many
+    objects the response resolves. Introspection fields are free.
+    """
+    def __init__(self, max_cost=10000, max_depth=10, default_list_size=100, list_sizes=None, throttle=None):
+        self.max_cost = max_cost
+        self.max_depth = max_depth
+        self.default_list_size = default_list_size
+        self.list_sizes = list_sizes or {}
+        self.throttle = throttle
+
+    def multiplier(self, parent_type, field_node, field_def, variables):
+        size = self.list_sizes.get(f"{parent_type.name}.{field_node.name.value}")
+        if size is not None:
+            return size
+        try:
+            arguments = get_argument_values(field_def, field_node, variables)
+        except GraphQLError:
+            arguments = {}
+        for name in ("first", "last", "limit"):
+            if arguments.get(name) is not None:
+                return max(arguments[name], 0)
+        if "first" in field_def.args:
+            return graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        if is_list_type(get_nullable_type(field_def.type)):
+            # The rows of a connection's edges were charged on the connection field
+            if field_node.name.value == "edges" and parent_type.name.endswith("Connection"):
+                return 1
+            return self.default_list_size
+        return 1
+
+    def measure(self, schema, selection_set, parent_type, fragments, variables):
+        """Return ``(cost, depth)`` of a selection set on ``parent_type``."""
+        cost, depth = 0, 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                fields = getattr(parent_type, "fields", {})
+                if name.startswith("__") or name not in fields:
+                    continue
+                field_def = fields[name]
+                child_cost, child_depth = 0, 0
+                if selection.selection_set is not None:
+                    child_cost, child_depth = self.measure(schema, selection.selection_set,
+                                                           get_named_type(field_def.type), fragments, variables)
+                cost += self.multiplier(parent_type, selection, field_def, variables) * (1 + child_cost)
+                depth = max(depth, 1 + child_depth)
+            else:
+                if isinstance(selection, FragmentSpreadNode):
+                    fragment = fragments.get(selection.name.value)
+                    if fragment is None:
+                        continue
+                else:
+                    fragment = selection
+                fragment_type = parent_type
+                if fragment.type_condition is not None:
+                    fragment_type = schema.get_type(fragment.type_condition.name.value) or parent_type
+                fragment_cost, fragment_depth = self.measure(schema, fragment.selection_set, fragment_type,
+                                                             fragments, variables)
+                cost += fragment_cost
+                depth = max(depth, fragment_depth)
+        return cost, depth
+
+    def check(self, schema, document, operation_name=None, variables=None, client=None):
+        """
+        Return the cost of the operation as ``{"requested", "depth", "maximum"}``
+        (plus the client's remaining throttle budget), or raise ``QueryCostError``.
+        """
+        operation = get_operation_ast(document, operation_name)
+        if operation is None:
+            return None
+        root_type = schema.get_root_type(operation.operation)
+        fragments = {definition.name.value: definition for definition in document.definitions
+                     if isinstance(definition, FragmentDefinitionNode)}
+        if not isinstance(variables, dict):
+            variables = {}  # Malformed variables fail validation when the operation executes
+        requested, depth = self.measure(schema, operation.selection_set, root_type, fragments, variables)
+        cost = {"requested": requested, "depth": depth, "maximum": self.max_cost}
+
+        if self.max_depth is not None and depth > self.max_depth:
+            raise QueryCostError(f"Query depth {depth} exceeds the maximum depth of {self.max_depth}.",
+                                 "QUERY_TOO_DEEP", cost)
+        if self.max_cost is not None and requested > self.max_cost:
+            raise QueryCostError(f"Query cost {requested} exceeds the maximum cost of {self.max_cost}.",
+                                 "QUERY_TOO_EXPENSIVE", cost)
+        if self.throttle is not None and client is not None:
+            allowed, remaining, retry_after = self.throttle.consume(client, requested)
+            cost["throttle"] = {"remaining": remaining, "rate": self.throttle.rate, "burst": self.throttle.burst}
+            if not allowed:
+                cost["throttle"]["retryAfter"] = retry_after
+                raise QueryCostError(f"Query cost budget exhausted; retry in {retry_after}s.", "THROTTLED", cost)
+        return cost
+
+
+def build_query_cost_analyzer():
+    config = getattr(settings, "GRAPHQL_QUERY_COST", {})
+    if not config.get("ENABLED", True):
+        return None
+    throttle = None
+    if config.get("THROTTLE_RATE"):
+        throttle = CostThrottle(config["THROTTLE_RATE"], config.get("THROTTLE_BURST", config.get("MAX_COST", 10000)))
+    return QueryCostAnalyzer(
+        max_cost=config.get("MAX_COST", 10000),
+        max_depth=config.get("MAX_DEPTH", 10),
+        default_list_size=config.get("DEFAULT_LIST_SIZE", 100),
+        list_sizes=config.get("LIST_SIZES"),
+        throttle=throttle,
+    )
+
+
+# Shared instance
+query_cost = build_query_cost_analyzer()
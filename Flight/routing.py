@@ -0,0 +1,204 @@
+import bisect
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from Flight.models import Flight
+
+
+class Leg(NamedTuple):
+    """A flight as a timed edge between two airports."""
+    flight_id: int
+    departure_airport_id: int
+    arrival_airport_id: int
+    departure_datetime: object
+    arrival_datetime: object
+    final_price: int
+
+
+class Itinerary(NamedTuple):
+    legs: tuple
+
+    @property
+    def stops(self):
+        return len(self.legs) - 1
+
+    @property
+    def total_price(self):
+        return sum(leg.final_price for leg in self.legs)
+
+    @property
+    def departure_datetime(self):
+        return self.legs[0].departure_datetime
+
+    @property
+    def arrival_datetime(self):
+        return self.legs[-1].arrival_datetime
+
+    @property
+    def duration(self):
+        return self.arrival_datetime - self.departure_datetime
+
+
+def _as_datetime(value):
+    # Command instances keep the raw value they were created with: an ISO string, possibly without an
+    # offset, or a naive datetime. Store it as the database does, so every edge compares with the others.
+    value = Flight._meta.get_field("departure_datetime").to_python(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+class RouteGraph:
+    """
+    In-process time-expanded route graph of all flights.
+
+    Airports are nodes and flights are timed edges; the departures of every
+    airport are kept sorted by departure time so the onward flights that fit a
+    layover window are found with a binary search. The graph is built from the
+    Flight table on first use and then patched in place as the Flight commands
+    commit (see ``Flight.signals``). Because every worker holds its own copy, it is
+    also rebuilt after ``ROUTE_GRAPH_MAX_AGE`` seconds to pick up writes made
+    by other workers.
+    """
+    MAX_STOPS = 3
+    MAX_RESULTS = 100
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._legs = {}  # flight_id -> Leg
+        self._departures = defaultdict(list)  # airport_id -> sorted [(departure_datetime, flight_id)]
+        self._built_at = None
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    def build(self):
+        # Load every flight once and index it by departure airport
+        legs = {}
+        departures = defaultdict(list)
+        rows = Flight.objects.values_list(
+            "id", "departure_airport_id", "arrival_airport_id",
+            "departure_datetime", "arrival_datetime", "final_price"
+        )
+        for row in rows.iterator(chunk_size=2000):
+            leg = Leg(*row)
+            legs[leg.flight_id] = leg
+            departures[leg.departure_airport_id].append((leg.departure_datetime, leg.flight_id))
+        for entries in departures.values():
+            entries.sort()
+        with self._lock:
+            self._legs = legs
+            self._departures = departures
+            self._built_at = time.monotonic()
+
+    def ensure_built(self):
+        max_age = getattr(settings, "ROUTE_GRAPH_MAX_AGE", 300)
+        if not self.is_built or time.monotonic() - self._built_at > max_age:
+            self.build()
+
+    def reset(self):
+        with self._lock:
+            self._legs = {}
+            self._departures = defaultdict(list)
+            self._built_at = None
+
+    def add(self, flight):
+        """Insert or replace the edge for ``flight``."""
+        if not self.is_built:
+            return
+        leg = Leg(
+            flight_id=flight.pk,
+            departure_airport_id=flight.departure_airport_id,
+            arrival_airport_id=flight.arrival_airport_id,
+            departure_datetime=_as_datetime(flight.departure_datetime),
+            arrival_datetime=_as_datetime(flight.arrival_datetime),
+            final_price=flight.final_price,
+        )
+        with self._lock:
+            self.remove(leg.flight_id)
+            self._legs[leg.flight_id] = leg
+            bisect.insort(self._departures[leg.departure_airport_id], (leg.departure_datetime, leg.flight_id))
+
+    def remove(self, flight_id):
+        """Drop the edge of a flight, if the graph has it."""
+        with self._lock:
+            leg = self._legs.pop(flight_id, None)
+            if leg is None:
+                return
+            entries = self._departures[leg.departure_airport_id]
+            index = bisect.bisect_left(entries, (leg.departure_datetime, leg.flight_id))
+            if index < len(entries) and entries[index][1] == flight_id:
+                del entries[index]
+
+    def _departing(self, airport_id, start, end):
+        # Flights leaving ``airport_id`` with start <= departure_datetime <= end
+        entries = self._departures.get(airport_id, ())
+        index = bisect.bisect_left(entries, (start, 0))
+        while index < len(entries) and entries[index][0] <= end:
+            yield self._legs[entries[index][1]]
+            index += 1
+
+    def itineraries(self, origin_id, destination_id, depart_after, depart_before, max_stops=1,
+                    min_layover=timedelta(minutes=60), max_layover=timedelta(hours=12),
+                    sort_by="price", limit=20):
+        """
+        Find itineraries from ``origin_id`` to ``destination_id`` whose first leg
+        departs in ``[depart_after, depart_before]``, with at most ``max_stops``
+        connections and every layover between ``min_layover`` and ``max_layover``.
+        Results are sorted by total ``final_price`` (``"price"``) or total
+        ``"duration"``.
+
+        The search is best-first: partial itineraries wait on a heap ordered by
+        the sort key, which only grows as legs are added, so complete ones come
+        off it already in order and the search stops after the ``limit``-th.
+        """
+        if not 0 <= max_stops <= self.MAX_STOPS:
+            raise Exception(f"max_stops must be between 0 and {self.MAX_STOPS}.")
+        if sort_by not in ("price", "duration"):
+            raise Exception("sort_by must be 'price' or 'duration'.")
+        if not 1 <= limit <= self.MAX_RESULTS:
+            raise Exception(f"limit must be between 1 and {self.MAX_RESULTS}.")
+        self.ensure_built()
+
+        def entry(path, price):
+            duration = path[-1].arrival_datetime - path[0].departure_datetime
+            key = (price, duration) if sort_by == "price" else (duration, price)
+            return key, next(order), price, path
+
+        def worth_keeping(path, leg, visited):
+            # Reaches the destination, or may still connect there within max_stops
+            return leg.arrival_airport_id not in visited and (
+                leg.arrival_airport_id == destination_id or len(path) < max_stops)
+
+        order = itertools.count()  # Ties leave the heap in the order they were found
+        found = []
+        with self._lock:
+            heap = [entry((leg,), leg.final_price) for leg in self._departing(origin_id, depart_after, depart_before)
+                    if worth_keeping((), leg, {origin_id})]
+            heapq.heapify(heap)
+            while heap and len(found) < limit:
+                _, _, price, path = heapq.heappop(heap)
+                last = path[-1]
+                if last.arrival_airport_id == destination_id:
+                    found.append(Itinerary(path))
+                    continue
+                visited = {path[0].departure_airport_id, *(leg.arrival_airport_id for leg in path)}
+                earliest = last.arrival_datetime + min_layover
+                latest = last.arrival_datetime + max_layover
+                for leg in self._departing(last.arrival_airport_id, earliest, latest):
+                    if worth_keeping(path, leg, visited):
+                        heapq.heappush(heap, entry(path + (leg,), price + leg.final_price))
+        return found
+
+
+# Shared graph instance
+route_graph = RouteGraph()
@@ -3,16 +3,18 @@ from Flight.mutations.flight_mutation import FlightMutations
 from Flight.mutations.aircraft_mutation import AircraftMutations
 from Flight.mutations.airline_mutation import AirlineMutations
 from Flight.mutations.airport_mutation import AirportMutations
-from Flight.query import FlightQueries, AirportQueries, AirlineQueries, AircraftQueries
+from Flight.mutations.seat_mutation import SeatMutations
+from Flight.query import FlightQueries, AirportQueries, AirlineQueries, AircraftQueries, SearchQueries
 
 
 # Combine all mutations into a single class
-class Mutation(FlightMutations, AircraftMutations, AirlineMutations, AirportMutations, graphene.ObjectType):
+class Mutation(FlightMutations, AircraftMutations, AirlineMutations, AirportMutations, SeatMutations,
+               graphene.ObjectType):
     pass
 
 
 # Combine all queries into a single class
-class Query(FlightQueries, AirportQueries, AirlineQueries, AircraftQueries, graphene.ObjectType):
+class Query(FlightQueries, AirportQueries, AirlineQueries, AircraftQueries, SearchQueries, graphene.ObjectType):
     pass
 
 
@@ -0,0 +1,238 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.conf import settings
+
+from Flight.models import Airline, Airport, Flight
+
+TOKEN = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Lowercase ``text`` and strip its diacritics ("Zürich" -> "zurich")."""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text):
+    return TOKEN.findall(normalize(text)) if text else []
+
+
+def trigrams(token):
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Hit(NamedTuple):
+    kind: str  # "airport", "airline" or "flight"
+    pk: int
+    score: float
+
+
+class SearchIndex:
+    """
+    In-process inverted index over airports, airlines and flights.
+
+    Each document is a set of weighted terms (codes weigh more than names and
+    cities); a flight is indexed under its number and the codes and names of
+    its airports and airline. Query terms match exactly, as a prefix of an
+    indexed term, or fuzzily by trigram similarity, and documents are ranked
+    by how many query terms they match, then by weight times IDF.
+
+    Like the route graph, the index is built on first use, patched in place
+    from the model signals (see ``Flight.signals``) and rebuilt after
+    ``SEARCH_INDEX_MAX_AGE`` seconds to pick up writes made by other workers.
+    """
+    FIELDS = {
+        Airport: ("airport", (("airport_code", 4.0), ("airport_name", 2.0), ("airport_city", 2.0),
+                              ("airport_country", 1.0))),
+        Airline: ("airline", (("airline_code", 4.0), ("airline_name", 2.0))),
+    }
+    # Fields of its airports and airline a flight is also found by, at a fraction of their weight
+    REFERENCE_FIELDS = ("airport_code", "airport_city", "airline_code", "airline_name")
+    REFERENCE_WEIGHT = 0.5
+    FLIGHT_NUMBER_WEIGHT = 4.0
+    PREFIX_TERMS = 50  # Indexed terms a query term may expand to as a prefix
+    SIMILARITY = 0.3  # Minimum trigram similarity of a fuzzy match, as pg_trgm's default
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._terms = {}  # (kind, pk) -> {term: weight}
+        self._postings = defaultdict(dict)  # term -> {(kind, pk): weight}
+        self._vocabulary = []  # Sorted terms, for prefix matches
+        self._trigrams = defaultdict(set)  # trigram -> terms
+        self._references = {}  # ("airport" | "airline", pk) -> {term: weight} a flight inherits
+        self._flights = {}  # flight pk -> (flight_number, departure_airport_id, arrival_airport_id, airline_id)
+        self._referrers = defaultdict(set)  # ("airport" | "airline", pk) -> flight pks
+        self._built_at = None
+        self._building = False
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    def build(self):
+        with self._lock:
+            self._clear()
+            self._building = True  # The vocabulary is sorted once at the end
+            for model, (kind, fields) in self.FIELDS.items():
+                for pk, *values in model.objects.values_list("pk", *(name for name, _ in fields)).iterator():
+                    self._index_reference(model, pk, dict(zip((name for name, _ in fields), values)))
+            rows = Flight.objects.values_list("pk", "flight_number", "departure_airport_id",
+                                              "arrival_airport_id", "airline_id")
+            for pk, *row in rows.iterator(chunk_size=2000):
+                self._index_flight(pk, tuple(row))
+            self._vocabulary = sorted(self._postings)
+            self._building = False
+            self._built_at = time.monotonic()
+
+    def ensure_built(self):
+        max_age = getattr(settings, "SEARCH_INDEX_MAX_AGE", 300)
+        if not self.is_built or time.monotonic() - self._built_at > max_age:
+            self.build()
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def add(self, instance):
+        """Index or re-index a saved Airport, Airline or Flight."""
+        if not self.is_built:
+            return
+        with self._lock:
+            if isinstance(instance, Flight):
+                self._index_flight(instance.pk, (instance.flight_number, instance.departure_airport_id,
+                                                 instance.arrival_airport_id, instance.airline_id))
+            else:
+                fields = self.FIELDS[type(instance)][1]
+                self._index_reference(type(instance), instance.pk,
+                                      {name: getattr(instance, name) for name, _ in fields})
+
+    def remove(self, model, pk):
+        """Drop a deleted Airport, Airline or Flight from the index."""
+        if not self.is_built:
+            return
+        with self._lock:
+            if model is Flight:
+                row = self._flights.pop(pk, None)
+                if row is not None:
+                    self._referrers[("airport", row[1])].discard(pk)
+                    self._referrers[("airport", row[2])].discard(pk)
+                    self._referrers[("airline", row[3])].discard(pk)
+                self._set_terms(("flight", pk), {})
+            else:
+                kind = self.FIELDS[model][0]
+                self._references.pop((kind, pk), None)
+                self._set_terms((kind, pk), {})
+
+    def _index_reference(self, model, pk, values):
+        kind, fields = self.FIELDS[model]
+        terms, inherited = {}, {}
+        for name, weight in fields:
+            for term in tokenize(values[name]):
+                terms[term] = max(terms.get(term, 0), weight)
+                if name in self.REFERENCE_FIELDS:
+                    inherited[term] = max(inherited.get(term, 0), weight * self.REFERENCE_WEIGHT)
+        self._set_terms((kind, pk), terms)
+        self._references[(kind, pk)] = inherited
+        # Flights carry the codes and names of their airports and airline
+        for flight_pk in list(self._referrers.get((kind, pk), ())):
+            self._index_flight(flight_pk, self._flights[flight_pk])
+
+    def _index_flight(self, pk, row):
+        previous = self._flights.get(pk)
+        if previous is not None:
+            self._referrers[("airport", previous[1])].discard(pk)
+            self._referrers[("airport", previous[2])].discard(pk)
+            self._referrers[("airline", previous[3])].discard(pk)
+        flight_number, departure_airport_id, arrival_airport_id, airline_id = row
+        self._flights[pk] = row
+        terms = {}
+        for reference in (("airport", departure_airport_id), ("airport", arrival_airport_id), ("airline", airline_id)):
+            self._referrers[reference].add(pk)
+            for term, weight in self._references.get(reference, {}).items():
+                terms[term] = max(terms.get(term, 0), weight)
+        for term in tokenize(flight_number):
+            terms[term] = self.FLIGHT_NUMBER_WEIGHT
+        self._set_terms(("flight", pk), terms)
+
+    def _set_terms(self, key, terms):
+        for term in self._terms.pop(key, {}):
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+                for gram in trigrams(term):
+                    self._trigrams[gram].discard(term)
+        if not terms:
+            return
+        self._terms[key] = terms
+        for term, weight in terms.items():
+            postings = self._postings[term]
+            if not postings:
+                if not self._building:
+                    bisect.insort(self._vocabulary, term)
+                for gram in trigrams(term):
+                    self._trigrams[gram].add(term)
+            postings[key] = weight
+
+    def _expand(self, token):
+        """Indexed terms ``token`` matches, with a similarity in (0, 1]."""
+        matches = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        index = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[index:index + self.PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            matches.setdefault(term, 0.5 + 0.4 * len(token) / len(term))
+        if len(token) >= 3:
+            grams = trigrams(token)
+            shared = defaultdict(int)
+            for gram in grams:
+                for term in self._trigrams.get(gram, ()):
+                    shared[term] += 1
+            for term, count in shared.items():
+                similarity = count / (len(grams) + len(trigrams(term)) - count)
+                if similarity >= self.SIMILARITY and similarity * 0.8 > matches.get(term, 0):
+                    matches[term] = similarity * 0.8
+        return matches
+
+    def search(self, text, kinds=None, limit=20):
+        """The best ``limit`` hits for ``text``, optionally of the given kinds only."""
+        self.ensure_built()
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        with self._lock:
+            documents = len(self._terms) or 1
+            for token in dict.fromkeys(tokenize(text)):
+                best = {}
+                for term, similarity in self._expand(token).items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + documents / len(postings))
+                    for key, weight in postings.items():
+                        if kinds is not None and key[0] not in kinds:
+                            continue
+                        score = weight * similarity * idf
+                        if score > best.get(key, 0):
+                            best[key] = score
+                for key, score in best.items():
+                    scores[key] += score
+                    matched[key] += 1
+        ranked = heapq.nsmallest(limit, scores, key=lambda key: (-matched[key], -scores[key], key))
+        return [Hit(kind, pk, round(scores[(kind, pk)], 4)) for kind, pk in ranked]
+
+
+# Shared index instance
+search_index = SearchIndex()
@@ -1,91 +1,188 @@
-# from django.db.models.signals import post_save, post_delete
-# from django.dispatch import receiver
-# from .models import Airline, Airport, Aircraft, Flight
-# from .documents import AirlineDocument, AirportDocument, AircraftDocument, FlightDocument
-#
-#
-# # Signal for Airline model
-# class AirlineSignalHandler:
-#     @staticmethod
-#     @receiver(post_save, sender=Airline)
-#     def update_airline_elasticsearch(sender, instance, created, **kwargs):
-#         """
-#         When an Airline is created or updated, sync it with Elasticsearch.
-#         """
-#         if created:
-#             AirlineDocument().update(instance)
-#         else:
-#             AirlineDocument().update(instance)
-#
-#     @staticmethod
-#     @receiver(post_delete, sender=Airline)
-#     def delete_airline_elasticsearch(sender, instance, **kwargs):
-#         """
-#         When an Airline is deleted, remove it from Elasticsearch.
-#         """
-#         AirlineDocument().delete(instance)
-#
-#
-# # Signal for Airport model
-# class AirportSignalHandler:
-#     @staticmethod
-#     @receiver(post_save, sender=Airport)
-#     def update_airport_elasticsearch(sender, instance, created, **kwargs):
-#         """
-#         When an Airport is created or updated, sync it with Elasticsearch.
-#         """
-#         if created:
-#             AirportDocument().update(instance)
-#         else:
-#             AirportDocument().update(instance)
-#
-#     @staticmethod
-#     @receiver(post_delete, sender=Airport)
-#     def delete_airport_elasticsearch(sender, instance, **kwargs):
-#         """
-#         When an Airport is deleted, remove it from Elasticsearch.
-#         """
-#         AirportDocument().delete(instance)
-#
-#
-# # Signal for Aircraft model
-# class AircraftSignalHandler:
-#     @staticmethod
-#     @receiver(post_save, sender=Aircraft)
-#     def update_aircraft_elasticsearch(sender, instance, created, **kwargs):
-#         """
-#         When an Aircraft is created or updated, sync it with Elasticsearch.
-#         """
-#         if created:
-#             AircraftDocument().update(instance)
-#         else:
-#             AircraftDocument().update(instance)
-#
-#     @staticmethod
-#     @receiver(post_delete, sender=Aircraft)
-#     def delete_aircraft_elasticsearch(sender, instance, **kwargs):
-#         """
-#         When an Aircraft is deleted, remove it from Elasticsearch.
-#         """
-#         AircraftDocument().delete(instance)
-#
-#
-# class FlightSignalHandler:
-#     @staticmethod
-#     @receiver(post_save, sender=Flight)
-#     def update_flight_elasticsearch(sender, instance, created, **kwargs):
-#         """
-#         When a Flight is created or updated, sync it with Elasticsearch.
-#         """
-#         if created:
-#             FlightDocument().update(instance)
-#         else:
-#             FlightDocument().update(instance)
-#
-#     @staticmethod
-#     @receiver(post_delete, sender=Flight)
-#     def delete_flight_elasticsearch(sender, instance, **kwargs):
-#         """
-#         When a Flight is deleted, remove it from Elasticsearch.
-#         """
-#         FlightDocument().delete(instance)
\ No newline at end of file
+from contextlib import contextmanager
+from contextvars import ContextVar
+from copy import copy
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from .models import Airline, Airport, Aircraft, Flight
+from . import listings
+from .cache import lookup_cache
+from .index_sync import index_sync
+from .routing import route_graph
+from .search import search_index
+from .suggest import airport_suggester
+
+
+# Sent by the Command classes once a write went through. ``sender`` is the model
+# class, ``saved`` the created/updated instances and ``deleted`` the removed ones
+# (with their primary key still set). Observers that keep in-process structures
+# in step with the commands subscribe to it.
+rows_changed = Signal()
+
+
+def patch_on_commit(add, remove, saved=(), deleted=()):
+    """
+    Apply a write to an in-process structure (route graph, search index,
+    autocomplete) through its ``add(instance)`` and ``remove(pk)`` once the
+    transaction commits, so a rolled back write never reaches it. The rows are
+    copied now, as they were written.
+    """
+    saved = [copy(instance) for instance in saved]
+    deleted = [instance.pk for instance in deleted]
+
+    def patch():
+        for pk in deleted:
+            remove(pk)
+        for instance in saved:
+            add(instance)
+    transaction.on_commit(patch)
+
+
+class RouteGraphSignalHandler:
+    @staticmethod
+    @receiver(rows_changed, sender=Flight)
+    def update_route_graph(sender, saved=(), deleted=(), **kwargs):
+        """
+        Patch the in-process route graph in place instead of rebuilding it.
+        """
+        patch_on_commit(route_graph.add, route_graph.remove, saved, deleted)
+
+
+class LookupCacheSignalHandler:
+    @staticmethod
+    @receiver(rows_changed)
+    @receiver(post_save)
+    @receiver(post_delete)
+    def invalidate_lookup_cache(sender, **kwargs):
+        """
+        Bump the lookup cache version of the written model, so no read after a
+        write is served from an older entry. rows_changed covers the command
+        classes (bulk ones included); the model signals cover any other write.
+
+        It is bumped again once the transaction commits: until then other
+        requests still read the old row and may cache it under the new version.
+        """
+        if sender in (Airline, Airport, Aircraft, Flight):
+            lookup_cache.invalidate(sender)
+            transaction.on_commit(partial(lookup_cache.invalidate, sender))
+
+
+class SearchIndexSignalHandler:
+    @staticmethod
+    @receiver(post_save, sender=Airport)
+    @receiver(post_save, sender=Airline)
+    @receiver(post_save, sender=Flight)
+    def index_saved(sender, instance, **kwargs):
+        patch_on_commit(search_index.add, partial(search_index.remove, sender), saved=[instance])
+
+    @staticmethod
+    @receiver(post_delete, sender=Airport)
+    @receiver(post_delete, sender=Airline)
+    @receiver(post_delete, sender=Flight)
+    def unindex_deleted(sender, instance, **kwargs):
+        patch_on_commit(search_index.add, partial(search_index.remove, sender), deleted=[instance])
+
+    @staticmethod
+    @receiver(rows_changed)
+    def index_rows_changed(sender, saved=(), deleted=(), **kwargs):
+        """
+        Keep the search index in step with bulk writes, which bypass the model
+        signals; for single-row commands re-indexing the same row is a no-op.
+        """
+        if sender not in (Airport, Airline, Flight):
+            return
+        patch_on_commit(search_index.add, partial(search_index.remove, sender), saved, deleted)
+
+
+class AirportSuggestSignalHandler:
+    @staticmethod
+    @receiver(rows_changed, sender=Airport)
+    def update_airport_suggester(sender, saved=(), deleted=(), **kwargs):
+        """
+        Patch the autocomplete array in place from the Airport commands.
+        """
+        patch_on_commit(airport_suggester.add, airport_suggester.remove, saved, deleted)
+
+    @staticmethod
+    @receiver(post_save, sender=Airport)
+    def add_saved_airport(sender, instance, **kwargs):
+        # Covers writes outside the commands, such as the admin
+        patch_on_commit(airport_suggester.add, airport_suggester.remove, saved=[instance])
+
+    @staticmethod
+    @receiver(post_delete, sender=Airport)
+    def remove_deleted_airport(sender, instance, **kwargs):
+        patch_on_commit(airport_suggester.add, airport_suggester.remove, deleted=[instance])
+
+
+# True while a command writes flights through save()/delete() that it reports
+# through rows_changed right after: the per-instance listing receivers leave
+# those rows to the report, so each one is synced once
+_reported_flights = ContextVar("reported_flights", default=False)
+
+
+@contextmanager
+def reported_by_rows_changed():
+    token = _reported_flights.set(True)
+    try:
+        yield
+    finally:
+        _reported_flights.reset(token)
+
+
+class FlightListingSignalHandler:
+    @staticmethod
+    @receiver(rows_changed, sender=Flight)
+    def sync_changed_flights(sender, saved=(), deleted=(), **kwargs):
+        """
+        Keep the search read model (Flight/listings.py) in step with the
+        commands, bulk ones included, inside their transaction.
+        """
+        if deleted:
+            listings.remove_flights([flight.pk for flight in deleted])
+        if saved:
+            listings.sync_flights([flight.pk for flight in saved])
+
+    @staticmethod
+    @receiver(post_save, sender=Flight)
+    def sync_saved_flight(sender, instance, **kwargs):
+        # Covers writes outside the commands, such as the admin
+        if not _reported_flights.get():
+            listings.sync_flights([instance.pk])
+
+    @staticmethod
+    @receiver(post_delete, sender=Flight)
+    def remove_deleted_flight(sender, instance, **kwargs):
+        # Also covers the flights deleted along with their airport, airline or aircraft
+        if not _reported_flights.get():
+            listings.remove_flights([instance.pk])
+
+    @staticmethod
+    @receiver(post_save, sender=Airport)
+    @receiver(post_save, sender=Airline)
+    @receiver(post_save, sender=Aircraft)
+    def sync_referencing_flights(sender, instance, created, **kwargs):
+        # Listings copy the codes and cities of their airports, airline and aircraft
+        if not created:
+            listings.sync_references(sender, [instance.pk])
+
+
+class IndexSyncSignalHandler:
+    @staticmethod
+    @receiver(post_save)
+    @receiver(post_delete)
+    def queue_written_row(sender, instance, **kwargs):
+        """
+        Queue a written row for the external search index; the queue sends it
+        in bulk once the transaction commits (see ``Flight.index_sync``).
+        """
+        if index_sync is not None:
+            index_sync.enqueue(sender, [instance.pk])
+
+    @staticmethod
+    @receiver(rows_changed)
+    def queue_changed_rows(sender, saved=(), deleted=(), **kwargs):
+        if index_sync is not None:
+            index_sync.enqueue(sender, [instance.pk for instance in (*saved, *deleted)])
@@ -0,0 +1,118 @@
+import bisect
+import heapq
+import threading
+import time
+
+from django.conf import settings
+
+from Flight.models import Airport
+from Flight.search import tokenize
+
+# How a key matched, best first
+EXACT_CODE, CODE, NAME, CITY, WORD = range(5)
+
+
+class AirportSuggester:
+    """
+    Airport autocomplete from a sorted array of normalized keys.
+
+    Every airport is filed under its code, its full name and city, and each
+    later word of those, all case- and accent-folded. A prefix is a binary
+    search plus a scan of the keys that start with it; results rank an exact
+    code first, then code, name, city and inner-word prefixes. The airports
+    themselves are kept in memory, so a suggestion never reads the database.
+
+    Built on first use, patched in place by the Airport commands (see
+    ``Flight.signals``) and rebuilt after ``AIRPORT_SUGGEST_MAX_AGE`` seconds
+    to pick up writes made by other workers.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._airports = {}  # id -> Airport
+        self._keys = {}  # id -> its entries
+        self._entries = []  # sorted (key, rank, id)
+        self._built_at = None
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    @staticmethod
+    def entries(airport):
+        entries = {(" ".join(tokenize(airport.airport_code)), CODE, airport.pk)}
+        for rank, text in ((NAME, airport.airport_name), (CITY, airport.airport_city)):
+            words = tokenize(text)
+            if words:
+                entries.add((" ".join(words), rank, airport.pk))
+                entries.update((word, WORD, airport.pk) for word in words[1:])
+        return entries
+
+    def build(self):
+        airports = {airport.pk: airport for airport in Airport.objects.all()}
+        keys = {pk: self.entries(airport) for pk, airport in airports.items()}
+        entries = sorted(entry for airport_entries in keys.values() for entry in airport_entries)
+        with self._lock:
+            self._airports, self._keys, self._entries = airports, keys, entries
+            self._built_at = time.monotonic()
+
+    def ensure_built(self):
+        max_age = getattr(settings, "AIRPORT_SUGGEST_MAX_AGE", 300)
+        if not self.is_built or time.monotonic() - self._built_at > max_age:
+            self.build()
+
+    def reset(self):
+        with self._lock:
+            self._airports, self._keys, self._entries = {}, {}, []
+            self._built_at = None
+
+    def add(self, airport):
+        """Insert or replace ``airport``."""
+        if not self.is_built:
+            return
+        # A copy, so later changes to the caller's instance do not leak in before they are saved
+        airport = Airport(**{field.attname: getattr(airport, field.attname)
+                             for field in Airport._meta.concrete_fields})
+        with self._lock:
+            self._remove(airport.pk)
+            self._airports[airport.pk] = airport
+            self._keys[airport.pk] = self.entries(airport)
+            for entry in self._keys[airport.pk]:
+                bisect.insort(self._entries, entry)
+
+    def remove(self, airport_id):
+        if not self.is_built:
+            return
+        with self._lock:
+            self._remove(airport_id)
+
+    def _remove(self, airport_id):
+        self._airports.pop(airport_id, None)
+        for entry in self._keys.pop(airport_id, ()):
+            index = bisect.bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+
+    def suggest(self, prefix, limit=10):
+        """Up to ``limit`` airports whose code, name or city starts with ``prefix``, best first."""
+        prefix = " ".join(tokenize(prefix))
+        if not prefix:
+            return []
+        self.ensure_built()
+        best = {}  # id -> best rank
+        with self._lock:
+            entries = self._entries
+            index = bisect.bisect_left(entries, (prefix,))
+            while index < len(entries) and entries[index][0].startswith(prefix):
+                key, rank, airport_id = entries[index]
+                if rank == CODE and key == prefix:
+                    rank = EXACT_CODE
+                if rank < best.get(airport_id, WORD + 1):
+                    best[airport_id] = rank
+                index += 1
+            airports = self._airports
+            ranked = heapq.nsmallest(limit, best, key=lambda pk: (best[pk], airports[pk].airport_code))
+            return [airports[pk] for pk in ranked]
+
+
+# Shared instance
+airport_suggester = AirportSuggester()
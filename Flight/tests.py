@@ -1,4 +1,22 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management import call_command
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.test import Client, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphql import parse
 from Flight.models import Aircraft
 from Flight.mutations.aircraft_mutation import (
     CreateAircraftCommand,
@@ -23,14 +41,35 @@ from Flight.mutations.airport_mutation import (
     AirportCommandHandler
 )
 from Flight.query import AirportQueries
-from Flight.models import Flight
+from Flight.models import ArchivedFlight, CommandHistory, FareCalendarDay, Flight, FlightListing, SeatHold
 from Flight.mutations.flight_mutation import (
     CreateFlightCommand,
     UpdateFlightCommand,
     DeleteFlightCommand,
+    BulkCreateFlightCommand,
+    BulkUpdateFlightCommand,
+    BulkDeleteFlightCommand,
+    RepriceFlightsCommand,
     FlightCommandHandler
 )
 from Flight.query import FlightQueries
+from Flight import connections, inventory, listings
+from Flight.archive import archive_flights
+from Flight.cache import LookupCache, LRUCacheBackend, DjangoCacheBackend, build_lookup_cache, lookup_cache
+from Flight.document_cache import PersistedQueryRegistry, document_cache, query_hash
+from Flight.history import history_scope
+from Flight.index_sync import FileIndexBackend, IndexSyncQueue, MemoryIndexBackend
+from Flight.loaders import Loaders
+from Flight.metrics import Histogram, metrics
+from Flight.pagination import apaginate
+from Flight.query_cost import CostThrottle, query_cost
+from Flight.routing import route_graph
+from Flight.search import search_index, tokenize
+from Flight.suggest import airport_suggester
+from FlightsService.schema import schema
+from benchmarks.plans import explain
+from benchmarks.runner import OPERATIONS, run
+from benchmarks.seed import seed
 
 
 class AircraftTestCase(TestCase):
@@ -548,4 +587,1590 @@ class FlightTestCase(TestCase):
         query = FlightQueries()
         result = query.resolve_flight_by_number(None, flight_number="INVALID123")
 
-        self.assertIsNone(result)
\ No newline at end of file
+        self.assertIsNone(result)
+
+class FlightLoaderTestCase(TestCase):
+    QUERY = """
+        query {
+            allFlights {
+                edges {
+                    node {
+                        flightNumber
+                        departureAirport { airportCode }
+                        arrivalAirport { airportCode }
+                        airline { airlineCode }
+                        aircraft { aircraftModel }
+                    }
+                }
+            }
+        }
+    """
+
+    def setUp(self):
+        self.aircraft = Aircraft.objects.create(
+            aircraft_model="Airbus A380",
+            aircraft_capacity=500,
+            aircraft_manufacturer="Airbus"
+        )
+
+    def create_flights(self, count):
+        # Every flight gets its own airports and airline so nothing is shared by accident
+        for i in range(Flight.objects.count(), Flight.objects.count() + count):
+            Flight.objects.create(
+                flight_number=f"LD{i}",
+                flight_type="INTERNATIONAL",
+                trip_type="DIRECT",
+                departure_airport=Airport.objects.create(airport_code=f"D{i}", airport_name="Dep",
+                                                         airport_city="City", airport_country="Country"),
+                arrival_airport=Airport.objects.create(airport_code=f"A{i}", airport_name="Arr",
+                                                       airport_city="City", airport_country="Country"),
+                departure_datetime="2025-02-02T10:00:00Z",
+                arrival_datetime="2025-02-02T14:00:00Z",
+                airline=Airline.objects.create(airline_code=f"L{i}", airline_name="Airline", airline_rules="Rules"),
+                aircraft=self.aircraft,
+                cabin_type="ECONOMY",
+                base_price=500,
+                tax=10,
+                discount=0,
+                baggage_limit_kg=30.0,
+                flight_rules="Rules"
+            )
+
+    def execute(self):
+        result = schema.execute(self.QUERY, context_value=RequestFactory().post("/graphql/"))
+        self.assertIsNone(result.errors)
+        return [edge["node"] for edge in result.data["allFlights"]["edges"]]
+
+    def test_query_count_stays_flat(self):
+        # The selected relations are joined into the listing query itself
+        self.create_flights(2)
+        with self.assertNumQueries(1):
+            flights = self.execute()
+        self.assertEqual(len(flights), 2)
+
+        self.create_flights(20)
+        with self.assertNumQueries(1):
+            flights = self.execute()
+        self.assertEqual(len(flights), 22)
+        self.assertEqual(flights[0]["departureAirport"]["airportCode"], "D0")
+        self.assertEqual(flights[0]["arrivalAirport"]["airportCode"], "A0")
+        self.assertEqual(flights[0]["airline"]["airlineCode"], "L0")
+
+    def test_loaders_batch_primed_keys(self):
+        self.create_flights(5)
+        flights = list(Flight.objects.all())
+        loaders = Loaders()
+        loaders.prime_flights(flights)
+        with self.assertNumQueries(3):
+            for flight in flights:
+                self.assertEqual(loaders.airports.load(flight.departure_airport_id).pk, flight.departure_airport_id)
+                loaders.airports.load(flight.arrival_airport_id)
+                loaders.airlines.load(flight.airline_id)
+                loaders.aircrafts.load(flight.aircraft_id)
+
+
+class ProjectionTestCase(TestCase):
+    def setUp(self):
+        airport = Airport.objects.create(airport_code="MHD", airport_name="Mashhad",
+                                         airport_city="Mashhad", airport_country="Iran")
+        airline = Airline.objects.create(airline_code="W5", airline_name="Mahan", airline_rules="Long rules")
+        aircraft = Aircraft.objects.create(aircraft_model="Airbus A310", aircraft_capacity=220,
+                                           aircraft_manufacturer="Airbus")
+        for i in range(3):
+            Flight.objects.create(
+                flight_number=f"W5{i}",
+                flight_type="DOMESTIC",
+                trip_type="DIRECT",
+                departure_airport=airport,
+                arrival_airport=airport,
+                departure_datetime="2025-05-01T10:00:00Z",
+                arrival_datetime="2025-05-01T11:00:00Z",
+                airline=airline,
+                aircraft=aircraft,
+                cabin_type="ECONOMY",
+                base_price=100,
+                baggage_limit_kg=20.0,
+                flight_rules="Very long rules"
+            )
+
+    def execute(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            result = schema.execute(query, context_value=RequestFactory().post("/graphql/"))
+        self.assertIsNone(result.errors)
+        return result.data, [query["sql"] for query in queries.captured_queries]
+
+    def test_unselected_columns_are_not_read(self):
+        data, queries = self.execute("""
+            query { allFlights { edges { node { flightNumber finalPrice airline { airlineCode } } } } }
+        """)
+        self.assertEqual(len(data["allFlights"]["edges"]), 3)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("flight_rules", queries[0])
+        self.assertNotIn("airline_rules", queries[0])
+        self.assertNotIn("base_price", queries[0])
+
+    def test_reverse_relation_is_prefetched(self):
+        data, queries = self.execute("""
+            query { allAirports { edges { node { airportCode departures { flightNumber } } } } }
+        """)
+        self.assertEqual(len(data["allAirports"]["edges"][0]["node"]["departures"]), 3)
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn("flight_rules", queries[1])
+
+    def test_reverse_relation_of_airlines_and_aircraft_is_prefetched(self):
+        # Reached through ``flight_set``, not the ``flight`` query name
+        for code in ("IR", "EP"):
+            Airline.objects.create(airline_code=code, airline_name=code, airline_rules="Rules")
+            Aircraft.objects.create(aircraft_model=f"Fokker {code}", aircraft_capacity=100,
+                                    aircraft_manufacturer="Fokker")
+        for field, key in (("allAirlines", "airlineCode"), ("allAircrafts", "aircraftModel")):
+            with self.assertNumQueries(2):
+                data, queries = self.execute("query { %s { edges { node { %s flightSet { flightNumber } } } } }"
+                                             % (field, key))
+            self.assertEqual(sorted(len(edge["node"]["flightSet"]) for edge in data[field]["edges"]), [0, 0, 3])
+            self.assertNotIn("flight_rules", queries[1])
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        airport = Airport.objects.create(airport_code="IKA", airport_name="Imam Khomeini",
+                                         airport_city="Tehran", airport_country="Iran")
+        airline = Airline.objects.create(airline_code="IR", airline_name="Iran Air", airline_rules="Rules")
+        aircraft = Aircraft.objects.create(aircraft_model="Airbus A300", aircraft_capacity=250,
+                                           aircraft_manufacturer="Airbus")
+        # Two flights share each departure time, so the id tie-breaker matters
+        for i in range(10):
+            Flight.objects.create(
+                flight_number=f"IR{i}",
+                flight_type="DOMESTIC",
+                trip_type="DIRECT",
+                departure_airport=airport,
+                arrival_airport=airport,
+                departure_datetime=f"2025-03-0{9 - i // 2}T10:00:00Z",
+                arrival_datetime=f"2025-03-0{9 - i // 2}T12:00:00Z",
+                airline=airline,
+                aircraft=aircraft,
+                cabin_type="ECONOMY",
+                base_price=100,
+                baggage_limit_kg=20.0,
+                flight_rules="Rules"
+            )
+
+    def execute(self, arguments):
+        query = """
+            query {
+                allFlights(%s) {
+                    edges { cursor node { flightNumber } }
+                    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+                }
+            }
+        """ % arguments
+        result = schema.execute(query, context_value=RequestFactory().post("/graphql/"))
+        self.assertIsNone(result.errors)
+        return result.data["allFlights"]
+
+    def test_pages_follow_departure_then_id(self):
+        expected = list(Flight.objects.order_by("departure_datetime", "id").values_list("flight_number", flat=True))
+        seen, after = [], None
+        while True:
+            page = self.execute("first: 3" + (f', after: "{after}"' if after else ""))
+            seen.extend(edge["node"]["flightNumber"] for edge in page["edges"])
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+            after = page["pageInfo"]["endCursor"]
+        self.assertEqual(seen, expected)
+
+    def test_each_page_is_one_query(self):
+        first_page = self.execute("first: 4")
+        with self.assertNumQueries(1):
+            self.execute(f'first: 4, after: "{first_page["pageInfo"]["endCursor"]}"')
+
+    def test_backward_pagination(self):
+        expected = list(Flight.objects.order_by("departure_datetime", "id").values_list("flight_number", flat=True))
+        page = self.execute("last: 3")
+        self.assertEqual([edge["node"]["flightNumber"] for edge in page["edges"]], expected[-3:])
+        self.assertTrue(page["pageInfo"]["hasPreviousPage"])
+        page = self.execute(f'last: 3, before: "{page["pageInfo"]["startCursor"]}"')
+        self.assertEqual([edge["node"]["flightNumber"] for edge in page["edges"]], expected[-6:-3])
+
+    def test_invalid_cursor(self):
+        result = schema.execute('query { allAirports(after: "garbage") { edges { cursor } } }',
+                                context_value=RequestFactory().post("/graphql/"))
+        self.assertIsNotNone(result.errors)
+
+
+class SearchFlightsTestCase(TestCase):
+    def setUp(self):
+        self.ika = Airport.objects.create(airport_code="IKA", airport_name="Imam Khomeini",
+                                          airport_city="Tehran", airport_country="Iran")
+        self.ist = Airport.objects.create(airport_code="IST", airport_name="Istanbul",
+                                          airport_city="Istanbul", airport_country="Turkey")
+        self.dxb = Airport.objects.create(airport_code="DXB", airport_name="Dubai International",
+                                          airport_city="Dubai", airport_country="UAE")
+        self.ir = Airline.objects.create(airline_code="IR", airline_name="Iran Air", airline_rules="Rules")
+        self.tk = Airline.objects.create(airline_code="TK", airline_name="Turkish", airline_rules="Rules")
+        aircraft = Aircraft.objects.create(aircraft_model="Airbus A321", aircraft_capacity=200,
+                                           aircraft_manufacturer="Airbus")
+        for flight_number, arrival, departure, landing, airline, cabin, price in [
+            ("IR700", self.ist, "2025-06-01T08:00:00Z", "2025-06-01T11:00:00Z", self.ir, "ECONOMY", 300),
+            ("TK879", self.ist, "2025-06-01T22:00:00Z", "2025-06-02T01:00:00Z", self.tk, "BUSINESS", 900),
+            ("IR701", self.ist, "2025-06-02T08:00:00Z", "2025-06-02T11:00:00Z", self.ir, "ECONOMY", 250),
+            ("IR650", self.dxb, "2025-06-01T09:00:00Z", "2025-06-01T11:00:00Z", self.ir, "ECONOMY", 200),
+        ]:
+            Flight.objects.create(
+                flight_number=flight_number,
+                flight_type="INTERNATIONAL",
+                trip_type="DIRECT",
+                departure_airport=self.ika,
+                arrival_airport=arrival,
+                departure_datetime=departure,
+                arrival_datetime=landing,
+                airline=airline,
+                aircraft=aircraft,
+                cabin_type=cabin,
+                base_price=price,
+                baggage_limit_kg=20.0,
+                flight_rules="Rules"
+            )
+
+    def search(self, arguments):
+        query = "query { searchFlights(%s) { edges { node { flightNumber } } } }" % arguments
+        result = schema.execute(query, context_value=RequestFactory().post("/graphql/"))
+        self.assertIsNone(result.errors)
+        return [edge["node"]["flightNumber"] for edge in result.data["searchFlights"]["edges"]]
+
+    def test_search_route_and_date(self):
+        self.assertEqual(self.search('from: "IKA", to: "IST", departDate: "2025-06-01"'), ["IR700", "TK879"])
+
+    def test_search_window_and_price(self):
+        self.assertEqual(
+            self.search('from: "IKA", departAfter: "2025-06-01T00:00:00Z", '
+                        'departBefore: "2025-06-03T00:00:00Z", maxPrice: 300'),
+            ["IR700", "IR650", "IR701"]
+        )
+
+    def test_search_cabin_and_airline(self):
+        self.assertEqual(self.search('from: "IKA", to: "IST", cabinType: "BUSINESS"'), ["TK879"])
+        self.assertEqual(self.search('from: "IKA", to: "IST", airline: "IR"'), ["IR700", "IR701"])
+
+    def test_search_no_match(self):
+        self.assertEqual(self.search('from: "IST", to: "IKA"'), [])
+
+
+class ItineraryTestCase(TestCase):
+    QUERY = """
+        query {
+            searchItineraries(from: "IKA", to: "JFK", departDate: "2025-07-01", maxStops: %d, sortBy: %s,
+                              limit: %d) {
+                stops
+                totalPrice
+                durationMinutes
+                legs { flightNumber }
+            }
+        }
+    """
+
+    def setUp(self):
+        route_graph.reset()
+        self.handler = FlightCommandHandler()
+        self.airports = {
+            code: Airport.objects.create(airport_code=code, airport_name=code, airport_city=code, airport_country="-")
+            for code in ("IKA", "IST", "DXB", "JFK")
+        }
+        self.airline = Airline.objects.create(airline_code="XX", airline_name="Airline", airline_rules="Rules")
+        self.aircraft = Aircraft.objects.create(aircraft_model="Boeing 787", aircraft_capacity=250,
+                                                aircraft_manufacturer="Boeing")
+        self.create("IR1", "IKA", "IST", "2025-07-01T06:00:00Z", "2025-07-01T09:00:00Z", 300)
+        self.create("TK1", "IST", "JFK", "2025-07-01T11:00:00Z", "2025-07-01T21:00:00Z", 700)
+        self.create("TK2", "IST", "JFK", "2025-07-01T09:30:00Z", "2025-07-01T19:30:00Z", 500)  # layover too short
+        self.create("EK1", "IKA", "DXB", "2025-07-01T05:00:00Z", "2025-07-01T07:00:00Z", 200)
+        self.create("EK2", "DXB", "JFK", "2025-07-01T09:00:00Z", "2025-07-01T23:00:00Z", 500)
+
+    def create(self, flight_number, origin, destination, departure, arrival, price):
+        return self.handler.execute(CreateFlightCommand(),
+                                    flight_number=flight_number,
+                                    flight_type="INTERNATIONAL",
+                                    trip_type="INDIRECT",
+                                    departure_airport=self.airports[origin],
+                                    arrival_airport=self.airports[destination],
+                                    departure_datetime=departure,
+                                    arrival_datetime=arrival,
+                                    airline=self.airline,
+                                    aircraft=self.aircraft,
+                                    cabin_type="ECONOMY",
+                                    base_price=price,
+                                    tax=0,
+                                    discount=0,
+                                    baggage_limit_kg=20.0,
+                                    flight_rules="Rules")
+
+    def execute(self, max_stops=1, sort_by="PRICE", limit=20):
+        return schema.execute(self.QUERY % (max_stops, sort_by, limit),
+                              context_value=RequestFactory().post("/graphql/"))
+
+    def search(self, max_stops=1, sort_by="PRICE", limit=20):
+        result = self.execute(max_stops, sort_by, limit)
+        self.assertIsNone(result.errors)
+        return [[leg["flightNumber"] for leg in itinerary["legs"]] for itinerary in result.data["searchItineraries"]]
+
+    def test_connections_sorted_by_price(self):
+        self.assertEqual(self.search(), [["EK1", "EK2"], ["IR1", "TK1"]])
+
+    def test_connections_sorted_by_duration(self):
+        self.assertEqual(self.search(sort_by="DURATION"), [["IR1", "TK1"], ["EK1", "EK2"]])
+
+    def test_limit_bounds_the_search(self):
+        for limit in (0, 101):
+            self.assertEqual(self.execute(limit=limit).errors[0].message, "limit must be between 1 and 100.")
+        # Dearer connections through Istanbul are never extended once the cheapest itinerary is complete
+        for i in range(5):
+            self.create(f"IR{i + 2}", "IKA", "IST", "2025-07-01T07:00:00Z", "2025-07-01T10:00:00Z", 5000 + i)
+        departing = route_graph._departing
+        with mock.patch.object(route_graph, "_departing", side_effect=departing) as calls:
+            self.assertEqual(self.search(limit=1), [["EK1", "EK2"]])
+        self.assertEqual([call.args[0] for call in calls.call_args_list].count(self.airports["IST"].pk), 1)
+        self.assertEqual(self.search(limit=2), [["EK1", "EK2"], ["IR1", "TK1"]])
+
+    def test_no_direct_route(self):
+        self.assertEqual(self.search(max_stops=0), [])
+
+    def test_graph_follows_commands(self):
+        self.search()  # build the graph
+        with self.captureOnCommitCallbacks(execute=True):
+            self.handler.execute(DeleteFlightCommand(), flight_number="TK1")
+        self.assertEqual(self.search(), [["EK1", "EK2"]])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.handler.undo()
+            self.handler.execute(UpdateFlightCommand(), flight_number="EK2", base_price=900)
+        self.assertEqual(self.search(), [["IR1", "TK1"], ["EK1", "EK2"]])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create("IK1", "IKA", "JFK", "2025-07-01T12:00:00Z", "2025-07-01T22:00:00Z", 1500)
+        self.assertEqual(self.search(max_stops=0), [["IK1"]])
+
+    def test_graph_ignores_rolled_back_writes_and_naive_datetimes(self):
+        self.search()  # build the graph
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.create("IK1", "IKA", "JFK", "2025-07-01T12:00:00Z", "2025-07-01T22:00:00Z", 100)
+            raise RuntimeError
+        self.assertEqual(self.search(max_stops=0), [])
+        # No offset: stored in the default time zone, like the database stores it
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create("IK2", "IKA", "JFK", "2025-07-01T12:00:00", "2025-07-01T22:00:00", 100)
+        self.assertEqual(self.search(max_stops=0), [["IK2"]])
+
+
+class LookupCacheTestCase(TestCase):
+    def setUp(self):
+        # Off by default without a shared cache server
+        patcher = mock.patch.object(lookup_cache, "backend", LRUCacheBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.handler = AirportCommandHandler()
+        Airport.objects.create(airport_code="SYZ", airport_name="Shiraz",
+                               airport_city="Shiraz", airport_country="Iran")
+        self.query = AirportQueries()
+
+    def test_second_lookup_is_cached(self):
+        self.assertEqual(self.query.resolve_airport_by_code(None, airport_code="SYZ").airport_name, "Shiraz")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.query.resolve_airport_by_code(None, airport_code="SYZ").airport_name, "Shiraz")
+
+    def test_commands_invalidate(self):
+        self.query.resolve_airport_by_code(None, airport_code="SYZ")
+        self.handler.execute(UpdateAirportCommand(), airport_code="SYZ", airport_name="Shiraz Updated",
+                             airport_city="Shiraz", airport_country="Iran")
+        self.assertEqual(self.query.resolve_airport_by_code(None, airport_code="SYZ").airport_name, "Shiraz Updated")
+        self.handler.undo()
+        self.assertEqual(self.query.resolve_airport_by_code(None, airport_code="SYZ").airport_name, "Shiraz")
+        self.handler.execute(DeleteAirportCommand(), airport_code="SYZ")
+        self.assertIsNone(self.query.resolve_airport_by_code(None, airport_code="SYZ"))
+
+    def test_reads_inside_the_write_transaction_are_not_kept(self):
+        committed = Airport.objects.get(airport_code="SYZ")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.handler.execute(UpdateAirportCommand(), airport_code="SYZ", airport_name="Shiraz Updated",
+                                 airport_city="Shiraz", airport_country="Iran")
+            # Another request, which cannot see the write yet, caches the committed row
+            lookup_cache.get_or_load(Airport, "SYZ", lambda: committed)
+            self.assertEqual(self.query.resolve_airport_by_code(None, airport_code="SYZ").airport_name, "Shiraz")
+        self.assertEqual(self.query.resolve_airport_by_code(None, airport_code="SYZ").airport_name, "Shiraz Updated")
+
+    def test_lru_backend_evicts_and_expires(self):
+        cache = LookupCache(LRUCacheBackend(max_entries=2, ttl=300))
+        for code in ("A", "B", "C"):
+            cache.get_or_load(Airport, code, lambda: code)
+        self.assertIsNone(cache.backend.get(cache.key(Airport, "A")))
+        self.assertEqual(cache.backend.get(cache.key(Airport, "C")), "C")
+        expired = LookupCache(LRUCacheBackend(ttl=-1))
+        expired.get_or_load(Airport, "A", lambda: "A")
+        self.assertIsNone(expired.backend.get(expired.key(Airport, "A")))
+
+    def test_no_per_worker_cache_by_default(self):
+        self.assertIsNone(build_lookup_cache().backend)
+        with override_settings(LOOKUP_CACHE={"BACKEND": "django"}):
+            self.assertIsInstance(build_lookup_cache().backend, DjangoCacheBackend)
+
+    def test_django_backend_versions(self):
+        cache = LookupCache(DjangoCacheBackend())
+        cache.get_or_load(Airport, "SYZ", lambda: "old")
+        self.assertEqual(cache.get_or_load(Airport, "SYZ", lambda: "new"), "old")
+        cache.invalidate(Airport)
+        self.assertEqual(cache.get_or_load(Airport, "SYZ", lambda: "new"), "new")
+
+
+class GraphQLViewTestCase(TestCase):
+    QUERY = 'query { airportByCode(airportCode: "KIH") { airportName } }'
+
+    def setUp(self):
+        document_cache.clear()
+        Airport.objects.create(airport_code="KIH", airport_name="Kish", airport_city="Kish", airport_country="Iran")
+
+    def post(self, payload):
+        return self.client.post("/graphql/", json.dumps(payload), content_type="application/json")
+
+    def test_document_is_parsed_once(self):
+        with mock.patch("Flight.document_cache.parse", wraps=parse) as parse_spy:
+            for _ in range(3):
+                response = self.post({"query": self.QUERY})
+                self.assertEqual(response.json()["data"]["airportByCode"]["airportName"], "Kish")
+        self.assertEqual(parse_spy.call_count, 1)
+
+    def test_invalid_document_is_rejected(self):
+        response = self.post({"query": "query { airportByCode { airportName } }"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("errors", response.json())
+
+    def test_persisted_query(self):
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(self.QUERY)}}
+        response = self.post({"extensions": extensions})
+        self.assertEqual(response.json()["errors"][0]["message"], "PersistedQueryNotFound")
+
+        response = self.post({"query": self.QUERY, "extensions": extensions})
+        self.assertEqual(response.json()["data"]["airportByCode"]["airportName"], "Kish")
+
+        response = self.post({"extensions": extensions})
+        self.assertEqual(response.json()["data"]["airportByCode"]["airportName"], "Kish")
+
+    def test_persisted_query_hash_mismatch(self):
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}
+        response = self.post({"query": self.QUERY, "extensions": extensions})
+        self.assertEqual(response.json()["errors"][0]["message"], "provided sha does not match query")
+
+    def test_persisted_query_registration_is_bounded_and_validated(self):
+        invalid = "query { airportByCode { airportName } }"
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(invalid)}}
+        self.assertEqual(self.post({"query": invalid, "extensions": extensions}).status_code, 400)
+        response = self.post({"extensions": extensions})
+        self.assertEqual(response.json()["errors"][0]["message"], "PersistedQueryNotFound")
+
+        registry = PersistedQueryRegistry(max_entries=2)
+        for query in ("{ a }", "{ b }", "{ c }"):
+            registry.register(query_hash(query), query)
+        self.assertEqual([registry.get(query_hash(query)) for query in ("{ a }", "{ c }")], [None, "{ c }"])
+
+    def test_malformed_persisted_query_extension(self):
+        for extensions in ({"persistedQuery": "abc"}, {"persistedQuery": {"sha256Hash": 1}}, ["persistedQuery"]):
+            response = self.post({"query": self.QUERY, "extensions": extensions})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("persistedQuery" if isinstance(extensions, dict) else "extensions",
+                          response.json()["errors"][0]["message"])
+
+
+class FlightBatchMixin:
+    def setUp(self):
+        self.handler = FlightCommandHandler()
+        self.origin = Airport.objects.create(airport_code="TBZ", airport_name="Tabriz",
+                                             airport_city="Tabriz", airport_country="Iran")
+        self.destination = Airport.objects.create(airport_code="AWZ", airport_name="Ahvaz",
+                                                  airport_city="Ahvaz", airport_country="Iran")
+        self.airline = Airline.objects.create(airline_code="EP", airline_name="Aseman", airline_rules="Rules")
+        self.aircraft = Aircraft.objects.create(aircraft_model="Fokker 100", aircraft_capacity=100,
+                                                aircraft_manufacturer="Fokker")
+
+    def batch(self, count, **overrides):
+        return [dict({
+            "flight_number": f"EP{i}",
+            "flight_type": "DOMESTIC",
+            "trip_type": "DIRECT",
+            "departure_airport": self.origin.pk,
+            "arrival_airport": self.destination.pk,
+            "departure_datetime": "2025-08-01T10:00:00Z",
+            "arrival_datetime": "2025-08-01T11:30:00Z",
+            "airline": self.airline.pk,
+            "aircraft": self.aircraft.pk,
+            "cabin_type": "ECONOMY",
+            "base_price": 1000 + i,
+            "tax": 9,
+            "discount": 10.0,
+            "baggage_limit_kg": 20.0,
+            "flight_rules": "Rules"
+        }, **overrides) for i in range(count)]
+
+
+class BulkFlightTestCase(FlightBatchMixin, TestCase):
+    def test_create_batch_query_count_is_flat(self):
+        # duplicates check, 3 FK lookups, savepoint, insert, release, listings read and upsert,
+        # fare calendar keys, aggregate and upsert; history insert and eviction in a savepoint
+        with self.assertNumQueries(16):
+            self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(50))
+        self.assertEqual(Flight.objects.count(), 50)
+        flight = Flight.objects.get(flight_number="EP7")
+        self.assertEqual(flight.final_price, flight.final_price_calculated)
+
+    def test_create_batch_validates_everything_first(self):
+        flights = self.batch(3)
+        flights[1]["airline"] = 999
+        flights[2]["cabin_type"] = "Economy Plus"
+        with self.assertRaises(Exception) as error:
+            self.handler.execute(BulkCreateFlightCommand(), flights=flights)
+        self.assertIn("#1 (EP1)", str(error.exception))
+        self.assertIn("#2 (EP2)", str(error.exception))
+        self.assertEqual(Flight.objects.count(), 0)
+
+    def test_undo_redo_create_batch(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(5))
+        self.handler.undo()
+        self.assertEqual(Flight.objects.count(), 0)
+        self.handler.redo()
+        self.assertEqual(Flight.objects.count(), 5)
+
+    def test_update_batch_and_undo(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(3))
+        self.handler.execute(BulkUpdateFlightCommand(), flights=[
+            {"flight_number": "EP0", "base_price": 2000},
+            {"flight_number": "EP1", "discount": 50.0},
+        ])
+        self.assertEqual(Flight.objects.get(flight_number="EP0").final_price, 1962)
+        self.assertEqual(Flight.objects.get(flight_number="EP1").final_price, 546)
+        self.handler.undo()
+        self.assertEqual(Flight.objects.get(flight_number="EP0").base_price, 1000)
+        self.assertEqual(Flight.objects.get(flight_number="EP1").final_price, 982)
+
+    def test_delete_batch_and_undo(self):
+        created = self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(4))
+        result = self.handler.execute(BulkDeleteFlightCommand(), flight_numbers=["EP0", "EP2"])
+        self.assertEqual(result, "2 flights deleted successfully.")
+        self.assertEqual(Flight.objects.count(), 2)
+        self.handler.undo()
+        self.assertEqual(set(Flight.objects.values_list("pk", flat=True)), {flight.pk for flight in created})
+
+    def test_create_flights_mutation(self):
+        query = """
+            mutation($flights: [FlightInput!]!) {
+                createFlights(flights: $flights) { flightNumber finalPrice }
+            }
+        """
+        result = schema.execute(query, variables={"flights": [
+            {self.camel(key): value for key, value in item.items()} for item in self.batch(2)
+        ]}, context_value=RequestFactory().post("/graphql/"))
+        self.assertIsNone(result.errors)
+        self.assertEqual([flight["flightNumber"] for flight in result.data["createFlights"]], ["EP0", "EP1"])
+
+    @staticmethod
+    def camel(name):
+        head, *tail = name.split("_")
+        return head + "".join(part.title() for part in tail)
+
+
+class RepriceFlightsTestCase(FlightBatchMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_airline = Airline.objects.create(airline_code="IR", airline_name="Iran Air",
+                                                    airline_rules="Rules")
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(6))
+        self.handler.execute(BulkCreateFlightCommand(), flights=[
+            dict(item, flight_number=f"IR{i}", airline=self.other_airline.pk)
+            for i, item in enumerate(self.batch(2))
+        ])
+
+    def test_reprice_matches_final_price_calculated(self):
+        # savepoint, snapshot, update, release, notify, listings read and upsert,
+        # fare calendar keys, aggregate and upsert; history insert and eviction in a savepoint
+        with self.assertNumQueries(14):
+            count = self.handler.execute(RepriceFlightsCommand(), filters={"airline": "EP"},
+                                         tax=7.25, discount=12.5)
+        self.assertEqual(count, 6)
+        for flight in Flight.objects.filter(airline=self.airline):
+            self.assertEqual(str(flight.tax), "7.25")
+            self.assertEqual(flight.final_price, flight.final_price_calculated)
+        # Flights outside the filter keep their price
+        self.assertEqual(Flight.objects.get(flight_number="IR0").final_price, 981)
+
+    def test_reprice_binds_at_most_a_chunk_per_statement(self):
+        with mock.patch.object(RepriceFlightsCommand, "CHUNK_SIZE", 4), \
+                CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.handler.execute(RepriceFlightsCommand(), tax=0), 8)
+        updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "Flight_flight"')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(Flight.objects.exclude(tax=0).exists())
+
+    def test_reprice_rounds_half_to_even(self):
+        # 1001 * 0.5 = 500.5 and 1003 * 0.5 = 501.5
+        self.handler.execute(RepriceFlightsCommand(), filters={"flight_numbers": ["EP1", "EP3"]},
+                             tax=0, discount=50)
+        self.assertEqual(Flight.objects.get(flight_number="EP1").final_price, 500)
+        self.assertEqual(Flight.objects.get(flight_number="EP3").final_price, 502)
+
+    def test_reprice_keeps_the_other_percentage(self):
+        self.handler.execute(RepriceFlightsCommand(), filters={"flight_numbers": ["EP5"]}, discount=0)
+        flight = Flight.objects.get(flight_number="EP5")
+        self.assertEqual(str(flight.tax), "9.00")
+        self.assertEqual(flight.final_price, flight.final_price_calculated)
+
+    def test_undo_redo_reprice(self):
+        before = dict(Flight.objects.values_list("flight_number", "final_price"))
+        self.handler.execute(RepriceFlightsCommand(), tax=20)
+        self.handler.undo()
+        self.assertEqual(dict(Flight.objects.values_list("flight_number", "final_price")), before)
+        self.assertEqual(Flight.objects.filter(tax=9).count(), 8)
+        self.handler.redo()
+        self.assertEqual(Flight.objects.filter(tax=20).count(), 8)
+
+    def test_reprice_requires_a_percentage(self):
+        with self.assertRaises(Exception):
+            self.handler.execute(RepriceFlightsCommand(), filters={"airline": "EP"})
+
+    def test_reprice_flights_mutation(self):
+        query = """
+            mutation {
+                repriceFlights(filter: {from: "TBZ", airline: "IR"}, discountPct: 0)
+            }
+        """
+        result = schema.execute(query, context_value=RequestFactory().post("/graphql/"))
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["repriceFlights"], 2)
+        self.assertEqual(Flight.objects.get(flight_number="IR1").final_price, 1091)
+
+
+class BenchmarkTestCase(TestCase):
+    def test_seed_is_deterministic(self):
+        seed(airports=6, airlines=2, aircraft=2, flights=40, seed=7)
+        first = list(Flight.objects.order_by("flight_number").values_list(
+            "flight_number", "departure_airport__airport_code", "departure_datetime", "final_price"))
+        seed(airports=6, airlines=2, aircraft=2, flights=40, seed=7)
+        second = list(Flight.objects.order_by("flight_number").values_list(
+            "flight_number", "departure_airport__airport_code", "departure_datetime", "final_price"))
+        self.assertEqual(len(first), 40)
+        self.assertEqual(first, second)
+
+    def test_clear_sends_no_per_row_signals(self):
+        seed(airports=6, airlines=2, aircraft=2, flights=40, seed=7)
+        with mock.patch("Flight.signals.listings.remove_flights") as remove_flights:
+            seed(airports=6, airlines=2, aircraft=2, flights=10, seed=7)
+        remove_flights.assert_not_called()
+        self.assertEqual((Flight.objects.count(), FlightListing.objects.count()), (10, 10))
+
+    def test_run_reports_every_operation(self):
+        seed(airports=6, airlines=2, aircraft=2, flights=120, seed=7)
+        report = run(iterations=2, warmup=0)
+        self.assertEqual(set(report["operations"]), {operation.name for operation in OPERATIONS})
+        for name, result in report["operations"].items():
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            if name != "airportSuggest":  # Served from memory
+                self.assertGreaterEqual(result["queries_max"], 1)
+        # Mutations are rolled back, so the data set is unchanged afterwards
+        self.assertEqual(Flight.objects.count(), 120)
+
+
+class ExportTestCase(FlightBatchMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        BulkCreateFlightCommand().execute(flights=self.batch(5) + [
+            dict(item, flight_number="EP9", departure_datetime="2025-09-01T10:00:00Z",
+                 arrival_datetime="2025-09-01T11:30:00Z") for item in self.batch(1)
+        ])
+
+    def export(self, **params):
+        response = self.client.get("/export/flights/", params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        with self.assertNumQueries(1):
+            rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([row["flight_number"] for row in rows], ["EP0", "EP1", "EP2", "EP3", "EP4", "EP9"])
+        self.assertEqual(rows[0]["departure_airport"], "TBZ")
+        self.assertEqual(rows[0]["airline"], "EP")
+        self.assertEqual(rows[0]["tax"], "9.00")
+        self.assertEqual(rows[0]["final_price"], 981)
+
+    def test_csv_export(self):
+        lines = self.export(format="csv").splitlines()
+        self.assertTrue(lines[0].startswith("flight_number,flight_type,trip_type"))
+        self.assertEqual(len(lines), 7)
+        self.assertTrue(lines[1].startswith("EP0,DOMESTIC,DIRECT,ECONOMY,TBZ,AWZ,"))
+
+    def test_export_filters(self):
+        rows = self.export(depart_after="2025-08-15", airline="EP").splitlines()
+        self.assertEqual([json.loads(row)["flight_number"] for row in rows], ["EP9"])
+        self.assertEqual(self.export(depart_before="2025-08-01T10:00:00Z"), "")
+        self.assertEqual(self.export(airline="IR"), "")
+
+    def test_export_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get("/export/flights/", {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get("/export/flights/", {"depart_after": "August"}).status_code, 400)
+        self.assertEqual(self.client.post("/export/flights/").status_code, 405)
+
+
+class ImportScheduleTestCase(FlightBatchMixin, TestCase):
+    HEADER = ("flight_number,flight_type,trip_type,cabin_type,departure_airport,arrival_airport,"
+              "departure_datetime,arrival_datetime,airline,aircraft,base_price,tax,discount,baggage_limit_kg,"
+              "flight_rules\n")
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return path
+
+    def row(self, number, base_price=1000, airline="EP"):
+        return (f"{number},DOMESTIC,DIRECT,ECONOMY,TBZ,AWZ,2025-08-01T10:00:00Z,2025-08-01T11:30:00Z,"
+                f"{airline},Fokker 100,{base_price},9,10,20,Rules\n")
+
+    def test_import_csv_upserts_and_rejects(self):
+        BulkCreateFlightCommand().execute(flights=self.batch(1))
+        path = self.write("schedule.csv", self.HEADER + self.row("EP0", base_price=2000) + self.row("EP100")
+                          + self.row("EP101", airline="XX") + self.row("EP102", base_price="cheap"))
+        output = io.StringIO()
+        call_command("import_schedule", path, chunk_size=2, stdout=output)
+
+        self.assertIn("1 created, 1 updated, 2 rejected", output.getvalue())
+        self.assertIn("rows/s", output.getvalue())
+        updated = Flight.objects.get(flight_number="EP0")
+        self.assertEqual(updated.base_price, 2000)
+        self.assertEqual(updated.final_price, updated.final_price_calculated)
+        self.assertEqual(Flight.objects.get(flight_number="EP100").final_price, 981)
+
+        with open(path + ".rejected.csv", encoding="utf-8") as handle:
+            rejected = list(csv.DictReader(handle))
+        self.assertEqual([row["flight_number"] for row in rejected], ["EP101", "EP102"])
+        self.assertIn("Unknown code XX", rejected[0]["error"])
+        self.assertIn("base_price", rejected[1]["error"])
+
+    def test_import_query_count_is_per_chunk(self):
+        path = self.write("schedule.csv", self.HEADER + "".join(self.row(f"EP{i}") for i in range(50)))
+        # 3 code lookups, then per chunk: savepoint, existing numbers, upsert, listings read and upsert,
+        # fare calendar keys, aggregate and upsert, release
+        with self.assertNumQueries(3 + 9 * 2):
+            call_command("import_schedule", path, chunk_size=25, stdout=io.StringIO())
+        self.assertEqual(Flight.objects.count(), 50)
+        self.assertFalse(os.path.exists(path + ".rejected.csv"))
+
+    def test_read_models_commit_with_the_chunk(self):
+        path = self.write("schedule.csv", self.HEADER + self.row("EP100"))
+        with mock.patch("Flight.signals.listings.sync_flights", side_effect=Exception("down")), \
+                self.assertRaisesMessage(Exception, "down"):
+            call_command("import_schedule", path, stdout=io.StringIO())
+        self.assertFalse(Flight.objects.filter(flight_number="EP100").exists())
+
+    def test_import_ndjson_round_trips_the_export(self):
+        BulkCreateFlightCommand().execute(flights=self.batch(3))
+        exported = b"".join(self.client.get("/export/flights/").streaming_content).decode()
+        Flight.objects.all().delete()
+        path = self.write("schedule.ndjson", exported + "not json\n")
+        output = io.StringIO()
+        call_command("import_schedule", path, stdout=output)
+        self.assertIn("3 created, 0 updated, 1 rejected", output.getvalue())
+        self.assertEqual(sorted(Flight.objects.values_list("final_price", flat=True)), [981, 982, 983])
+
+
+class AsyncGraphQLViewTestCase(FlightBatchMixin, TestCase):
+    QUERY = """
+        query {
+            allFlights(first: 3) { edges { node { flightNumber departureAirport { airportCode } airline { airlineCode } } } }
+            flightByNumber(flightNumber: "EP1") { finalPrice arrivalAirport { airportCode } aircraft { aircraftModel } }
+            airportByCode(airportCode: "TBZ") { airportName }
+            allAirlines(first: 5) { edges { node { airlineCode } } }
+        }
+    """
+
+    def setUp(self):
+        super().setUp()
+        BulkCreateFlightCommand().execute(flights=self.batch(4))
+
+    async def apost(self, path, query):
+        response = await self.async_client.post(path, json.dumps({"query": query}), content_type="application/json")
+        return response.json()
+
+    async def test_async_query_matches_sync(self):
+        expected = await self.apost("/graphql/", self.QUERY)
+        self.assertNotIn("errors", expected)
+        self.assertEqual(await self.apost("/graphql/async/", self.QUERY), expected)
+
+    async def test_root_fields_run_concurrently(self):
+        events = []
+
+        async def traced(*args, **kwargs):
+            events.append("start")
+            await asyncio.sleep(0)
+            events.append("end")
+            return await apaginate(*args, **kwargs)
+
+        with mock.patch("Flight.pagination.apaginate", traced):
+            result = await self.apost("/graphql/async/", """
+                query { allAirports(first: 5) { edges { node { airportCode } } }
+                        allAircrafts(first: 5) { edges { node { aircraftModel } } } }
+            """)
+        self.assertEqual(len(result["data"]["allAirports"]["edges"]), 2)
+        self.assertEqual(events, ["start", "start", "end", "end"])
+
+    async def test_reverse_relations_on_every_root_field(self):
+        await sync_to_async(self.archive_one)()
+        airport = "{ airportCode departures { flightNumber } arrivals { flightNumber } }"
+        airline = "{ airlineCode flightSet { flightNumber } }"
+        aircraft = "{ aircraftModel flightSet { flightNumber } }"
+        flight = f"{{ flightNumber departureAirport {airport} airline {airline} aircraft {aircraft} }}"
+        for field in (
+            f"allFlights(first: 2) {{ edges {{ node {flight} }} }}",
+            f'flightByNumber(flightNumber: "EP1") {flight}',
+            f'searchFlights(from: "TBZ", first: 2) {{ edges {{ node {flight} }} }}',
+            f'flightHistory(from: "TBZ", first: 2) {{ edges {{ node {flight} }} }}',
+            f'searchItineraries(from: "TBZ", to: "AWZ", departDate: "2025-08-01", limit: 2) {{ legs {flight} }}',
+            f"allAirports(first: 2) {{ edges {{ node {airport} }} }}",
+            f'airportByCode(airportCode: "TBZ") {airport}',
+            f'airportSuggest(prefix: "ta") {airport}',
+            f"allAirlines(first: 2) {{ edges {{ node {airline} }} }}",
+            f'airlineByCode(airlineCode: "EP") {airline}',
+            f"allAircrafts(first: 2) {{ edges {{ node {aircraft} }} }}",
+            f'aircraftByModel(aircraftModel: "Fokker 100") {aircraft}',
+            f'search(text: "tabriz aseman", kinds: [AIRPORT, AIRLINE], limit: 5) '
+            f'{{ airport {airport} airline {airline} }}',
+            f'search(text: "ep1", kinds: [FLIGHT], limit: 2) {{ flight {flight} }}',
+        ):
+            with self.subTest(field=field.split("(")[0]):
+                expected = await self.apost("/graphql/", f"query {{ {field} }}")
+                self.assertNotIn("errors", expected)
+                self.assertEqual(await self.apost("/graphql/async/", f"query {{ {field} }}"), expected)
+
+    def archive_one(self):
+        BulkCreateFlightCommand().execute(flights=self.batch(1, flight_number="EP9",
+                                                             departure_datetime="2025-07-01T10:00:00Z",
+                                                             arrival_datetime="2025-07-01T11:30:00Z"))
+        archive_flights(datetime.fromisoformat("2025-07-02T00:00:00+00:00"))
+
+    def test_async_loader_batches_concurrent_loads(self):
+        loaders = Loaders(asynchronous=True)
+
+        async def load():
+            return await asyncio.gather(loaders.airports.load(self.origin.pk),
+                                        loaders.airports.load(self.destination.pk), loaders.airports.load(0))
+
+        with self.assertNumQueries(1):
+            origin, destination, missing = async_to_sync(load)()
+        self.assertEqual((origin.airport_code, destination.airport_code, missing), ("TBZ", "AWZ", None))
+
+    async def test_mutation_through_async_view(self):
+        result = await self.apost("/graphql/async/", 'mutation { deleteFlight(flightNumber: "EP0") }')
+        self.assertNotIn("errors", result)
+        self.assertEqual(await Flight.objects.acount(), 3)
+
+
+class MetricsTestCase(FlightBatchMixin, TestCase):
+    QUERY = """
+        query Catalog {
+            allFlights(first: 5) { edges { node { flightNumber departureAirport { airportCode } } } }
+            airportByCode(airportCode: "TBZ") { airportName }
+        }
+    """
+
+    def setUp(self):
+        super().setUp()
+        BulkCreateFlightCommand().execute(flights=self.batch(3))
+        metrics.clear()
+
+    def post(self, path="/graphql/"):
+        response = self.client.post(path, json.dumps({"query": self.QUERY}), content_type="application/json")
+        self.assertNotIn("errors", response.json())
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return response.content.decode()
+
+    def test_operation_and_resolver_metrics(self):
+        self.post()
+        self.post("/graphql/async/")
+        text = self.scrape()
+        self.assertIn('graphql_operation_duration_seconds_count{operation="Catalog",kind="query"} 2', text)
+        self.assertIn('graphql_resolver_duration_seconds_count{type="Query",field="allFlights"} 2', text)
+        self.assertIn('graphql_resolver_db_queries_bucket{type="Query",field="allFlights",le="1"} 2', text)
+        self.assertIn('graphql_resolver_db_queries_count{type="Query",field="airportByCode"} 2', text)
+        # Plain attribute reads are not timed
+        self.assertNotIn('field="flightNumber"', text)
+
+    def test_sampling(self):
+        with mock.patch.object(metrics, "sample_rate", 0):
+            self.post()
+        self.assertNotIn("graphql_operation_duration_seconds_count", self.scrape())
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("h", "Test.", ("field",), (1, 5))
+        for value in (0, 3, 3, 9):
+            histogram.observe(("a",), value)
+        lines = histogram.render().splitlines()
+        self.assertEqual(lines[2:], ['h_bucket{field="a",le="1"} 1', 'h_bucket{field="a",le="5"} 3',
+                                     'h_bucket{field="a",le="+Inf"} 4', 'h_sum{field="a"} 15.0',
+                                     'h_count{field="a"} 4'])
+
+    def test_connection_statistics(self):
+        self.assertIn('db_connections_opened_total{alias="default"}', self.scrape())
+        # SQLite has no pool; a psycopg pool reports its own counts
+        self.assertNotIn("db_pool_connections", self.scrape())
+        pool = mock.Mock(get_stats=lambda: {"pool_min": 2, "pool_max": 10, "pool_size": 4, "pool_available": 1,
+                                            "requests_waiting": 0, "connections_num": 5})
+        with mock.patch.object(type(connections.connections["default"]), "pool", pool, create=True):
+            self.assertEqual(connections.stats()["default"]["in_use"], 3)
+            text = self.scrape()
+        self.assertIn('db_pool_connections{alias="default",state="in_use"} 3', text)
+        self.assertIn('db_pool_connections{alias="default",state="idle"} 1', text)
+        self.assertIn('db_pool_connections_created_total{alias="default"} 5', text)
+
+
+class QueryCostTestCase(FlightBatchMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        BulkCreateFlightCommand().execute(flights=self.batch(2))
+
+    def post(self, query, path="/graphql/", variables=None):
+        body = {"query": query, "variables": variables}
+        return self.client.post(path, json.dumps(body), content_type="application/json")
+
+    def cost(self, query, variables=None):
+        return query_cost.check(schema.graphql_schema, parse(query), variables=variables)["requested"]
+
+    def test_cost_counts_rows_per_level(self):
+        # 5 rows of (connection row + edge + node + flightNumber + departureAirport + airportCode)
+        self.assertEqual(self.cost("{ allFlights(first: 5) { edges { node { flightNumber "
+                                   "departureAirport { airportCode } } } } }"), 30)
+        self.assertEqual(self.cost("query ($n: Int) { allAirports(first: $n) { edges { node { airportCode } } } }",
+                                   {"n": 2}), 8)
+        self.assertEqual(self.cost("{ ...F } fragment F on Query { airportByCode(airportCode: \"TBZ\") "
+                                   "{ airportName __typename } }"), 2)
+
+    def test_cost_is_returned_in_extensions(self):
+        result = self.post("{ allFlights(first: 5) { edges { node { flightNumber } } } }").json()
+        self.assertEqual(len(result["data"]["allFlights"]["edges"]), 2)
+        self.assertEqual(result["extensions"]["cost"], {"requested": 20, "depth": 4, "maximum": 10000})
+        result = self.post("{ allFlights(first: 5) { edges { node { flightNumber } } } }", "/graphql/async/").json()
+        self.assertEqual(result["extensions"]["cost"]["requested"], 20)
+
+    def test_expensive_query_is_rejected_before_execution(self):
+        # 100 airports, each with up to 100 departures
+        query = "{ allAirports { edges { node { departures { airline { airlineCode } } } } } }"
+        for path in ("/graphql/", "/graphql/async/"):
+            with self.assertNumQueries(0):
+                response = self.post(query, path)
+            self.assertEqual(response.status_code, 400)
+            result = response.json()
+            self.assertNotIn("data", result)
+            self.assertEqual(result["errors"][0]["extensions"]["code"], "QUERY_TOO_EXPENSIVE")
+            self.assertEqual(result["extensions"]["cost"]["requested"], 30300)
+
+    def test_deep_query_is_rejected(self):
+        query = "{ airportByCode(airportCode: \"TBZ\") " + "{ departures { departureAirport " * 6 + "{ airportCode }"
+        query += " } }" * 6 + " }"
+        result = self.post(query).json()
+        self.assertEqual(result["errors"][0]["extensions"]["code"], "QUERY_TOO_DEEP")
+        self.assertEqual(result["extensions"]["cost"]["depth"], 14)
+
+    def test_throttle(self):
+        with mock.patch.object(query_cost, "throttle", CostThrottle(rate=1, burst=25)):
+            query = "{ allFlights(first: 5) { edges { node { flightNumber } } } }"
+            self.assertEqual(self.post(query).json()["extensions"]["cost"]["throttle"]["remaining"], 5)
+            response = self.post(query)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()["errors"][0]["extensions"]["code"], "THROTTLED")
+        self.assertGreater(response.json()["extensions"]["cost"]["throttle"]["retryAfter"], 0)
+
+
+class SearchIndexTestCase(FlightBatchMixin, TestCase):
+    QUERY = """
+        query ($text: String!) {
+            search(text: $text, limit: 5) { kind score airport { airportCode } flight { flightNumber } }
+        }
+    """
+
+    def setUp(self):
+        super().setUp()
+        search_index.reset()
+        self.zurich = AirportCommandHandler().execute(CreateAirportCommand(), airport_code="ZRH",
+                                                      airport_name="Zürich Kloten", airport_city="Zürich",
+                                                      airport_country="Switzerland")
+        BulkCreateFlightCommand().execute(flights=self.batch(3))
+
+    def search(self, text, **kwargs):
+        return [(hit.kind, hit.pk) for hit in search_index.search(text, **kwargs)]
+
+    def test_tokenize_folds_case_and_diacritics(self):
+        self.assertEqual(tokenize("Zürich-Kloten EP12"), ["zurich", "kloten", "ep12"])
+
+    def test_exact_prefix_and_fuzzy_matches(self):
+        self.assertEqual(self.search("zrh")[0], ("airport", self.zurich.pk))
+        self.assertEqual(self.search("zuri")[0], ("airport", self.zurich.pk))
+        self.assertEqual(self.search("zurikh")[0], ("airport", self.zurich.pk))
+        self.assertEqual(self.search("tabriz", kinds={"airport"}), [("airport", self.origin.pk)])
+
+    def test_ranking_prefers_documents_matching_every_term(self):
+        flight = Flight.objects.get(flight_number="EP1")
+        hits = self.search("ep1 tabriz")
+        self.assertEqual(hits[0], ("flight", flight.pk))
+        # The airport's own code outranks the flights that only pass through it
+        self.assertEqual(self.search("tbz")[0], ("airport", self.origin.pk))
+
+    def test_index_follows_writes(self):
+        self.search("ep0")  # Build the index
+        flight = Flight.objects.get(flight_number="EP0")
+        with self.captureOnCommitCallbacks(execute=True):
+            AirportCommandHandler().execute(UpdateAirportCommand(), airport_code="TBZ", airport_name="Shahid Madani",
+                                            airport_city="Tabriz", airport_country="Iran")
+        self.assertIn(("airport", self.origin.pk), self.search("madani"))
+        self.assertIn(("flight", flight.pk), self.search("tbz", kinds={"flight"}))
+
+        flight.arrival_airport = self.zurich
+        with self.captureOnCommitCallbacks(execute=True):
+            flight.save()
+        self.assertEqual(self.search("zurich", kinds={"flight"}), [("flight", flight.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BulkDeleteFlightCommand().execute(flight_numbers=["EP0"])
+        self.assertEqual(self.search("zurich", kinds={"flight"}), [])
+
+    def test_search_query(self):
+        with self.assertNumQueries(4):  # Index build (3) and one query for the airport hits
+            response = self.client.post("/graphql/", json.dumps({"query": self.QUERY, "variables": {"text": "zürich"}}),
+                                        content_type="application/json")
+        result = response.json()
+        self.assertNotIn("errors", result)
+        self.assertEqual(result["data"]["search"][0]["kind"], "AIRPORT")
+        self.assertEqual(result["data"]["search"][0]["airport"], {"airportCode": "ZRH"})
+
+
+class AirportSuggestTestCase(TestCase):
+    def setUp(self):
+        airport_suggester.reset()
+        self.handler = AirportCommandHandler()
+        for code, name, city in (("IKA", "Imam Khomeini International", "Tehran"), ("THR", "Mehrabad", "Tehran"),
+                                 ("IK", "Ikaria", "Agios Kirykos"), ("ZRH", "Kloten", "Zürich")):
+            self.handler.execute(CreateAirportCommand(), airport_code=code, airport_name=name,
+                                 airport_city=city, airport_country="-")
+
+    def codes(self, prefix, limit=10):
+        return [airport.airport_code for airport in airport_suggester.suggest(prefix, limit=limit)]
+
+    def test_ranking(self):
+        self.assertEqual(self.codes("ik"), ["IK", "IKA"])
+        self.assertEqual(self.codes("IKA"), ["IKA", "IK"])  # Then the name "Ikaria"
+        self.assertEqual(self.codes("teh"), ["IKA", "THR"])
+        self.assertEqual(self.codes("khom"), ["IKA"])
+        self.assertEqual(self.codes("imam kh"), ["IKA"])
+        self.assertEqual(self.codes("ZÜR"), ["ZRH"])
+        self.assertEqual(self.codes("t", limit=1), ["THR"])
+        self.assertEqual(self.codes(" "), [])
+
+    def test_commands_patch_the_suggester_without_queries(self):
+        self.codes("x")  # Build
+        with self.captureOnCommitCallbacks(execute=True):
+            self.handler.execute(CreateAirportCommand(), airport_code="TBZ", airport_name="Shahid Madani",
+                                 airport_city="Tabriz", airport_country="Iran")
+            self.handler.execute(UpdateAirportCommand(), airport_code="THR", airport_name="Mehrabad",
+                                 airport_city="Karaj", airport_country="Iran")
+            self.assertEqual(self.codes("ta"), [])  # Not before the commit
+        with self.assertNumQueries(0):
+            self.assertEqual(self.codes("ta"), ["TBZ"])
+            self.assertEqual(self.codes("teh"), ["IKA"])
+            self.assertEqual(self.codes("kar"), ["THR"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.handler.undo()
+        self.assertEqual(self.codes("teh"), ["IKA", "THR"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.handler.execute(DeleteAirportCommand(), airport_code="IKA")
+        self.assertEqual(self.codes("teh"), ["THR"])
+
+    def test_airport_suggest_query(self):
+        query = 'query { airportSuggest(prefix: "teh", limit: 5) { airportCode airportCity } }'
+        schema.execute(query)  # Build
+        with self.assertNumQueries(0):
+            result = schema.execute(query)
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["airportSuggest"], [{"airportCode": "IKA", "airportCity": "Tehran"},
+                                                         {"airportCode": "THR", "airportCity": "Tehran"}])
+
+
+class IndexSyncTestCase(FlightBatchMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = MemoryIndexBackend()
+        self.queue = IndexSyncQueue(self.backend, batch_size=2, retry_backoff=0, flush_interval=0)
+        patcher = mock.patch("Flight.signals.index_sync", self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_changes_are_coalesced_and_sent_in_batches_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flights = BulkCreateFlightCommand().execute(flights=self.batch(3))
+            BulkUpdateFlightCommand().execute(flights=[{"flight_number": "EP0", "discount": 5}])
+            self.handler.execute(UpdateFlightCommand(), flight_number="EP0", base_price=2000)
+            # Nothing is sent before the commit, even by a flush another commit starts
+            self.assertEqual(self.queue.flush(), 0)
+            self.assertEqual(self.backend.requests, [])
+        self.assertEqual(self.backend.requests, [2, 1])
+        self.assertGreater(self.queue.stats["coalesced"], 0)
+        document = self.backend.indexes["flights"][flights[0].pk]
+        self.assertEqual((document["flight_number"], document["base_price"], document["discount"]), ("EP0", 2000, 5.0))
+        self.assertEqual(document["departure_airport"]["airport_code"], "TBZ")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BulkDeleteFlightCommand().execute(flight_numbers=["EP1", "EP2"])
+        self.assertEqual(list(self.backend.indexes["flights"]), [flights[0].pk])
+
+    def test_related_changes_resend_the_flights(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flights = BulkCreateFlightCommand().execute(flights=self.batch(2))
+        with self.captureOnCommitCallbacks(execute=True):
+            AirportCommandHandler().execute(UpdateAirportCommand(), airport_code="TBZ", airport_name="Shahid Madani",
+                                            airport_city="Tabriz", airport_country="Iran")
+        self.assertEqual(self.backend.indexes["airports"][self.origin.pk]["airport_name"], "Shahid Madani")
+        for flight in flights:
+            self.assertEqual(self.backend.indexes["flights"][flight.pk]["departure_airport"]["airport_name"],
+                             "Shahid Madani")
+
+    def test_failed_batches_are_retried_then_requeued(self):
+        self.queue.retries = 1
+        with mock.patch.object(self.backend, "bulk", side_effect=[Exception("down"), Exception("down")]), \
+                self.assertLogs("Flight.index_sync", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                flights = BulkCreateFlightCommand().execute(flights=self.batch(1))
+        self.assertEqual((self.queue.stats["retries"], self.queue.stats["failures"]), (1, 1))
+        self.assertEqual(self.backend.indexes["flights"], {})
+        # The next flush sends the requeued row
+        self.assertEqual(self.queue.flush(), 1)
+        self.assertIn(flights[0].pk, self.backend.indexes["flights"])
+
+    def test_file_backend_writes_bulk_ndjson(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bulk.ndjson")
+            FileIndexBackend(path).bulk([("airports", 1, {"airport_code": "TBZ"}), ("airports", 2, None)])
+            with open(path) as bulk:
+                lines = [json.loads(line) for line in bulk]
+        self.assertEqual(lines, [{"index": {"_index": "airports", "_id": 1}}, {"airport_code": "TBZ"},
+                                 {"delete": {"_index": "airports", "_id": 2}}])
+
+
+class CommandHistoryTestCase(FlightBatchMixin, TestCase):
+    def post(self, client, query):
+        response = client.post("/graphql/", json.dumps({"query": query}), content_type="application/json").json()
+        return response["errors"][0]["message"] if "errors" in response else response["data"]
+
+    def test_state_is_a_field_diff(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(1))
+        self.handler.execute(UpdateFlightCommand(), flight_number="EP0", base_price=1500)
+        entry = CommandHistory.objects.latest("id")
+        self.assertEqual((entry.command, entry.state), ("UpdateFlightCommand", {
+            "flight_number": "EP0", "before": {"base_price": 1000}, "after": {"base_price": 1500}}))
+
+    def test_undo_and_redo_from_any_handler(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(1))
+        self.handler.execute(UpdateFlightCommand(), flight_number="EP0", base_price=1500, flight_rules="New")
+        FlightCommandHandler().undo()  # As another worker would
+        flight = Flight.objects.get(flight_number="EP0")
+        self.assertEqual((flight.base_price, flight.flight_rules), (1000, "Rules"))
+        FlightCommandHandler().redo()
+        flight.refresh_from_db()
+        self.assertEqual((flight.base_price, flight.flight_rules), (1500, "New"))
+        self.assertEqual(flight.final_price, flight.final_price_calculated)
+
+    def test_redone_create_keeps_its_new_ids(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(2))
+        self.handler.undo()
+        self.handler.redo()
+        self.handler.undo()
+        self.assertEqual(Flight.objects.count(), 0)
+
+    def test_scopes_are_separate(self):
+        with history_scope("user:1"):
+            self.handler.execute(DeleteFlightCommand(), flight_number=self.batch_flight().flight_number)
+        with history_scope("user:2"), self.assertRaisesMessage(Exception, "Nothing to undo."):
+            self.handler.undo()
+        with history_scope("user:1"):
+            self.handler.undo()
+        self.assertTrue(Flight.objects.filter(flight_number="EP0").exists())
+
+    def test_new_command_clears_redo(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(1))
+        self.handler.undo()
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(1))
+        with self.assertRaisesMessage(Exception, "Nothing to redo."):
+            self.handler.redo()
+
+    @override_settings(COMMAND_HISTORY={"MAX_LENGTH": 2, "MAX_AGE": 3600})
+    def test_length_and_age_caps(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(1))
+        for price in (1100, 1200):
+            self.handler.execute(UpdateFlightCommand(), flight_number="EP0", base_price=price)
+        self.assertEqual(CommandHistory.objects.count(), 2)
+        self.handler.undo()
+        self.handler.undo()
+        with self.assertRaisesMessage(Exception, "Nothing to undo."):
+            self.handler.undo()
+        self.assertEqual(Flight.objects.get().base_price, 1000)
+
+        CommandHistory.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        with self.assertRaisesMessage(Exception, "Nothing to redo."):
+            self.handler.redo()
+        self.handler.execute(UpdateFlightCommand(), flight_number="EP0", base_price=1300)
+        self.assertEqual(CommandHistory.objects.count(), 1)  # The expired entries were evicted
+
+    def test_graphql_history_follows_the_session(self):
+        self.batch_flight()
+        self.assertEqual(self.post(self.client, 'mutation { deleteFlight(flightNumber: "EP0") }'),
+                         {"deleteFlight": "Flight EP0 deleted successfully."})
+        self.assertEqual(self.post(Client(), "mutation { undoOperation }"), "Nothing to undo.")
+        self.assertEqual(self.post(self.client, "mutation { undoOperation }"),
+                         {"undoOperation": "Last operation undone successfully."})
+        self.assertTrue(Flight.objects.filter(flight_number="EP0").exists())
+
+    def batch_flight(self):
+        return BulkCreateFlightCommand().execute(flights=self.batch(1))[0]
+
+
+class FlightListingTestCase(FlightBatchMixin, TestCase):
+    def listing(self, flight_number):
+        return FlightListing.objects.get(flight_number=flight_number)
+
+    def test_commands_keep_listings_in_step(self):
+        flights = self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(3))
+        listing = self.listing("EP0")
+        self.assertEqual((listing.departure_airport_code, listing.arrival_city, listing.airline_code,
+                          listing.aircraft_capacity, listing.duration_minutes), ("TBZ", "Ahvaz", "EP", 100, 90))
+        self.assertEqual(listing.final_price, flights[0].final_price)
+
+        self.handler.execute(UpdateFlightCommand(), flight_number="EP0", base_price=2000)
+        self.handler.execute(RepriceFlightsCommand(), filters={"flight_numbers": ["EP1"]}, discount=0)
+        self.handler.execute(BulkDeleteFlightCommand(), flight_numbers=["EP2"])
+        for flight_number in ("EP0", "EP1"):
+            self.assertEqual(self.listing(flight_number).final_price,
+                             Flight.objects.get(flight_number=flight_number).final_price)
+        self.assertFalse(FlightListing.objects.filter(flight_number="EP2").exists())
+
+        self.handler.undo()
+        self.assertTrue(FlightListing.objects.filter(flight_number="EP2").exists())
+
+    def test_single_row_commands_sync_once(self):
+        flight = dict(self.batch(1)[0], departure_airport=self.origin, arrival_airport=self.destination,
+                      airline=self.airline, aircraft=self.aircraft)
+        # One sync each (read the old keys, write, read the fare days; a delete is two statements):
+        # post_save/post_delete leave the row to the rows_changed the command sends right after
+        for command, arguments, statements in (
+                (CreateFlightCommand(), flight, 3),
+                (UpdateFlightCommand(), {"flight_number": "EP0", "base_price": 2000}, 3),
+                (DeleteFlightCommand(), {"flight_number": "EP0"}, 4)):
+            with CaptureQueriesContext(connection) as queries:
+                self.handler.execute(command, **arguments)
+            self.assertEqual(sum('"Flight_flightlisting"' in query["sql"] for query in queries), statements)
+        self.assertFalse(FlightListing.objects.exists())
+
+    def test_writes_outside_the_commands_leave_nothing_behind(self):
+        flights = self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(2))
+        Flight.objects.all().delete()  # Outside the commands, like the admin's bulk action
+        self.assertFalse(FlightListing.objects.exists())
+        # The same rows come back under their ids; archiving sends no model signals, only rows_changed
+        Flight.objects.bulk_create(flights)
+        self.assertEqual(listings.rebuild(), 2)
+        archive_flights(timezone.now())
+        self.assertFalse(FlightListing.objects.exists())
+
+    def test_related_changes_rewrite_the_listings(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(2))
+        AirportCommandHandler().execute(UpdateAirportCommand(), airport_code="TBZ", airport_name="Tabriz",
+                                        airport_city="Tabriz East", airport_country="Iran")
+        self.assertEqual(set(FlightListing.objects.values_list("departure_city", flat=True)), {"Tabriz East"})
+        self.destination.delete()  # Cascades to the flights
+        self.assertEqual(FlightListing.objects.count(), 0)
+
+    def test_search_reads_only_the_listings(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(3))
+        query = 'query { searchFlights(from: "TBZ", to: "AWZ") { edges { node { flightNumber } } } }'
+        with CaptureQueriesContext(connection) as queries:
+            result = schema.execute(query, context_value=RequestFactory().post("/graphql/"))
+        self.assertIsNone(result.errors)
+        self.assertEqual([edge["node"]["flightNumber"] for edge in result.data["searchFlights"]["edges"]],
+                         ["EP0", "EP1", "EP2"])
+        # The page from the listings, then the flights by primary key
+        self.assertEqual(len(queries), 2)
+        self.assertIn(FlightListing._meta.db_table, queries[0]["sql"])
+        self.assertNotIn("JOIN", queries[0]["sql"])
+
+    def test_rebuild(self):
+        self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(3))
+        FlightListing.objects.update(departure_city="Stale")
+        self.assertEqual(listings.rebuild(), 3)
+        self.assertEqual(self.listing("EP1").departure_city, "Tabriz")
+
+
+class SeatInventoryTestCase(FlightBatchMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.flight = BulkCreateFlightCommand().execute(flights=self.batch(1))[0]
+
+    def seats(self):
+        self.flight.refresh_from_db(fields=["seats_available"])
+        return self.flight.seats_available
+
+    def test_new_flights_start_with_the_aircraft_capacity(self):
+        flight = self.handler.execute(CreateFlightCommand(), **dict(
+            self.batch(1, flight_number="EP99")[0], departure_airport=self.origin, arrival_airport=self.destination,
+            airline=self.airline, aircraft=self.aircraft))
+        for flight in (self.flight, Flight.objects.get(pk=flight.pk)):
+            with self.assertNumQueries(0):
+                self.assertEqual((flight.capacity, flight.seats_available), (100, 100))
+
+    def test_hold_confirm_and_release(self):
+        with CaptureQueriesContext(connection) as queries:
+            seat_hold = inventory.hold("EP0", 3)
+        # Never read-modify-write: the seats are taken by a conditional UPDATE
+        self.assertEqual([query["sql"] for query in queries if query["sql"].startswith("UPDATE")],
+                         [f'UPDATE "Flight_flight" SET "seats_available" = ("Flight_flight"."seats_available" - 3) '
+                          f'WHERE ("Flight_flight"."id" = {self.flight.pk} AND "Flight_flight"."seats_available" >= 3)'])
+        self.assertEqual((seat_hold.status, self.seats()), ("HELD", 97))
+
+        self.assertEqual(inventory.confirm(seat_hold.token).status, "CONFIRMED")
+        self.assertEqual(self.seats(), 97)
+        self.assertEqual(inventory.release(seat_hold.token).status, "RELEASED")
+        self.assertEqual(self.seats(), 100)
+        with self.assertRaisesMessage(Exception, "Cannot release a seat hold that is released."):
+            inventory.release(seat_hold.token)
+        self.assertEqual(self.seats(), 100)
+
+    def test_hold_fails_when_too_few_seats_are_left(self):
+        Flight.objects.filter(pk=self.flight.pk).update(seats_available=2)
+        with self.assertRaisesMessage(Exception, "Not enough seats available."):
+            inventory.hold("EP0", 3)
+        self.assertEqual((self.seats(), SeatHold.objects.count()), (2, 0))
+        with self.assertRaisesMessage(Exception, "seats must be between 1 and 9."):
+            inventory.hold("EP0", 0)
+
+    def test_sweep_expires_lapsed_holds_in_bulk(self):
+        other = BulkCreateFlightCommand().execute(flights=self.batch(1, flight_number="EP1"))[0]
+        holds = [inventory.hold("EP0", 2), inventory.hold("EP0", 3), inventory.hold("EP1", 4)]
+        kept = inventory.hold("EP1", 1)
+        SeatHold.objects.exclude(pk=kept.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertRaisesMessage(Exception, "Cannot confirm an expired seat hold."):
+            inventory.confirm(holds[0].token)
+
+        # One batch: lock the lapsed holds, expire them, give every flight its seats back
+        with self.assertNumQueries(5):
+            self.assertEqual(inventory.sweep(), 3)
+        self.assertEqual(self.seats(), 100)
+        other.refresh_from_db()
+        self.assertEqual(other.seats_available, 99)
+        self.assertEqual(set(SeatHold.objects.values_list("status", flat=True)), {"EXPIRED", "HELD"})
+        with self.assertRaisesMessage(Exception, "Cannot confirm a seat hold that is expired."):
+            inventory.confirm(holds[0].token)
+
+    def test_hold_reclaims_lapsed_holds(self):
+        seat_hold = inventory.hold("EP0", 9)
+        Flight.objects.filter(pk=self.flight.pk).update(seats_available=0)
+        SeatHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        inventory.hold("EP0", 9)
+        self.assertEqual(SeatHold.objects.get(pk=seat_hold.pk).status, "EXPIRED")
+        self.assertEqual(self.seats(), 0)
+
+    def test_flight_commands_leave_the_seat_count_alone(self):
+        get = Flight.objects.get
+
+        def get_then_hold(**kwargs):
+            flight = get(**kwargs)
+            inventory.hold("EP0", 3)  # Another request holds seats after the update loaded the flight
+            return flight
+
+        with mock.patch.object(Flight.objects, "get", get_then_hold):
+            self.handler.execute(UpdateFlightCommand(), flight_number="EP0", base_price=2000)
+        self.assertEqual(self.seats(), 97)
+        self.handler.undo()
+        self.assertEqual(self.seats(), 97)
+
+        # The holds go with the deleted flight, so its restored copy has every seat free
+        self.handler.execute(DeleteFlightCommand(), flight_number="EP0")
+        self.handler.undo()
+        self.assertEqual(Flight.objects.get(flight_number="EP0").seats_available, 100)
+
+        BulkCreateFlightCommand().execute(flights=self.batch(1, flight_number="EP1"))
+        inventory.hold("EP0", 3)
+        inventory.hold("EP1", 4)
+        self.handler.execute(BulkDeleteFlightCommand(), flight_numbers=["EP0", "EP1"])
+        self.assertFalse(SeatHold.objects.exists())
+        self.handler.undo()
+        self.assertEqual(dict(Flight.objects.values_list("flight_number", "seats_available")), {"EP0": 100, "EP1": 100})
+
+    def test_graphql(self):
+        result = schema.execute('mutation { holdSeats(flightNumber: "EP0", seats: 2) { token flightNumber status } }')
+        self.assertIsNone(result.errors)
+        self.assertEqual((result.data["holdSeats"]["flightNumber"], result.data["holdSeats"]["status"]),
+                         ("EP0", "HELD"))
+        result = schema.execute('query { seatAvailability(flightNumber: "EP0") { seatsTotal seatsAvailable } }')
+        self.assertEqual(result.data["seatAvailability"], {"seatsTotal": 100, "seatsAvailable": 98})
+
+
+class SeatInventoryConcurrencyTestCase(FlightBatchMixin, TransactionTestCase):
+    def test_concurrent_holders_never_oversell(self):
+        BulkCreateFlightCommand().execute(flights=self.batch(1))
+        Flight.objects.update(seats_total=50, seats_available=50)
+        barrier = threading.Barrier(16)
+        held, refused, failures = [], [], []
+
+        def hold():
+            while True:
+                try:
+                    return inventory.hold("EP0", 1)
+                except OperationalError:
+                    # SQLite's shared in-memory test database refuses a locked table instead of waiting;
+                    # the attempt rolled back whole, so retry it
+                    time.sleep(0.001)
+
+        def holder():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    try:
+                        held.append(hold().seats)
+                    except Exception as error:
+                        if str(error) != "Not enough seats available.":
+                            raise
+                        refused.append(1)
+            except Exception as error:
+                failures.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=holder) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        self.assertEqual((sum(held), len(refused)), (50, 30))
+        flight = Flight.objects.get()
+        self.assertEqual(flight.seats_available, 0)
+        self.assertEqual(SeatHold.objects.aggregate(seats=Sum("seats"))["seats"], 50)
+
+
+class FareCalendarTestCase(FlightBatchMixin, TestCase):
+    def calendar(self, arguments='from: "TBZ", to: "AWZ", month: "2025-08"'):
+        result = schema.execute("query { fareCalendar(%s) { date minPrice flights } }" % arguments)
+        self.assertIsNone(result.errors)
+        return [(day["date"], day["minPrice"], day["flights"]) for day in result.data["fareCalendar"]]
+
+    def create(self, count=4):
+        # Two flights a day on 1 and 2 August, one of them in business
+        flights = self.batch(count)
+        for i, flight in enumerate(flights):
+            flight["departure_datetime"] = f"2025-08-0{1 + i // 2}T{10 + i}:00:00Z"
+            flight["arrival_datetime"] = f"2025-08-0{1 + i // 2}T{11 + i}:30:00Z"
+        flights[-1]["cabin_type"] = "BUSINESS"
+        return self.handler.execute(BulkCreateFlightCommand(), flights=flights)
+
+    def test_minimum_per_day_and_cabin(self):
+        flights = self.create()
+        prices = [flight.final_price for flight in flights]
+        self.assertEqual(self.calendar(), [("2025-08-01", prices[0], 2), ("2025-08-02", prices[2], 2)])
+        self.assertEqual(self.calendar('from: "TBZ", to: "AWZ", month: "2025-08", cabinType: "BUSINESS"'),
+                         [("2025-08-02", prices[3], 1)])
+        self.assertEqual(self.calendar('from: "TBZ", to: "AWZ", month: "2025-09"'), [])
+
+    def test_commands_and_repricing_keep_it_in_step(self):
+        self.create()
+        self.handler.execute(UpdateFlightCommand(), flight_number="EP1", base_price=10)
+        self.handler.execute(UpdateFlightCommand(), flight_number="EP2", departure_datetime="2025-08-05T10:00:00Z",
+                             arrival_datetime="2025-08-05T11:00:00Z")
+        self.handler.execute(DeleteFlightCommand(), flight_number="EP3")
+        self.handler.execute(RepriceFlightsCommand(), filters={"flight_numbers": ["EP0"]}, discount=100)
+        self.assertEqual(self.calendar(), [("2025-08-01", 0, 2), ("2025-08-05", Flight.objects.get(
+            flight_number="EP2").final_price, 1)])
+
+        self.handler.undo()
+        self.handler.undo()
+        self.assertEqual(self.calendar()[0], ("2025-08-01", Flight.objects.get(flight_number="EP1").final_price, 2))
+        self.assertEqual(FareCalendarDay.objects.count(), 3)
+        self.assertEqual(listings.rebuild(), 4)
+        self.assertEqual(FareCalendarDay.objects.count(), 3)
+
+    def test_calendar_is_one_query(self):
+        self.create()
+        with self.assertNumQueries(1):
+            self.calendar()
+        result = schema.execute('query { fareCalendar(from: "TBZ", to: "AWZ", month: "August") { date } }')
+        self.assertEqual(result.errors[0].message, "month must be YYYY-MM.")
+
+
+class ArchiveFlightsTestCase(FlightBatchMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # EP0-EP4 departed in 2025; EP5 and EP6 depart in 2099
+        self.flights = self.handler.execute(BulkCreateFlightCommand(), flights=self.batch(5) + [
+            dict(flight, flight_number=f"EP{5 + i}", departure_datetime="2099-01-01T10:00:00Z",
+                 arrival_datetime="2099-01-01T11:00:00Z") for i, flight in enumerate(self.batch(2))
+        ])
+
+    def test_moves_departed_flights_in_chunks(self):
+        seat_hold = inventory.hold("EP0", 2)
+        chunks = []
+        self.assertEqual(archive_flights(timezone.now(), chunk_size=2, on_chunk=chunks.append), 5)
+        self.assertEqual(chunks, [2, 4, 5])
+        self.assertEqual(sorted(Flight.objects.values_list("flight_number", flat=True)), ["EP5", "EP6"])
+        self.assertFalse(SeatHold.objects.filter(pk=seat_hold.pk).exists())
+
+        # Same columns under the same id
+        archived = ArchivedFlight.objects.get(flight_number="EP0")
+        live = self.flights[0]
+        self.assertEqual(archived.pk, live.pk)
+        for column in ("departure_airport_id", "departure_datetime", "final_price", "seats_total", "tax"):
+            self.assertEqual(getattr(archived, column), getattr(live, column))
+        self.assertEqual(archived.seats_available, 98)
+
+        # The live read models let go of them
+        self.assertEqual(sorted(FlightListing.objects.values_list("flight_number", flat=True)), ["EP5", "EP6"])
+        self.assertEqual(list(FareCalendarDay.objects.values_list("day", flat=True)), [date(2099, 1, 1)])
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command("archive_flights", "--older-than", "30", "--chunk-size", "3", stdout=output)
+        self.assertIn("Archived 5 flights", output.getvalue())
+        self.assertEqual(ArchivedFlight.objects.count(), 5)
+
+    def test_history_is_a_separate_query(self):
+        archive_flights(timezone.now())
+        result = schema.execute(
+            'query { flightHistory(from: "TBZ", first: 2) { edges { node { flightNumber departureAirport '
+            '{ airportCode } } } pageInfo { hasNextPage } } allFlights { edges { node { flightNumber } } } }',
+            context_value=RequestFactory().post("/graphql/")
+        )
+        self.assertIsNone(result.errors)
+        self.assertEqual([edge["node"] for edge in result.data["flightHistory"]["edges"]],
+                         [{"flightNumber": "EP0", "departureAirport": {"airportCode": "TBZ"}},
+                          {"flightNumber": "EP1", "departureAirport": {"airportCode": "TBZ"}}])
+        self.assertTrue(result.data["flightHistory"]["pageInfo"]["hasNextPage"])
+        self.assertEqual([edge["node"]["flightNumber"] for edge in result.data["allFlights"]["edges"]],
+                         ["EP5", "EP6"])
+
+
+class QueryPlanTestCase(TestCase):
+    def setUp(self):
+        # Enough rows and spread that a planner prefers an index wherever one fits
+        seed(airports=40, airlines=10, aircraft=40, flights=2000, seed=7)
+
+    def test_no_operation_scans_a_big_table(self):
+        found = explain()
+        self.assertEqual({name: [(table, sql) for sql, table, _ in scans] for name, scans in found.items()}, {})
+
+    def test_a_missing_index_is_caught(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX flight_airline_departure_idx")
+        found = explain(only=["repriceFlights.airline"])
+        self.assertEqual([table for _, table, _ in found["repriceFlights.airline"]], ["Flight_flight"])
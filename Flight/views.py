@@ -1,3 +1,289 @@
-from django.shortcuts import render
+import json
+from contextlib import nullcontext
+from inspect import isawaitable
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.http.response import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, StreamingHttpResponse
+)
+from django.views.decorators.http import require_GET
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import HttpError
+from graphene_file_upload.django import FileUploadGraphQLView
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast, validate_schema
+from graphql.error import GraphQLError
+
+from . import connections
+from .document_cache import document_cache, persisted_queries
+from .export import FORMATS, export_filters, export_rows
+from .history import history_scope, request_scope
+from .loaders import Loaders
+from .metrics import metrics
+from .query_cost import QueryCostError, query_cost
+
+
+def operation_labels(operation_ast, operation_name):
+    """``(name, kind)`` of an operation, as recorded by the metrics."""
+    if operation_ast is None:
+        return operation_name, "unknown"
+    name = operation_name or (operation_ast.name.value if operation_ast.name else None)
+    return name, operation_ast.operation.value
+
+
+def cost_client(request):
+    """The key a client's query cost budget is kept under."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR')}"
+
+
+class FlightsGraphQLView(FileUploadGraphQLView):
+    """
+    ``/graphql/`` view that reuses parsed and validated documents across
+    requests, accepts persisted queries (a sha256 instead of the query text)
+    and rejects operations over the query cost budget before executing them.
+    """
+
+    @staticmethod
+    def get_extensions(request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        return extensions
+
+    def parse_document(self, request, data, query, show_graphiql=False):
+        """
+        Return ``(document, None)`` for the request's query, or ``(None, result)``
+        when there is nothing to execute.
+        """
+        query_key, sent = None, query
+        if persisted_queries is not None:
+            try:
+                query, query_key = persisted_queries.resolve(query, self.get_extensions(request, data))
+            except GraphQLError as error:
+                return None, ExecutionResult(data=None, errors=[error])
+
+        if not query:
+            return None, super().execute_graphql_request(request, data, query, None, None, show_graphiql)
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return None, ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, errors = document_cache.get_or_parse(schema, query, query_key, self.validation_rules)
+        if errors:
+            return None, ExecutionResult(data=None, errors=errors)
+        if query_key and sent:
+            # Registered only now, so invalid queries are never stored
+            persisted_queries.register(query_key, query)
+        return document, None
+
+    def check_cost(self, request, document, variables, operation_name):
+        """
+        Return the operation's cost as ``(cost, None)``, or ``(None, result)``
+        when it is over budget.
+        """
+        if query_cost is None:
+            return None, None
+        try:
+            return query_cost.check(self.schema.graphql_schema, document, operation_name, variables,
+                                    client=cost_client(request)), None
+        except QueryCostError as error:
+            return None, ExecutionResult(data=None, errors=[error], extensions={"cost": error.cost})
+
+    @staticmethod
+    def with_cost(result, cost):
+        if result is not None and cost is not None:
+            result.extensions = {**(result.extensions or {}), "cost": cost}
+        return result
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        document, result = self.parse_document(request, data, query, show_graphiql)
+        if document is None:
+            return result
+        cost, result = self.check_cost(request, document, variables, operation_name)
+        if result is not None:
+            return result
+        return self.with_cost(self.execute_document(request, document, variables, operation_name, show_graphiql),
+                              cost)
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = self.execute_graphql_request(request, data, query, variables, operation_name,
+                                                        show_graphiql)
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+        if not execution_result:
+            return None, 200
+        if execution_result.errors:
+            set_rollback()
+        return self.encode_result(request, execution_result, id, show_graphiql)
+
+    def encode_result(self, request, execution_result, id=None, show_graphiql=False):
+        # Same as GraphQLView.get_response, plus the result's extensions and 429 when throttled
+        status_code = 200
+        response = {}
+        errors = execution_result.errors
+        if errors:
+            response["errors"] = [self.format_error(e) for e in errors]
+        if errors and any(not getattr(e, "path", None) for e in errors):
+            throttled = any(isinstance(e, QueryCostError) and e.extensions["code"] == "THROTTLED" for e in errors)
+            status_code = 429 if throttled else 400
+        else:
+            response["data"] = execution_result.data
+        if execution_result.extensions:
+            response["extensions"] = execution_result.extensions
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def get_execute_options(self, request, variables, operation_name):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def execute_document(self, request, document, variables, operation_name, show_graphiql=False):
+        # Same as GraphQLView.execute_graphql_request once the document is parsed and validated
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(operation_ast.operation.value),
+                )
+            )
+
+        try:
+            execute_options = self.get_execute_options(request, variables, operation_name)
+
+            is_mutation = operation_ast is not None and operation_ast.operation == OperationType.MUTATION
+            # Commands keep their undo/redo history under the client's user or session
+            scope = history_scope(request_scope(request)) if is_mutation else nullcontext()
+            with metrics.record_operation(*operation_labels(operation_ast, operation_name)), scope:
+                if (
+                    is_mutation
+                    and (
+                        graphene_settings.ATOMIC_MUTATIONS is True
+                        or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                    )
+                ):
+                    with transaction.atomic():
+                        result = execute(self.schema.graphql_schema, document, **execute_options)
+                        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                            transaction.set_rollback(True)
+                    return result
+
+                return execute(self.schema.graphql_schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class AsyncFlightsGraphQLView(FlightsGraphQLView):
+    """
+    ``FlightsGraphQLView`` for ASGI. Queries execute on the event loop with the
+    async resolvers (async ORM, async loaders), so a worker overlaps requests
+    waiting on the database and independent root fields of one query run
+    concurrently. Mutations, GraphiQL and batches keep the sync code path on
+    the request's worker thread: mutations run one after another in a
+    transaction anyway.
+    """
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method.lower() != "post" or self.batch:
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+        try:
+            data = self.parse_body(request)
+            result, status_code = await self.aget_response(request, data)
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    async def aget_response(self, request, data):
+        # Same as GraphQLView.get_response around an awaited execution
+        query, variables, operation_name, _ = self.get_graphql_params(request, data)
+        execution_result = await self.aexecute_graphql_request(request, data, query, variables, operation_name)
+        return self.encode_result(request, execution_result)
+
+    async def aexecute_graphql_request(self, request, data, query, variables, operation_name):
+        document, result = self.parse_document(request, data, query)
+        if document is None:
+            return result
+        cost, result = self.check_cost(request, document, variables, operation_name)
+        if result is not None:
+            return result
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            result = await sync_to_async(self.execute_document)(request, document, variables, operation_name)
+            return self.with_cost(result, cost)
+
+        request.loaders = Loaders(asynchronous=True)
+        try:
+            with metrics.record_operation(*operation_labels(operation_ast, operation_name)):
+                result = execute(self.schema.graphql_schema, document,
+                                 **self.get_execute_options(request, variables, operation_name))
+                if isawaitable(result):
+                    result = await result
+            return self.with_cost(result, cost)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+@require_GET
+def export_flights(request):
+    """
+    Stream the flight catalog as NDJSON (default) or CSV (``?format=csv``).
+
+    Takes the ``airline``, ``from``, ``to``, ``cabin_type``, ``depart_after`` and
+    ``depart_before`` query parameters. Rows are written as they are read, so
+    memory stays flat whatever the size of the table.
+    """
+    export_format = request.GET.get("format", "ndjson")
+    if export_format not in FORMATS:
+        return HttpResponseBadRequest(f"Unknown format: {export_format}. Use one of: {', '.join(FORMATS)}.")
+    try:
+        filters = export_filters(request.GET)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    content_type, extension, write_chunks = FORMATS[export_format]
+    response = StreamingHttpResponse(write_chunks(export_rows(filters)), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="flights.{extension}"'
+    return response
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    The GraphQL resolver and operation histograms and the database connection
+    statistics of this worker, in Prometheus text format.
+    """
+    return HttpResponse(metrics.render() + connections.render(),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -80,6 +80,22 @@ WSGI_APPLICATION = 'FlightsService.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Database connections (counted on /metrics by Flight/connections.py). By default a worker keeps its connection
+# for DB_CONN_MAX_AGE seconds (0: a new one per request) and, with DB_CONN_HEALTH_CHECKS, checks a reused one first.
+# DB_POOL=1 takes connections from a psycopg 3 pool per worker instead (needs `psycopg[pool]`): DB_POOL_MIN_SIZE
+# to DB_POOL_MAX_SIZE connections, waiting at most DB_POOL_TIMEOUT seconds for a free one. Django requires
+# CONN_MAX_AGE 0 with a pool; the pool keeps the connections open.
+DATABASE_POOL = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+} if os.environ.get('DB_POOL') == '1' else None
+DATABASE_CONNECTIONS = {
+    'CONN_MAX_AGE': 0 if DATABASE_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+    'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+    'OPTIONS': {'pool': DATABASE_POOL} if DATABASE_POOL else {},
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -88,6 +104,7 @@ DATABASES = {
         'PASSWORD': '403723807',
         'HOST': 'localhost',  # یا آدرس IP سرور پایگاه داده
         'PORT': '',  # برای استفاده از پورت پیش‌فرض (5432) می‌توانید خالی بگذارید
+        **DATABASE_CONNECTIONS,
     }
 }
 
@@ -125,6 +142,110 @@ AUTH_PASSWORD_VALIDATORS = [
 
 GRAPHENE = {
     'SCHEMA': 'FlightsService.schema.schema',
+    'MIDDLEWARE': [
+        'Flight.metrics.MetricsMiddleware',
+    ],
+}
+
+# Seat holds (Flight/inventory.py): a hold of at most MAX_SEATS seats lapses after TTL seconds unless
+# confirmed; `manage.py sweep_seat_holds` gives the seats of lapsed holds back, SWEEP_BATCH_SIZE per transaction.
+SEAT_HOLDS = {
+    'TTL': int(os.environ.get('SEAT_HOLD_TTL', 900)),
+    'MAX_SEATS': int(os.environ.get('SEAT_HOLD_MAX_SEATS', 9)),
+    'SWEEP_BATCH_SIZE': 1000,
+}
+
+# Seconds before a worker rebuilds its in-process route graph (Flight/routing.py)
+# to pick up flights written by other workers
+ROUTE_GRAPH_MAX_AGE = int(os.environ.get('ROUTE_GRAPH_MAX_AGE', 300))
+
+# Seconds before a worker rebuilds its in-process search index (Flight/search.py)
+SEARCH_INDEX_MAX_AGE = int(os.environ.get('SEARCH_INDEX_MAX_AGE', 300))
+
+# Outbound sync of written rows to an external search index (Flight/index_sync.py).
+# BACKEND: 'elasticsearch' (bulk API at HOSTS), 'file' (bulk NDJSON appended to PATH), 'memory' or None to disable.
+# Changes are coalesced per row and sent in batches of BATCH_SIZE every FLUSH_INTERVAL seconds
+# (0: inline, when the transaction commits); failed batches are retried RETRIES times, then requeued.
+SEARCH_INDEX_SYNC = {
+    'BACKEND': os.environ.get('SEARCH_INDEX_SYNC_BACKEND') or None,
+    'HOSTS': os.environ.get('ELASTICSEARCH_HOSTS', 'http://localhost:9200').split(','),
+    'INDEX_PREFIX': os.environ.get('ELASTICSEARCH_INDEX_PREFIX', ''),
+    'PATH': os.environ.get('SEARCH_INDEX_SYNC_FILE', os.path.join(BASE_DIR, 'logs', 'search_index.ndjson')),
+    'BATCH_SIZE': 500,
+    'RETRIES': 3,
+    'RETRY_BACKOFF': 0.5,
+    'FLUSH_INTERVAL': float(os.environ.get('SEARCH_INDEX_SYNC_INTERVAL', 1.0)),
+}
+
+# Undo/redo history of the mutation commands (Flight/history.py), kept per user or session:
+# the latest MAX_LENGTH commands of each, none older than MAX_AGE seconds.
+COMMAND_HISTORY = {
+    'MAX_LENGTH': int(os.environ.get('COMMAND_HISTORY_MAX_LENGTH', 50)),
+    'MAX_AGE': int(os.environ.get('COMMAND_HISTORY_MAX_AGE', 7 * 24 * 3600)),
+}
+
+# Seconds before a worker rebuilds its in-process airport autocomplete (Flight/suggest.py)
+AIRPORT_SUGGEST_MAX_AGE = int(os.environ.get('AIRPORT_SUGGEST_MAX_AGE', 300))
+
+# Cache server shared by the workers, e.g. redis://localhost:6379/1 (needs the `redis` package).
+# Without it Django's default per-process memory cache is used.
+CACHE_URL = os.environ.get('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+
+# Read-through cache of the *By* lookup queries (Flight/cache.py).
+# BACKEND: 'django' (the CACHES alias in ALIAS: a write on any worker invalidates every worker's reads),
+# None to disable, or 'lru' (in-process: a worker keeps serving what it cached for up to TTL seconds after
+# another worker's write, so only opt in with a single worker or where such stale reads are acceptable).
+# The default is 'django' with a shared CACHE_URL and no cache otherwise.
+LOOKUP_CACHE = {
+    'BACKEND': os.environ.get('LOOKUP_CACHE_BACKEND', 'django' if CACHE_URL else '') or None,
+    'TTL': int(os.environ.get('LOOKUP_CACHE_TTL', 300)),
+    'MAX_ENTRIES': 4096,
+    'ALIAS': 'default',
+}
+
+# Parsed-and-validated documents kept by the /graphql/ view (Flight/document_cache.py)
+GRAPHQL_DOCUMENT_CACHE_SIZE = 256
+
+# Persisted queries: clients may send extensions.persistedQuery.sha256Hash instead of the query.
+# FILE preloads a JSON {hash: query} registry; CACHE_ALIAS shares registrations between workers.
+# Without it each worker keeps the MAX_ENTRIES most recently used registrations.
+GRAPHQL_PERSISTED_QUERIES = {
+    'ENABLED': True,
+    'ALLOW_REGISTRATION': True,
+    'MAX_ENTRIES': 1000,
+    'FILE': os.environ.get('GRAPHQL_PERSISTED_QUERIES_FILE'),
+    'CACHE_ALIAS': None,
+}
+
+# Per-resolver and per-operation timing histograms served on /metrics (Flight/metrics.py).
+# SAMPLE_RATE records only that fraction of requests; MAX_OPERATIONS caps distinct operation names.
+GRAPHQL_METRICS = {
+    'ENABLED': os.environ.get('GRAPHQL_METRICS_ENABLED', '1') == '1',
+    'SAMPLE_RATE': float(os.environ.get('GRAPHQL_METRICS_SAMPLE_RATE', 1.0)),
+    'MAX_OPERATIONS': 200,
+}
+
+# Static query cost analysis (Flight/query_cost.py): operations over MAX_COST or MAX_DEPTH are
+# rejected before they run. Lists count first/last/limit rows, RELAY_CONNECTION_MAX_LIMIT for
+# connections without them and DEFAULT_LIST_SIZE (or LIST_SIZES["Type.field"]) otherwise.
+# With THROTTLE_RATE set, each user or IP may spend that much cost per second, bursting to THROTTLE_BURST.
+GRAPHQL_QUERY_COST = {
+    'ENABLED': os.environ.get('GRAPHQL_QUERY_COST_ENABLED', '1') == '1',
+    'MAX_COST': int(os.environ.get('GRAPHQL_QUERY_MAX_COST', 10000)),
+    'MAX_DEPTH': int(os.environ.get('GRAPHQL_QUERY_MAX_DEPTH', 10)),
+    'DEFAULT_LIST_SIZE': 100,
+    'LIST_SIZES': {
+        'ItineraryType.legs': 3,
+    },
+    'THROTTLE_RATE': float(os.environ.get('GRAPHQL_QUERY_COST_RATE', 0)) or None,
+    'THROTTLE_BURST': int(os.environ.get('GRAPHQL_QUERY_COST_BURST', 20000)),
 }
 
 # Internationalization
@@ -197,5 +318,10 @@ LOGGING = {
             'level': LOG_LEVEL,
             'propagate': True,
         },
+        'Flight': {
+            'handlers': ['console', 'file'],
+            'level': LOG_LEVEL,
+            'propagate': True,
+        },
     },
 }
\ No newline at end of file
@@ -21,14 +21,18 @@ from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 from .schema import schema
 from django.shortcuts import redirect
-from graphene_file_upload.django import FileUploadGraphQLView
+from Flight.views import AsyncFlightsGraphQLView, FlightsGraphQLView, export_flights, prometheus_metrics
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('', lambda request: redirect('/admin/')),
     path('admin/', admin.site.urls),
-    path("graphql/", csrf_exempt(FileUploadGraphQLView.as_view(graphiql=True, schema=schema))),
+    path("graphql/", csrf_exempt(FlightsGraphQLView.as_view(graphiql=True, schema=schema))),
+    # Native async execution, for deployments served through asgi.py
+    path("graphql/async/", csrf_exempt(AsyncFlightsGraphQLView.as_view(graphiql=True, schema=schema))),
+    path("export/flights/", export_flights),
+    path("metrics", prometheus_metrics),
 ]
 urlpatterns.extend(static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT))
 
@@ -0,0 +1,8 @@
+"""
+Performance benchmarks for ``/graphql/``.
+
+``python -m benchmarks seed`` fills a database with a deterministic synthetic
+data set, ``python -m benchmarks run`` times every query and mutation of the
+schema against it and prints a JSON report, and ``python -m benchmarks compare``
+puts two reports side by side.
+"""
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import sys
+
+import django
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="FlightsService benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Fill the benchmark database with synthetic data.")
+    seed_parser.add_argument("--airports", type=int, default=200)
+    seed_parser.add_argument("--airlines", type=int, default=30)
+    seed_parser.add_argument("--aircraft", type=int, default=40)
+    seed_parser.add_argument("--flights", type=int, default=100_000)
+    seed_parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed gives the same rows.")
+
+    run_parser = commands.add_parser("run", help="Time every query and mutation and print a JSON report.")
+    run_parser.add_argument("--iterations", type=int, default=50)
+    run_parser.add_argument("--warmup", type=int, default=5)
+    run_parser.add_argument("--only", nargs="*", help="Operation names to run (default: all).")
+    run_parser.add_argument("--output", help="Write the report to this file instead of stdout.")
+
+    concurrency_parser = commands.add_parser(
+        "concurrency", help="Compare the sync and async GraphQL views under concurrent load (JSON report).")
+    concurrency_parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once.")
+    concurrency_parser.add_argument("--requests", type=int, default=500)
+    concurrency_parser.add_argument("--only", nargs="*", help="Query names to send (default: all).")
+    concurrency_parser.add_argument("--output", help="Write the report to this file instead of stdout.")
+
+    connections_parser = commands.add_parser(
+        "connections", help="Compare airportByCode latency per database connection mode (JSON report).")
+    connections_parser.add_argument("--requests", type=int, default=500)
+    connections_parser.add_argument("--warmup", type=int, default=20)
+    connections_parser.add_argument("--output", help="Write the report to this file instead of stdout.")
+
+    explain_parser = commands.add_parser(
+        "explain", help="EXPLAIN the SQL of every operation; fail on a sequential scan of a big table.")
+    explain_parser.add_argument("--only", nargs="*", help="Operation names to explain (default: all).")
+
+    compare_parser = commands.add_parser("compare", help="Compare two JSON reports.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--metric", default="p50_ms")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        from benchmarks.compare import compare
+        with open(args.baseline) as baseline, open(args.candidate) as candidate:
+            rows = compare(json.load(baseline), json.load(candidate), metric=args.metric)
+        print(f"{'operation':<28}{'baseline':>12}{'candidate':>12}{'change %':>10}")
+        for name, before, after, change in rows:
+            print(f"{name:<28}{before:>12}{after:>12}{change:>+10.1f}")
+        return
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+
+    if args.command == "seed":
+        from django.core.management import call_command
+        from benchmarks.seed import seed
+        call_command("migrate", verbosity=0)
+        counts = seed(airports=args.airports, airlines=args.airlines, aircraft=args.aircraft,
+                      flights=args.flights, seed=args.seed)
+        print(json.dumps(counts))
+        return
+
+    if args.command == "explain":
+        from benchmarks.plans import explain
+        found = explain(only=args.only)
+        for name, scans in found.items():
+            for sql, table, lines in scans:
+                print(f"{name}: sequential scan of {table}\n  {sql}\n    " + "\n    ".join(lines))
+        print(f"{sum(len(scans) for scans in found.values())} sequential scans of big tables.")
+        sys.exit(1 if found else 0)
+
+    if args.command == "concurrency":
+        from benchmarks.concurrency import run_concurrency
+        report = run_concurrency(concurrency=args.concurrency, requests=args.requests, only=args.only)
+    elif args.command == "connections":
+        from benchmarks.connections import run_connections
+        report = run_connections(requests=args.requests, warmup=args.warmup)
+    else:
+        from benchmarks.runner import run
+        report = run(iterations=args.iterations, warmup=args.warmup, only=args.only)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+def compare(baseline, candidate, metric="p50_ms"):
+    """Rows of ``(operation, baseline, candidate, change %)`` for two reports."""
+    rows = []
+    for name, before in baseline["operations"].items():
+        after = candidate["operations"].get(name)
+        if after is None:
+            continue
+        change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+        rows.append((name, before[metric], after[metric], round(change, 1)))
+    return rows
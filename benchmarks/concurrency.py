@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+from benchmarks.runner import QUERIES, Fixtures, percentile
+
+
+async def post(application, path, body):
+    """Send one POST through the ASGI application, the way an ASGI server would."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    disconnected = asyncio.Event()
+    response = {}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] = response.get("body", b"") + message.get("body", b"")
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        disconnected.set()
+    if response.get("status") != 200 or b'"errors"' in response.get("body", b""):
+        raise Exception(f"{path} answered {response.get('status')}: {response.get('body', b'')[:200]!r}")
+
+
+async def load(application, path, bodies, concurrency, requests):
+    """Send ``requests`` POSTs, ``concurrency`` at a time, cycling through ``bodies``."""
+    timings = []
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        while sent < requests:
+            body = bodies[sent % len(bodies)]
+            sent += 1
+            start = time.perf_counter()
+            await post(application, path, body)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+    }
+
+
+def run_concurrency(concurrency=32, requests=500, only=None):
+    """
+    Drive ``/graphql/`` (sync view) and ``/graphql/async/`` (async view) through
+    the ASGI application with the same concurrent mix of queries and compare them.
+    """
+    from FlightsService.asgi import application
+
+    fixtures = Fixtures()
+    bodies = [
+        json.dumps({"query": operation.query,
+                    "variables": operation.variables(fixtures) if operation.variables else None}).encode()
+        for operation in QUERIES if not only or operation.name in only
+    ]
+    report = {"concurrency": concurrency, "operations": len(bodies)}
+    for name, path in (("sync", "/graphql/"), ("async", "/graphql/async/")):
+        asyncio.run(load(application, path, bodies, concurrency, min(requests, concurrency * 2)))  # Warm up
+        report[name] = asyncio.run(load(application, path, bodies, concurrency, requests))
+    report["async_speedup"] = round(report["async"]["requests_per_second"] / report["sync"]["requests_per_second"], 2)
+    return report
@@ -0,0 +1,110 @@
+import io
+import json
+import sys
+import time
+
+from django.db import connection
+
+from Flight.cache import lookup_cache
+from benchmarks.runner import QUERIES, Fixtures, percentile
+
+
+def post(application, path, body):
+    """Send one POST through the WSGI application, the way a WSGI server would, and finish the request."""
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http",
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    status = []
+    response = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        content = b"".join(response)
+    finally:
+        # Sends request_finished, where Django closes or keeps the connection
+        response.close()
+    if not status[0].startswith("200") or b'"errors"' in content:
+        raise Exception(f"{path} answered {status[0]}: {content[:200]!r}")
+
+
+def modes():
+    """
+    The connection handling to compare, as changes to ``DATABASES['default']``:
+    a new connection per request, a persistent connection with health checks
+    and, on PostgreSQL with psycopg_pool installed, a connection pool.
+    """
+    found = {
+        "per_request": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "pool": None},
+        "persistent": {"CONN_MAX_AGE": None, "CONN_HEALTH_CHECKS": True, "pool": None},
+    }
+    if connection.vendor == "postgresql":
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            return found
+        pool = connection.settings_dict["OPTIONS"].get("pool") or {"min_size": 1, "max_size": 4}
+        found["pool"] = {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True, "pool": pool}
+    return found
+
+
+def configure(mode):
+    connection.close()
+    if connection.vendor == "postgresql":
+        connection.close_pool()
+    options = {key: value for key, value in connection.settings_dict["OPTIONS"].items() if key != "pool"}
+    if mode["pool"]:
+        options["pool"] = mode["pool"]
+    connection.settings_dict.update(CONN_MAX_AGE=mode["CONN_MAX_AGE"], CONN_HEALTH_CHECKS=mode["CONN_HEALTH_CHECKS"],
+                                    OPTIONS=options)
+
+
+def run_connections(requests=500, warmup=20):
+    """
+    Send ``airportByCode`` through ``/graphql/`` one request after another under
+    each connection mode and compare their latency. The lookup cache is off, so
+    every request reaches the database.
+    """
+    from FlightsService.wsgi import application
+
+    operation = next(operation for operation in QUERIES if operation.name == "airportByCode")
+    body = json.dumps({"query": operation.query, "variables": operation.variables(Fixtures())}).encode()
+    saved = dict(connection.settings_dict)
+    backend, lookup_cache.backend = lookup_cache.backend, None
+    report = {"vendor": connection.vendor, "requests": requests}
+    try:
+        for name, mode in modes().items():
+            configure(mode)
+            for _ in range(warmup):
+                post(application, "/graphql/", body)
+            timings = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                post(application, "/graphql/", body)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            report[name] = {
+                "p50_ms": round(percentile(timings, 50), 3),
+                "p95_ms": round(percentile(timings, 95), 3),
+                "p99_ms": round(percentile(timings, 99), 3),
+            }
+    finally:
+        lookup_cache.backend = backend
+        configure({"CONN_MAX_AGE": saved["CONN_MAX_AGE"], "CONN_HEALTH_CHECKS": saved["CONN_HEALTH_CHECKS"],
+                   "pool": saved["OPTIONS"].get("pool")})
+    for name in ("persistent", "pool"):
+        if name in report:
+            report[f"{name}_speedup"] = round(report["per_request"]["p50_ms"] / report[name]["p50_ms"], 2)
+    return report
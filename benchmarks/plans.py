@@ -0,0 +1,79 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from Flight.models import ArchivedFlight, FareCalendarDay, Flight, FlightListing, SeatHold
+from benchmarks.runner import OPERATIONS, Fixtures, execute, reset_state
+
+# Tables that grow with the flights; a full scan of one of them is a missing index
+BIG_TABLES = {model._meta.db_table for model in (Flight, FlightListing, FareCalendarDay, SeatHold, ArchivedFlight)}
+
+# Plan lines of a full table scan: SQLite's "SCAN table" (but not "SCAN table USING INDEX",
+# an index walk in sort order), PostgreSQL's "Seq Scan on table"
+SEQUENTIAL_SCAN = {
+    "sqlite": re.compile(r'^SCAN "?(\w+)"?(?: AS \w+)?$'),
+    "postgresql": re.compile(r'Seq Scan on "?(\w+)"?'),
+}
+EXPLAINED = ("SELECT", "UPDATE", "DELETE")
+
+
+def analyze():
+    """Refresh the planner statistics, so plans reflect the seeded data."""
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def plan(sql):
+    """The plan the database picks for ``sql``, one line per step."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN {sql}")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def sequential_scans(lines):
+    """The big tables ``lines`` scan in full."""
+    pattern = SEQUENTIAL_SCAN.get(connection.vendor)
+    if pattern is None:
+        raise Exception(f"Plans of {connection.vendor} are not supported.")
+    scanned = []
+    for line in lines:
+        match = pattern.search(line.strip())
+        if match and match.group(1) in BIG_TABLES:
+            scanned.append(match.group(1))
+    return scanned
+
+
+def explain(only=None):
+    """
+    Run every benchmark operation (or those named in ``only``) against the
+    current data, EXPLAIN each statement its second run sent and return
+    ``{operation: [(sql, table, plan)]}`` for the statements planned with a
+    sequential scan of a big table. Mutations are rolled back as in ``run``.
+    """
+    fixtures = Fixtures()
+    analyze()
+    found = {}
+    for operation in OPERATIONS:
+        if only and operation.name not in only:
+            continue
+        variables = operation.variables(fixtures) if operation.variables else None
+        # Once to warm up, so one-off loads (the route graph, the caches) are not mistaken for the query path
+        for warm in (True, False):
+            with CaptureQueriesContext(connection) as captured:
+                result = execute(operation, variables)
+            if result.errors:
+                raise Exception(f"{operation.name} failed: {result.errors[0]}")
+            if operation.mutation:
+                reset_state()
+        for query in captured:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith(EXPLAINED):
+                continue
+            lines = plan(sql)
+            for table in sequential_scans(lines):
+                found.setdefault(operation.name, []).append((sql, table, lines))
+    return found
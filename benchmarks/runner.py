@@ -0,0 +1,275 @@
+import math
+import platform
+import time
+import tracemalloc
+from typing import Callable, NamedTuple
+
+import django
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from Flight.cache import lookup_cache
+from Flight.models import Aircraft, Airline, Airport, Flight
+from Flight.pagination import encode_cursor
+from Flight.routing import route_graph
+from Flight.search import search_index
+from Flight.suggest import airport_suggester
+from FlightsService.schema import schema
+
+
+class Operation(NamedTuple):
+    name: str
+    query: str
+    variables: Callable = None  # fixtures -> variables
+    mutation: bool = False
+
+
+class Fixtures:
+    """Keys of existing rows the operations are pointed at, picked from the seeded data."""
+    def __init__(self):
+        flights = Flight.objects.order_by("id")
+        count = flights.count()
+        if not count:
+            raise Exception("The database has no flights; run `python -m benchmarks seed` first.")
+        self.flight = flights.select_related("departure_airport", "arrival_airport", "airline", "aircraft")[count // 2]
+        self.flight_numbers = list(flights.values_list("flight_number", flat=True)[:100])
+        # The busiest route, so searches return full pages
+        route = (Flight.objects.values("departure_airport", "arrival_airport")
+                 .annotate(flights=Count("id")).order_by("-flights", "departure_airport", "arrival_airport")
+                 .first())
+        self.origin = Airport.objects.get(pk=route["departure_airport"])
+        self.destination = Airport.objects.get(pk=route["arrival_airport"])
+        self.airline = self.flight.airline
+        self.aircraft = self.flight.aircraft
+        self.day = self.flight.departure_datetime.date().isoformat()
+        self.month = self.day[:7]
+        # Halfway through allFlights, to show the cost of deep pages
+        self.deep_cursor = encode_cursor([self.flight.departure_datetime, self.flight.id])
+
+    def new_flight(self, number):
+        flight = self.flight
+        return {
+            "flightNumber": number,
+            "flightType": flight.flight_type,
+            "tripType": flight.trip_type,
+            "departureAirport": flight.departure_airport_id,
+            "arrivalAirport": flight.arrival_airport_id,
+            "departureDatetime": flight.departure_datetime.isoformat(),
+            "arrivalDatetime": flight.arrival_datetime.isoformat(),
+            "airline": flight.airline_id,
+            "aircraft": flight.aircraft_id,
+            "cabinType": flight.cabin_type,
+            "basePrice": flight.base_price,
+            "tax": int(flight.tax),
+            "discount": float(flight.discount),
+            "baggageLimitKg": float(flight.baggage_limit_kg),
+            "flightRules": flight.flight_rules,
+        }
+
+
+FLIGHT_FIELDS = """
+    flightNumber departureDatetime arrivalDatetime cabinType finalPrice
+    departureAirport { airportCode airportCity }
+    arrivalAirport { airportCode airportCity }
+    airline { airlineCode airlineName }
+    aircraft { aircraftModel }
+"""
+
+QUERIES = [
+    Operation("allFlights", "query { allFlights(first: 50) { edges { cursor node { %s } } } }" % FLIGHT_FIELDS),
+    Operation("allFlights.deep_page",
+              "query($after: String) { allFlights(first: 50, after: $after) { edges { node { flightNumber } } } }",
+              lambda f: {"after": f.deep_cursor}),
+    Operation("flightByNumber", "query($n: String!) { flightByNumber(flightNumber: $n) { %s } }" % FLIGHT_FIELDS,
+              lambda f: {"n": f.flight.flight_number}),
+    Operation("searchFlights",
+              "query($from: String!, $to: String) { searchFlights(from: $from, to: $to, first: 50) "
+              "{ edges { node { %s } } } }" % FLIGHT_FIELDS,
+              lambda f: {"from": f.origin.airport_code, "to": f.destination.airport_code}),
+    Operation("searchFlights.day",
+              "query($from: String!, $day: Date) { searchFlights(from: $from, departDate: $day, first: 50) "
+              "{ edges { node { flightNumber finalPrice } } } }",
+              lambda f: {"from": f.flight.departure_airport.airport_code, "day": f.day}),
+    Operation("searchItineraries",
+              "query($from: String!, $to: String!, $day: Date) { searchItineraries(from: $from, to: $to, "
+              "departDate: $day) { stops totalPrice legs { flightNumber departureAirport { airportCode } } } }",
+              lambda f: {"from": f.flight.departure_airport.airport_code,
+                         "to": f.flight.arrival_airport.airport_code, "day": f.day}),
+    Operation("fareCalendar",
+              "query($from: String!, $to: String!, $month: String!) { fareCalendar(from: $from, to: $to, "
+              "month: $month) { date minPrice flights } }",
+              lambda f: {"from": f.origin.airport_code, "to": f.destination.airport_code, "month": f.month}),
+    Operation("seatAvailability",
+              "query($n: String!) { seatAvailability(flightNumber: $n) { seatsTotal seatsAvailable } }",
+              lambda f: {"n": f.flight.flight_number}),
+    Operation("allAirports", "query { allAirports(first: 100) { edges { node { airportCode airportName } } } }"),
+    Operation("airportByCode", "query($c: String!) { airportByCode(airportCode: $c) { airportCode airportName } }",
+              lambda f: {"c": f.origin.airport_code}),
+    Operation("airportSuggest", "query($p: String!) { airportSuggest(prefix: $p) { airportCode airportName } }",
+              lambda f: {"p": f.origin.airport_name[:3]}),
+    Operation("allAirlines", "query { allAirlines(first: 100) { edges { node { airlineCode airlineName } } } }"),
+    Operation("airlineByCode", "query($c: String!) { airlineByCode(airlineCode: $c) { airlineCode airlineName } }",
+              lambda f: {"c": f.airline.airline_code}),
+    Operation("allAircrafts", "query { allAircrafts(first: 100) { edges { node { aircraftModel } } } }"),
+    Operation("aircraftByModel",
+              "query($m: String!) { aircraftByModel(aircraftModel: $m) { aircraftModel aircraftCapacity } }",
+              lambda f: {"m": f.aircraft.aircraft_model}),
+]
+
+MUTATIONS = [
+    Operation("createFlight",
+              "mutation($flightNumber: String!, $flightType: String!, $tripType: String!, $departureAirport: Int!, "
+              "$arrivalAirport: Int!, $departureDatetime: String!, $arrivalDatetime: String!, $airline: Int!, "
+              "$aircraft: Int!, $cabinType: String!, $basePrice: Int!, $tax: Int!, $discount: Float!, "
+              "$baggageLimitKg: Float!, $flightRules: String!) { createFlight(flightNumber: $flightNumber, "
+              "flightType: $flightType, tripType: $tripType, departureAirport: $departureAirport, "
+              "arrivalAirport: $arrivalAirport, departureDatetime: $departureDatetime, "
+              "arrivalDatetime: $arrivalDatetime, airline: $airline, aircraft: $aircraft, cabinType: $cabinType, "
+              "basePrice: $basePrice, tax: $tax, discount: $discount, baggageLimitKg: $baggageLimitKg, "
+              "flightRules: $flightRules) { flightNumber finalPrice } }",
+              lambda f: f.new_flight("BENCH0000"), mutation=True),
+    Operation("updateFlight",
+              "mutation($n: String!, $p: Int) { updateFlight(flightNumber: $n, basePrice: $p) { finalPrice } }",
+              lambda f: {"n": f.flight.flight_number, "p": f.flight.base_price + 1000}, mutation=True),
+    Operation("deleteFlight", "mutation($n: String!) { deleteFlight(flightNumber: $n) }",
+              lambda f: {"n": f.flight.flight_number}, mutation=True),
+    Operation("createFlights.100",
+              "mutation($flights: [FlightInput!]!) { createFlights(flights: $flights) { flightNumber } }",
+              lambda f: {"flights": [f.new_flight(f"BENCH{i:04d}") for i in range(100)]}, mutation=True),
+    Operation("updateFlights.100",
+              "mutation($flights: [FlightUpdateInput!]!) { updateFlights(flights: $flights) { finalPrice } }",
+              lambda f: {"flights": [{"flightNumber": n, "discount": 7.5} for n in f.flight_numbers]},
+              mutation=True),
+    Operation("deleteFlights.100", "mutation($n: [String!]!) { deleteFlights(flightNumbers: $n) }",
+              lambda f: {"n": f.flight_numbers}, mutation=True),
+    Operation("repriceFlights.airline",
+              "mutation($a: String) { repriceFlights(filter: {airline: $a}, taxPct: 9.5) }",
+              lambda f: {"a": f.airline.airline_code}, mutation=True),
+    Operation("holdSeats",
+              "mutation($n: String!) { holdSeats(flightNumber: $n, seats: 2) { token expiresAt } }",
+              lambda f: {"n": f.flight.flight_number}, mutation=True),
+    Operation("createAirport",
+              "mutation { createAirport(airportCode: \"ZZZZ\", airportName: \"Bench\", airportCity: \"Bench\", "
+              "airportCountry: \"Bench\") { airportCode } }", mutation=True),
+    Operation("updateAirport",
+              "mutation($c: String!) { updateAirport(airportCode: $c, airportName: \"Bench\", airportCity: \"Bench\", "
+              "airportCountry: \"Bench\") { airportCode } }",
+              lambda f: {"c": f.origin.airport_code}, mutation=True),
+    Operation("deleteAirport", "mutation($c: String!) { deleteAirport(airportCode: $c) }",
+              lambda f: {"c": f.destination.airport_code}, mutation=True),
+    Operation("createAirline",
+              "mutation { createAirline(airlineCode: \"ZZZZ\", airlineName: \"Bench\", airlineRules: \"Rules\") "
+              "{ airlineCode } }", mutation=True),
+    Operation("updateAirline",
+              "mutation($c: String!) { updateAirline(airlineCode: $c, airlineName: \"Bench\", airlineRules: \"Rules\") "
+              "{ airlineCode } }",
+              lambda f: {"c": f.airline.airline_code}, mutation=True),
+    Operation("deleteAirline", "mutation($c: String!) { deleteAirline(airlineCode: $c) }",
+              lambda f: {"c": f.airline.airline_code}, mutation=True),
+    Operation("createAircraft",
+              "mutation { createAircraft(aircraftModel: \"Bench\", aircraftCapacity: 100, "
+              "aircraftManufacturer: \"Bench\") { aircraftModel } }", mutation=True),
+    Operation("updateAircraft",
+              "mutation($m: String!) { updateAircraft(aircraftModel: $m, aircraftCapacity: 120, "
+              "aircraftManufacturer: \"Bench\") { aircraftModel } }",
+              lambda f: {"m": f.aircraft.aircraft_model}, mutation=True),
+    Operation("deleteAircraft", "mutation($m: String!) { deleteAircraft(aircraftModel: $m) }",
+              lambda f: {"m": f.aircraft.aircraft_model}, mutation=True),
+]
+
+OPERATIONS = QUERIES + MUTATIONS
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list."""
+    return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+
+def reset_state():
+    """
+    Forget in-process state a rolled back mutation left behind: the caches
+    that observed the rolled back rows. (Its command history rolled back with it.)
+    """
+    for model in (Flight, Airport, Airline, Aircraft):
+        lookup_cache.invalidate(model)
+    route_graph.reset()
+    search_index.reset()
+    airport_suggester.reset()
+
+
+def execute(operation, variables):
+    request = RequestFactory().post("/graphql/")
+    if not operation.mutation:
+        return schema.execute(operation.query, variables=variables, context_value=request)
+    # Mutations run in a transaction that is rolled back, so every iteration sees the same data
+    with transaction.atomic():
+        result = schema.execute(operation.query, variables=variables, context_value=request)
+        transaction.set_rollback(True)
+    return result
+
+
+def measure(operation, fixtures, iterations=50, warmup=5):
+    variables = operation.variables(fixtures) if operation.variables else None
+    timings, queries = [], []
+    for i in range(warmup + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            result = execute(operation, variables)
+            elapsed = time.perf_counter() - start
+        if operation.mutation:
+            reset_state()
+        if result.errors:
+            raise Exception(f"{operation.name} failed: {result.errors[0]}")
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+
+    # Memory is traced in a separate run; tracing slows everything down too much to time with it
+    tracemalloc.start()
+    try:
+        execute(operation, variables)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        if operation.mutation:
+            reset_state()
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "queries_per_op": round(sum(queries) / len(queries), 2),
+        "queries_max": max(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run(iterations=50, warmup=5, only=None):
+    """Time every operation (or those named in ``only``) and return the report as a dict."""
+    if iterations < 1:
+        raise Exception("Run at least one iteration.")
+    fixtures = Fixtures()
+    operations = [operation for operation in OPERATIONS if not only or operation.name in only]
+    return {
+        "environment": {
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "rows": {
+                "airports": Airport.objects.count(),
+                "airlines": Airline.objects.count(),
+                "aircraft": Aircraft.objects.count(),
+                "flights": Flight.objects.count(),
+            },
+        },
+        "operations": {
+            operation.name: measure(operation, fixtures, iterations=iterations, warmup=warmup)
+            for operation in operations
+        },
+    }
+
@@ -0,0 +1,141 @@
+import random
+import string
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from Flight import listings
+from Flight.models import Aircraft, Airline, Airport, ArchivedFlight, CabinType, Flight, FlightType, SeatHold, TripType
+
+# Every generated schedule starts here, so the same seed always gives the same rows
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+BATCH_SIZE = 2000
+# The tables a clear empties, children before the rows they reference
+CLEARED = (SeatHold, ArchivedFlight, Flight, Airport, Airline, Aircraft)
+
+
+def letters(index, width):
+    """``index`` as a fixed-width code of upper-case letters: 0 -> 'AAA', 1 -> 'AAB'..."""
+    code = ""
+    for _ in range(width):
+        index, digit = divmod(index, 26)
+        code = string.ascii_uppercase[digit] + code
+    return code
+
+
+def generate_airports(count, rng):
+    countries = ["Iran", "Turkey", "Germany", "France", "Japan", "Brazil", "Canada", "Egypt"]
+    return [
+        Airport(airport_code=letters(i, 3), airport_name=f"Airport {letters(i, 3)}",
+                airport_city=f"City {i}", airport_country=rng.choice(countries))
+        for i in range(count)
+    ]
+
+
+def generate_airlines(count, rng):
+    return [
+        Airline(airline_code=letters(i, 2), airline_name=f"Airline {letters(i, 2)}",
+                airline_rules=f"Cancellation fee {rng.randint(10, 50)}%.")
+        for i in range(count)
+    ]
+
+
+def generate_aircraft(count, rng):
+    manufacturers = ["Airbus", "Boeing", "Embraer", "Fokker", "ATR"]
+    return [
+        Aircraft(aircraft_model=f"Model {i}", aircraft_capacity=rng.randint(50, 400),
+                 aircraft_manufacturer=rng.choice(manufacturers))
+        for i in range(count)
+    ]
+
+
+def generate_flights(count, rng, airports, airlines, aircraft, days=365):
+    """
+    Yield ``count`` Flights spread over ``days`` days. A fifth of the airports
+    are hubs that get half of the traffic, so routes have the skew real schedules have.
+    """
+    hubs = airports[:max(1, len(airports) // 5)]
+    for i in range(count):
+        origin = rng.choice(hubs if rng.random() < 0.5 else airports)
+        destination = rng.choice(airports)
+        while destination is origin:
+            destination = rng.choice(airports)
+        airline = rng.choice(airlines)
+        departure = EPOCH + timedelta(minutes=rng.randrange(days * 24 * 60 // 5) * 5)
+        flight = Flight(
+            flight_number=f"{airline.airline_code}{i:07d}",
+            flight_type=rng.choice(list(FlightType)).name,
+            trip_type=TripType.DIRECT.name,
+            cabin_type=rng.choice(list(CabinType)).name,
+            departure_airport=origin,
+            arrival_airport=destination,
+            departure_datetime=departure,
+            arrival_datetime=departure + timedelta(minutes=rng.randint(45, 720)),
+            airline=airline,
+            aircraft=rng.choice(aircraft),
+            base_price=rng.randrange(500_000, 50_000_000, 1000),
+            tax=Decimal(rng.choice(["0", "9", "10", "12.5"])),
+            discount=Decimal(rng.choice(["0", "0", "5", "10", "15"])),
+            baggage_limit_kg=Decimal(rng.choice(["20", "23", "30", "40"])),
+            flight_rules="Non-refundable." if rng.random() < 0.3 else "Refundable with a fee.",
+        )
+        flight.final_price = flight.final_price_calculated
+        flight.fill_seats()
+        yield flight
+
+
+def bulk_insert(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def clear_tables():
+    """
+    Empty the seeded tables with one plain DELETE each. ``QuerySet.delete()``
+    would collect every row and send post_delete for each of them, running
+    the service's signal handlers once per row. The listings and the fare
+    calendar are rebuilt by ``seed`` itself.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in CLEARED:
+            cursor.execute(f"DELETE FROM {quote(model._meta.db_table)}")
+
+
+def seed(airports=200, airlines=30, aircraft=40, flights=100_000, seed=42, clear=True):
+    """
+    Fill the database with a synthetic data set. The same arguments always
+    produce the same rows (and, on an empty database, the same primary keys).
+
+    Rows are written with ``bulk_create`` and cleared with plain DELETEs, so
+    the signals and caches of the service are not involved; start the
+    benchmark process after seeding. The search listings are rebuilt at the end.
+    """
+    if min(airports, airlines, aircraft) < 1 or (flights and airports < 2):
+        raise Exception("Seed at least two airports and one airline and aircraft.")
+    rng = random.Random(seed)
+    with transaction.atomic():
+        if clear:
+            clear_tables()
+        bulk_insert(Airport, generate_airports(airports, rng))
+        bulk_insert(Airline, generate_airlines(airlines, rng))
+        bulk_insert(Aircraft, generate_aircraft(aircraft, rng))
+        # Reload so every row carries its primary key, whatever the backend returns from bulk_create
+        airport_rows = list(Airport.objects.order_by("airport_code"))
+        airline_rows = list(Airline.objects.order_by("airline_code"))
+        aircraft_rows = list(Aircraft.objects.order_by("id"))
+        bulk_insert(Flight, generate_flights(flights, rng, airport_rows, airline_rows, aircraft_rows))
+        listings.rebuild()
+    return {
+        "airports": Airport.objects.count(),
+        "airlines": Airline.objects.count(),
+        "aircraft": Aircraft.objects.count(),
+        "flights": Flight.objects.count(),
+    }
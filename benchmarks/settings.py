@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+from FlightsService.settings import *  # noqa: F401,F403
+
+# Benchmarks run with production-like settings against their own database:
+#   BENCH_DB=sqlite    (default) a file at BENCH_SQLITE_PATH
+#   BENCH_DB=postgres  a local PostgreSQL database, configured by the BENCH_PG_* variables
+#                      and connected to like the service (the DB_CONN_* and DB_POOL* variables)
+DEBUG = False
+ALLOWED_HOSTS = ["localhost"]
+
+if os.environ.get("BENCH_DB", "sqlite") == "postgres":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("BENCH_PG_NAME", "flightDB_bench"),
+            'USER': os.environ.get("BENCH_PG_USER", "postgres"),
+            'PASSWORD': os.environ.get("BENCH_PG_PASSWORD", ""),
+            'HOST': os.environ.get("BENCH_PG_HOST", "localhost"),
+            'PORT': os.environ.get("BENCH_PG_PORT", ""),
+            **DATABASE_CONNECTIONS,  # noqa: F405
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("BENCH_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "flights_bench.sqlite3")),
+        }
+    }
+
+# Keep request logging out of the measurements
+LOGGING['loggers']['django']['level'] = 'WARNING'  # noqa: F405